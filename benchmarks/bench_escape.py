@@ -0,0 +1,91 @@
+"""Cost of html escaping: rendering with escaping against rendering with the escape functions disabled.
+
+run from the project root with ``python benchmarks/bench_escape.py``
+"""
+
+import argparse
+import random
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from unittest import mock
+
+from bench_memory import make_page
+
+import ssg.block
+import ssg.htmlnode
+import ssg.inline
+from ssg.block import markdown_to_html, markdown_to_html_node
+
+
+def unescaped(value: str) -> str:
+    """Stand-in for the escape functions that does no work.
+
+    Args:
+        value: text or attribute value
+
+    Returns:
+        value unchanged
+    """
+    return value
+
+
+@contextmanager
+def escaping_disabled() -> Iterator[None]:
+    """Replace the escape functions with unescaped in every module that renders html."""
+    with (
+        mock.patch.multiple(ssg.htmlnode, escape_text=unescaped, escape_attr=unescaped),
+        mock.patch.multiple(ssg.inline, escape_text=unescaped, escape_attr=unescaped),
+        mock.patch.multiple(ssg.block, escape_attr=unescaped),
+    ):
+        yield
+
+
+def best_time(render: Callable[[str], str], markdown: str, repeat: int) -> float:
+    """Best-of-repeat rendering time in seconds.
+
+    Args:
+        render: markdown to html function to time
+        markdown: page to render
+        repeat: number of timed runs
+
+    Returns:
+        fastest run in seconds
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        render(markdown)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    """Run the benchmark and print the escaping overhead of both render paths."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size", type=int, default=1_000_000, help="page size in bytes")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--dirty", type=float, default=0.02, help="fraction of lines given a character to escape")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    lines = make_page(rng, args.size).split("\n")
+    markdown = "\n".join(f"{line} a < b & c" if line and rng.random() < args.dirty else line for line in lines)
+
+    paths: list[tuple[str, Callable[[str], str]]] = [
+        ("node tree + to_html", lambda text: markdown_to_html_node(text).to_html()),
+        ("markdown_to_html", markdown_to_html),
+    ]
+    for name, render in paths:
+        escaped = best_time(render, markdown, args.repeat)
+        with escaping_disabled():
+            plain = best_time(render, markdown, args.repeat)
+        print(
+            f"{name:20} {plain * 1000:8.1f} ms unescaped {escaped * 1000:8.1f} ms escaped "
+            f"({100 * (escaped - plain) / plain:+.1f}%)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""Memory used by the node tree of a synthetic large page.
+
+run from the project root with ``python benchmarks/bench_memory.py``
+"""
+
+import argparse
+import random
+import resource
+import sys
+import tracemalloc
+
+from bench_inline import make_paragraph
+
+from ssg.block import markdown_to_html_node
+from ssg.htmlnode import HTMLNode, ParentNode
+
+
+def make_page(rng: random.Random, size: int) -> str:
+    """Build a markdown page of roughly size bytes with headings, lists, quotes and paragraphs.
+
+    Args:
+        rng: seeded random generator
+        size: approximate page size in bytes
+
+    Returns:
+        markdown page
+    """
+    blocks = ["# Synthetic page"]
+    length = 0
+    while length < size:
+        roll = rng.random()
+        if roll < 0.1:  # noqa: PLR2004
+            block = f"## {make_paragraph(rng, 4)}"
+        elif roll < 0.25:  # noqa: PLR2004
+            block = "\n".join(f"- {make_paragraph(rng, 8)}" for _ in range(5))
+        elif roll < 0.35:  # noqa: PLR2004
+            block = "\n".join(f"{i}. {make_paragraph(rng, 8)}" for i in range(1, 6))
+        elif roll < 0.45:  # noqa: PLR2004
+            block = f"> {make_paragraph(rng, 30)}"
+        else:
+            block = make_paragraph(rng, 60)
+        blocks.append(block)
+        length += len(block) + 2
+    return "\n\n".join(blocks)
+
+
+def count_nodes(root: HTMLNode) -> int:
+    """Count the nodes of a tree.
+
+    Args:
+        root: root of the tree
+
+    Returns:
+        number of nodes including the root
+    """
+    count = 0
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        count += 1
+        if isinstance(node, ParentNode):
+            stack.extend(node.children or [])
+    return count
+
+
+def main() -> None:
+    """Build the tree of a synthetic page and report bytes per node and peak RSS."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size", type=int, default=1_000_000, help="page size in bytes")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    markdown = make_page(random.Random(args.seed), args.size)
+
+    # peak RSS is taken before tracing, tracemalloc has a large overhead of its own
+    tree = markdown_to_html_node(markdown)
+    nodes = count_nodes(tree)
+    # ru_maxrss is in kilobytes on linux and bytes on macos
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * (1 if sys.platform == "darwin" else 1024)
+    del tree
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    tree = markdown_to_html_node(markdown)
+    tree_bytes = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del tree
+
+    print(f"page size:      {len(markdown.encode()):>12,} bytes")
+    print(f"nodes:          {nodes:>12,}")
+    print(f"tree memory:    {tree_bytes:>12,} bytes")
+    print(f"bytes per node: {tree_bytes / nodes:>12.1f}")
+    print(f"peak RSS:       {peak:>12,} bytes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""Rendering throughput: the HTMLNode tree against the direct markdown_to_html fast path.
+
+run from the project root with ``python benchmarks/bench_render.py``
+"""
+
+import argparse
+import random
+import time
+from collections.abc import Callable
+
+from bench_memory import make_page
+
+from ssg.block import markdown_to_html, markdown_to_html_node
+
+
+def throughput(render: Callable[[str], str], markdown: str, repeat: int) -> float:
+    """Best-of-repeat rendering speed in MB/s.
+
+    Args:
+        render: markdown to html function to time
+        markdown: page to render
+        repeat: number of timed runs
+
+    Returns:
+        megabytes of markdown rendered per second
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        render(markdown)
+        best = min(best, time.perf_counter() - start)
+    return len(markdown.encode()) / best / 1_000_000
+
+
+def main() -> None:
+    """Run the benchmark and print MB/s for both paths."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size", type=int, default=1_000_000, help="page size in bytes")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    markdown = make_page(random.Random(args.seed), args.size)
+    tree = throughput(lambda text: markdown_to_html_node(text).to_html(), markdown, args.repeat)
+    fast = throughput(markdown_to_html, markdown, args.repeat)
+    print(f"node tree + to_html: {tree:8.2f} MB/s")
+    print(f"markdown_to_html:    {fast:8.2f} MB/s ({fast / tree:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
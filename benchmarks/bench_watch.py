@@ -0,0 +1,85 @@
+"""Edit to refresh latency of watch mode on a large site: one poll plus the rebuild of one page.
+
+run from the project root with ``python benchmarks/bench_watch.py``
+"""
+
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from corpus import Mix, make_page
+from suite import build_options
+
+from ssg.main import Site, build_site, rebuild_changes
+from ssg.watch import Watcher
+
+TEMPLATE = "<html><head><title>{{ Title }}</title></head><body>{{ Content }}</body></html>"
+
+
+def make_site(root: Path, pages: int, assets: int, size: int) -> Site:
+    """Write a site with pages spread over sections and a flat static tree.
+
+    Args:
+        root: directory to fill
+        pages: number of markdown pages
+        assets: number of static files
+        size: approximate page size in bytes
+
+    Returns:
+        the site
+    """
+    rng = random.Random(0)
+    site = Site.at(root)
+    site.template.write_text(TEMPLATE)
+    for i in range(pages):
+        page = site.content / f"section{i % 20:02}" / f"page{i:05}"
+        page.mkdir(parents=True)
+        (page / "index.md").write_text(make_page(rng, size, Mix(image=0), pages))
+    site.static.mkdir()
+    for i in range(assets):
+        (site.static / f"asset{i:05}.css").write_text(f"/* {i} */")
+    return site
+
+
+def main() -> None:
+    """Build a site, then time edits of single pages through the watcher."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pages", type=int, default=2000)
+    parser.add_argument("--assets", type=int, default=500)
+    parser.add_argument("--size", type=int, default=4000, help="approximate page size in bytes")
+    parser.add_argument("--edits", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        site = make_site(Path(tmp).resolve(), args.pages, args.assets, args.size)
+        options = build_options()
+        manifest = build_site(site, "/", options)
+        watcher = Watcher([site.content, site.static, site.template])
+
+        polls: list[float] = []
+        rebuilds: list[float] = []
+        sources = sorted(site.content.rglob("*.md"))
+        for i in range(args.edits):
+            source = sources[i * len(sources) // args.edits]
+            source.write_text(source.read_text() + f"\nedit {i}\n")
+            mtime = source.stat().st_mtime_ns + 1_000_000
+            os.utime(source, ns=(mtime, mtime))
+            start = time.perf_counter()
+            changes = watcher.poll()
+            polled = time.perf_counter()
+            rebuild_changes(site, "/", manifest, changes)
+            polls.append(polled - start)
+            rebuilds.append(time.perf_counter() - polled)
+
+    files = args.pages + args.assets + 1
+    print(f"watched files {files}")
+    print(f"poll     median {statistics.median(polls) * 1000:7.1f} ms  max {max(polls) * 1000:7.1f} ms")
+    print(f"rebuild  median {statistics.median(rebuilds) * 1000:7.1f} ms  max {max(rebuilds) * 1000:7.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
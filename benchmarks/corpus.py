@@ -0,0 +1,222 @@
+"""Deterministic synthetic corpus for the benchmark suite.
+
+The same seed and options always give byte for byte the same site, so timings taken on different
+commits are comparable. Each page draws from its own generator seeded by the corpus seed and its
+number, so adding pages leaves the existing ones unchanged.
+
+write a corpus from the project root with ``python benchmarks/corpus.py /tmp/corpus --pages 500``
+"""
+
+import argparse
+import random
+from pathlib import Path
+from typing import NamedTuple
+
+TEMPLATE = (
+    '<html><head><title>{{ Title }}</title><link href="/index.css" rel="stylesheet"></head>'
+    '<body><nav><a href="/">home</a></nav><article>{{ Content }}</article></body></html>'
+)
+WORDS = ["elf", "ring", "mordor", "shire", "hobbit", "wizard", "balrog", "gondor", "river", "tower"]
+
+
+class Mix(NamedTuple):
+    """Relative weights of the blocks of a page and the share of inline elements among its words."""
+
+    heading: float = 1.0
+    ul: float = 1.5
+    ol: float = 1.0
+    quote: float = 1.0
+    code: float = 0.5
+    paragraph: float = 5.0
+    # the rest are the probabilities of a word being each inline element
+    bold: float = 0.05
+    italic: float = 0.05
+    code_span: float = 0.03
+    link: float = 0.02
+    image: float = 0.01
+
+    @classmethod
+    def parse(cls, text: str) -> "Mix":
+        """Reads a mix from comma separated name=weight pairs, unnamed weights keep their default.
+
+        Args:
+            text: such as ``code=2,link=0.1``
+
+        Returns:
+            the mix
+
+        Raises:
+            ValueError: a name is not a field of Mix
+        """
+        weights: dict[str, float] = {}
+        for pair in filter(None, text.split(",")):
+            name, _, weight = pair.partition("=")
+            if name.strip() not in cls._fields:
+                msg = f"unknown mix weight {name!r}, expected one of {', '.join(cls._fields)}"
+                raise ValueError(msg)
+            weights[name.strip()] = float(weight)
+        return cls(**weights)
+
+
+class Corpus(NamedTuple):
+    """Options a corpus is generated from, recorded with the results of a run."""
+
+    pages: int = 200
+    size: int = 4000
+    assets: int = 50
+    seed: int = 0
+    mix: Mix = Mix()
+
+
+DEFAULT_MIX = Mix()
+DEFAULT_CORPUS = Corpus()
+
+
+def make_paragraph(rng: random.Random, words: int, mix: Mix, pages: int = 1) -> str:
+    """Builds a paragraph mixing plain words with inline elements.
+
+    Links point to pages of the corpus and images to its placeholder image, so a build of the
+    corpus has no broken links.
+
+    Args:
+        rng: seeded random generator
+        words: number of words in the paragraph
+        mix: share of each inline element
+        pages: number of pages of the corpus, links point to one of them
+
+    Returns:
+        markdown paragraph
+    """
+    bold = mix.bold
+    italic = bold + mix.italic
+    code = italic + mix.code_span
+    link = code + mix.link
+    image = link + mix.image
+    parts: list[str] = []
+    for _ in range(words):
+        word = rng.choice(WORDS)
+        roll = rng.random()
+        if roll < bold:
+            parts.append(f"**{word}**")
+        elif roll < italic:
+            parts.append(f"_{word}_")
+        elif roll < code:
+            parts.append(f"`{word}`")
+        elif roll < link:
+            page = rng.randrange(pages)
+            parts.append(f"[{word}](/section{page % 20:02}/page{page:05}/)")
+        elif roll < image:
+            parts.append(f"![{word}](/images/placeholder.png)")
+        else:
+            parts.append(word)
+    return " ".join(parts)
+
+
+def make_block(rng: random.Random, mix: Mix, pages: int = 1) -> str:
+    """Builds one block, its kind drawn from the block weights of the mix.
+
+    Args:
+        rng: seeded random generator
+        mix: weights of the blocks and inline elements
+        pages: number of pages of the corpus, see make_paragraph
+
+    Returns:
+        markdown block
+    """
+    kinds = ["heading", "ul", "ol", "quote", "code", "paragraph"]
+    kind = rng.choices(kinds, weights=[getattr(mix, kind) for kind in kinds])[0]
+    if kind == "heading":
+        return f"{'#' * rng.randint(2, 4)} {make_paragraph(rng, 4, mix, pages)}"
+    if kind == "ul":
+        return "\n".join(f"- {make_paragraph(rng, 8, mix, pages)}" for _ in range(rng.randint(2, 6)))
+    if kind == "ol":
+        return "\n".join(f"{i}. {make_paragraph(rng, 8, mix, pages)}" for i in range(1, rng.randint(3, 7)))
+    if kind == "quote":
+        return "\n".join(f"> {make_paragraph(rng, 12, mix, pages)}" for _ in range(rng.randint(1, 3)))
+    if kind == "code":
+        lines = [f"{rng.choice(WORDS)} = {rng.randrange(1000)}  # {rng.choice(WORDS)}" for _ in range(5)]
+        return "```python\n" + "\n".join(lines) + "\n```"
+    return make_paragraph(rng, rng.randint(30, 90), mix, pages)
+
+
+def make_page(rng: random.Random, size: int, mix: Mix = DEFAULT_MIX, pages: int = 1) -> str:
+    """Builds a markdown page of roughly size bytes, starting with its title.
+
+    Args:
+        rng: seeded random generator
+        size: approximate page size in bytes
+        mix: weights of the blocks and inline elements
+        pages: number of pages of the corpus, see make_paragraph
+
+    Returns:
+        markdown page
+    """
+    blocks = [f"# {make_paragraph(rng, 3, Mix(bold=0, italic=0, code_span=0, link=0, image=0))}"]
+    length = len(blocks[0])
+    while length < size:
+        block = make_block(rng, mix, pages)
+        blocks.append(block)
+        length += len(block) + 2
+    return "\n\n".join(blocks) + "\n"
+
+
+def corpus_pages(corpus: Corpus) -> list[tuple[str, str]]:
+    """Generates the pages of a corpus in memory.
+
+    Args:
+        corpus: options of the corpus
+
+    Returns:
+        (path relative to content/, markdown) of every page
+    """
+    pages: list[tuple[str, str]] = []
+    for i in range(corpus.pages):
+        rng = random.Random(f"{corpus.seed}:{i}")
+        pages.append((f"section{i % 20:02}/page{i:05}/index.md", make_page(rng, corpus.size, corpus.mix, corpus.pages)))
+    return pages
+
+
+def write_corpus(root: str | Path, corpus: Corpus) -> Path:
+    """Writes a site laid out like the project: content/, static/ and template.html.
+
+    Args:
+        root: directory to fill
+        corpus: options of the corpus
+
+    Returns:
+        the root directory
+    """
+    root = Path(root)
+    root.mkdir(parents=True, exist_ok=True)
+    (root / "template.html").write_text(TEMPLATE)
+    content = root / "content"
+    content.mkdir(parents=True, exist_ok=True)
+    (content / "index.md").write_text("# Home\n\nthe synthetic benchmark corpus\n")
+    for relative, markdown in corpus_pages(corpus):
+        path = content / relative
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(markdown)
+    static = root / "static"
+    (static / "images").mkdir(parents=True, exist_ok=True)
+    (static / "index.css").write_text("body { margin: 0 }\n")
+    (static / "images" / "placeholder.png").write_bytes(bytes(64))
+    for i in range(corpus.assets):
+        (static / "images" / f"asset{i:05}.png").write_bytes(random.Random(f"{corpus.seed}:asset:{i}").randbytes(2048))
+    return root
+
+
+def main() -> None:
+    """Write a corpus to a directory."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("root", type=Path, help="directory to write the site to")
+    parser.add_argument("--pages", type=int, default=DEFAULT_CORPUS.pages)
+    parser.add_argument("--size", type=int, default=DEFAULT_CORPUS.size, help="approximate page size in bytes")
+    parser.add_argument("--assets", type=int, default=DEFAULT_CORPUS.assets, help="number of static files")
+    parser.add_argument("--seed", type=int, default=DEFAULT_CORPUS.seed)
+    parser.add_argument("--mix", type=Mix.parse, default=DEFAULT_MIX, help="weights such as heading=2,code=0,link=0.1")
+    args = parser.parse_args()
+    write_corpus(args.root, Corpus(args.pages, args.size, args.assets, args.seed, args.mix))
+
+
+if __name__ == "__main__":
+    main()
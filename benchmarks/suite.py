@@ -0,0 +1,325 @@
+"""Benchmark suite: inline parsing, block parsing, rendering and whole site builds on a synthetic corpus.
+
+run from the project root with ``python benchmarks/suite.py run -o results.json``, then after a change
+``python benchmarks/suite.py run -o new.json --baseline results.json`` or
+``python benchmarks/suite.py compare results.json new.json``. compare exits with status 1 when a
+benchmark got slower than the threshold allows.
+"""
+
+import argparse
+import json
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any, NamedTuple
+
+from corpus import DEFAULT_CORPUS, DEFAULT_MIX, Corpus, Mix, corpus_pages, make_block, write_corpus
+
+from ssg.block import (
+    BlockType,
+    block_to_block_type,
+    block_to_rule,
+    iter_blocks,
+    iter_lines,
+    markdown_to_blocks,
+    markdown_to_html,
+    markdown_to_html_node,
+)
+from ssg.frozennode import FragmentCache
+from ssg.inline import text_to_html, text_to_textnodes
+from ssg.main import Site, build_site
+from ssg.urls import UrlResolver, using_url_resolver
+
+RESULTS_VERSION = 1
+# blocks every page shares in the fragment cache benchmarks, such as a footer
+BOILERPLATE_BLOCKS = 8
+# best times vary by a few percent between runs on a quiet machine
+DEFAULT_THRESHOLD = 0.15
+
+
+class Workload(NamedTuple):
+    """What the benchmarks run on: the corpus in memory and written out as a site."""
+
+    corpus: Corpus
+    pages: list[str]
+    paragraphs: list[str]
+    site: Site
+
+
+# a benchmark prepares its workload and returns the function to time and the bytes of markdown it reads
+Benchmark = Callable[[Workload], tuple[Callable[[], object], int]]
+
+
+def build_options(**overrides: object) -> argparse.Namespace:
+    """Options of ssg build, as build_site takes them.
+
+    Args:
+        overrides: options to change, such as force=True
+
+    Returns:
+        the options
+    """
+    options: dict[str, object] = {
+        "force": False,
+        "checksum": False,
+        "link": "copy",
+        "copy_workers": 4,
+        "jobs": 1,
+        "strict_links": False,
+        "paths": [],
+        "include": [],
+        "exclude": [],
+        "profile": None,
+        "fragment_cache": 0,
+    }
+    return argparse.Namespace(**(options | overrides))
+
+
+def _size(texts: list[str]) -> int:
+    return sum(len(text.encode()) for text in texts)
+
+
+def bench_inline(workload: Workload) -> tuple[Callable[[], object], int]:
+    """Renders the inline markdown of every paragraph straight to html."""
+    paragraphs = workload.paragraphs
+    return lambda: [text_to_html(paragraph) for paragraph in paragraphs], _size(paragraphs)
+
+
+def bench_inline_textnodes(workload: Workload) -> tuple[Callable[[], object], int]:
+    """Parses every paragraph to TextNodes."""
+    paragraphs = workload.paragraphs
+    return lambda: [text_to_textnodes(paragraph) for paragraph in paragraphs], _size(paragraphs)
+
+
+def bench_blocks(workload: Workload) -> tuple[Callable[[], object], int]:
+    """Splits every page into blocks and classifies them."""
+    pages = workload.pages
+    return lambda: [[block_to_rule(block) for block in markdown_to_blocks(page)] for page in pages], _size(pages)
+
+
+def bench_render(workload: Workload) -> tuple[Callable[[], object], int]:
+    """Renders every page with the markdown_to_html fast path."""
+    pages = workload.pages
+    return lambda: [markdown_to_html(page) for page in pages], _size(pages)
+
+
+def bench_render_tree(workload: Workload) -> tuple[Callable[[], object], int]:
+    """Renders every page through its HTMLNode tree."""
+    pages = workload.pages
+    return lambda: [markdown_to_html_node(page).to_html() for page in pages], _size(pages)
+
+
+def _with_boilerplate(workload: Workload) -> list[str]:
+    corpus = workload.corpus
+    rng = random.Random(f"{corpus.seed}:boilerplate")
+    footer = "\n\n".join(make_block(rng, corpus.mix, corpus.pages) for _ in range(BOILERPLATE_BLOCKS))
+    return [f"{page}\n{footer}\n" for page in workload.pages]
+
+
+def bench_render_boilerplate(workload: Workload) -> tuple[Callable[[], object], int]:
+    """Renders every page followed by the same footer blocks with the markdown_to_html fast path."""
+    pages = _with_boilerplate(workload)
+    return lambda: [markdown_to_html(page) for page in pages], _size(pages)
+
+
+def bench_render_fragment_cache(workload: Workload) -> tuple[Callable[[], object], int]:
+    """Renders the pages of render_boilerplate block by block through a new FragmentCache, as --fragment-cache does."""
+    pages = _with_boilerplate(workload)
+    resolver = UrlResolver("/")
+
+    def run() -> list[str]:
+        cache = FragmentCache()
+        with using_url_resolver(resolver):
+            return [
+                "".join(cache.render_block(block, resolver) for block in iter_blocks(iter_lines(page)))
+                for page in pages
+            ]
+
+    return run, _size(pages)
+
+
+def bench_build(workload: Workload) -> tuple[Callable[[], object], int]:
+    """Builds the whole site from scratch, static files included."""
+    options = build_options(force=True)
+    return lambda: build_site(workload.site, "/", options), _size(workload.pages)
+
+
+def bench_build_noop(workload: Workload) -> tuple[Callable[[], object], int]:
+    """Rebuilds the site when nothing changed, the cost of checking every page and static file."""
+    options = build_options()
+    build_site(workload.site, "/", options)
+    return lambda: build_site(workload.site, "/", options), _size(workload.pages)
+
+
+BENCHMARKS: dict[str, Benchmark] = {
+    "inline": bench_inline,
+    "inline_textnodes": bench_inline_textnodes,
+    "blocks": bench_blocks,
+    "render": bench_render,
+    "render_tree": bench_render_tree,
+    "render_boilerplate": bench_render_boilerplate,
+    "render_fragment_cache": bench_render_fragment_cache,
+    "build": bench_build,
+    "build_noop": bench_build_noop,
+}
+
+
+def timings(run: Callable[[], object], repeat: int) -> list[float]:
+    """Times a function after one warm up call.
+
+    Args:
+        run: function to time
+        repeat: number of timed calls
+
+    Returns:
+        seconds of each timed call
+    """
+    run()
+    runs: list[float] = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        runs.append(time.perf_counter() - start)
+    return runs
+
+
+def run_suite(corpus: Corpus, names: list[str], repeat: int) -> dict[str, Any]:
+    """Runs benchmarks on a corpus.
+
+    Args:
+        corpus: corpus to generate
+        names: benchmarks to run, in order
+        repeat: number of timed runs of each benchmark
+
+    Returns:
+        the results, json serializable
+    """
+    pages = [markdown for _, markdown in corpus_pages(corpus)]
+    paragraphs = [
+        block
+        for page in pages
+        for block in markdown_to_blocks(page)
+        if block_to_block_type(block) == BlockType.PARAGRAPH
+    ]
+    results: dict[str, Any] = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        workload = Workload(corpus, pages, paragraphs, Site.at(write_corpus(Path(tmp), corpus)))
+        for name in names:
+            run, size = BENCHMARKS[name](workload)
+            runs = timings(run, repeat)
+            best = min(runs)
+            results[name] = {
+                "best_s": best,
+                "median_s": statistics.median(runs),
+                "runs_s": runs,
+                "bytes": size,
+                "mb_s": size / best / 1_000_000,
+            }
+            print(f"{name:<22} best {best * 1000:9.2f} ms  median {statistics.median(runs) * 1000:9.2f} ms")
+    return {
+        "version": RESULTS_VERSION,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "corpus": corpus._replace(mix=corpus.mix._asdict())._asdict(),
+        "repeat": repeat,
+        "benchmarks": results,
+    }
+
+
+def compare(baseline: dict[str, Any], current: dict[str, Any], threshold: float) -> list[str]:
+    """Compares the best times of two runs and prints a line per benchmark they have in common.
+
+    Args:
+        baseline: results of the reference run
+        current: results of the run to check
+        threshold: relative slowdown of the best time, such as 0.1, above which a benchmark regressed
+
+    Returns:
+        names of the benchmarks that regressed
+    """
+    for key in ("corpus", "python", "repeat"):
+        if baseline.get(key) != current.get(key):
+            print(f"warning: the runs differ in {key}: {baseline.get(key)} against {current.get(key)}")
+    regressions: list[str] = []
+    for name, result in current["benchmarks"].items():
+        if name not in baseline["benchmarks"]:
+            continue
+        before = baseline["benchmarks"][name]["best_s"]
+        change = result["best_s"] / before - 1
+        flag = ""
+        if change > threshold:
+            flag = "REGRESSION"
+            regressions.append(name)
+        elif change < -threshold:
+            flag = "faster"
+        print(f"{name:<22} {before * 1000:9.2f} ms -> {result['best_s'] * 1000:9.2f} ms  {change:+7.1%}  {flag}")
+    return regressions
+
+
+def _load(path: Path) -> dict[str, Any]:
+    results = json.loads(path.read_text())
+    if results.get("version") != RESULTS_VERSION:
+        msg = f"{path} holds results of another version of the suite"
+        raise SystemExit(msg)
+    return results
+
+
+def _compare_files(baseline: Path, current: dict[str, Any], threshold: float) -> int:
+    regressions = compare(_load(baseline), current, threshold)
+    if regressions:
+        print(f"{len(regressions)} regressions above {threshold:.0%}: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+def main() -> None:
+    """Run the suite or compare two runs."""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="run the benchmarks")
+    run.add_argument("-o", "--output", type=Path, help="write the results to this json file")
+    run.add_argument("-k", dest="names", action="append", choices=list(BENCHMARKS), help="only run this benchmark")
+    run.add_argument("--repeat", type=int, default=5, help="timed runs of each benchmark, the best one counts")
+    run.add_argument("--pages", type=int, default=DEFAULT_CORPUS.pages)
+    run.add_argument("--size", type=int, default=DEFAULT_CORPUS.size, help="approximate page size in bytes")
+    run.add_argument("--assets", type=int, default=DEFAULT_CORPUS.assets, help="number of static files")
+    run.add_argument("--seed", type=int, default=DEFAULT_CORPUS.seed)
+    run.add_argument("--mix", type=Mix.parse, default=DEFAULT_MIX, help="weights such as heading=2,code=0,link=0.1")
+    run.add_argument("--baseline", type=Path, help="compare the results with this earlier run")
+    run.add_argument(
+        "--threshold",
+        type=float,
+        default=DEFAULT_THRESHOLD,
+        help=f"slowdown flagged as a regression (default {DEFAULT_THRESHOLD})",
+    )
+
+    check = commands.add_parser("compare", help="compare two runs")
+    check.add_argument("baseline", type=Path)
+    check.add_argument("current", type=Path)
+    check.add_argument(
+        "--threshold",
+        type=float,
+        default=DEFAULT_THRESHOLD,
+        help=f"slowdown flagged as a regression (default {DEFAULT_THRESHOLD})",
+    )
+    args = parser.parse_args()
+
+    if args.command == "compare":
+        sys.exit(_compare_files(args.baseline, _load(args.current), args.threshold))
+
+    corpus = Corpus(args.pages, args.size, args.assets, args.seed, args.mix)
+    results = run_suite(corpus, args.names or list(BENCHMARKS), args.repeat)
+    if args.output is not None:
+        args.output.write_text(json.dumps(results, indent=2) + "\n")
+    if args.baseline is not None:
+        sys.exit(_compare_files(args.baseline, results, args.threshold))
+
+
+if __name__ == "__main__":
+    main()
@@ -1 +1 @@
-python3 src/ssg/main.py "static-site-generator/"
+python3 src/ssg/main.py build --base-path "static-site-generator/"
@@ -1,2 +1 @@
-python src/ssg/main.py
-cd docs && python -m http.server 8888
+python src/ssg/main.py watch --port 8888
@@ -0,0 +1,5 @@
+"""Runs the static site generator with ``python -m ssg``."""
+
+from ssg.main import main
+
+main()
@@ -0,0 +1,345 @@
+"""Incremental sync of the static asset tree into the output directory."""
+
+from __future__ import annotations
+
+import logging
+import os
+import shutil
+import stat
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from enum import Enum
+from functools import partial
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from ssg.manifest import hash_file, prune_empty_dirs
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+
+logger = logging.getLogger(__name__)
+
+# ioctl request cloning a whole file, from linux/fs.h
+_FICLONE = 0x40049409
+_CHUNK = 1 << 30 if sys.maxsize > 2**32 else 1 << 20
+_BUFFER = 1 << 20
+
+# same default as ThreadPoolExecutor, copying is bound by I/O rather than by cores
+DEFAULT_WORKERS = min(32, (os.cpu_count() or 1) + 4)
+
+
+class LinkMode(Enum):
+    """How an asset is placed in the output directory."""
+
+    COPY = "copy"
+    HARDLINK = "hardlink"
+    REFLINK = "reflink"
+
+
+class SyncStats:
+    """Counters of one sync_tree run."""
+
+    def __init__(self) -> None:
+        """SyncStats constructor."""
+        self.copied: int = 0
+        self.linked: int = 0
+        self.skipped: int = 0
+        self.deleted: int = 0
+        self.bytes_copied: int = 0
+        self.bytes_skipped: int = 0
+        self.assets: list[str] = []
+
+    def add(self, asset: str, size: int, *, linked: bool | None) -> None:
+        """Counts one asset of the source tree.
+
+        Args:
+            asset: path of the asset relative to the tree
+            size: size of the asset in bytes
+            linked: None when the asset was unchanged, else whether it was linked rather than copied
+        """
+        self.assets.append(asset)
+        if linked is None:
+            self.skipped += 1
+            self.bytes_skipped += size
+            return
+        if linked:
+            self.linked += 1
+        else:
+            self.copied += 1
+        self.bytes_copied += size
+
+    def log_stats(self) -> None:
+        """Writes the counters to the build log."""
+        logger.info(
+            "assets: %d copied, %d linked (%d bytes), %d unchanged (%d bytes), %d deleted",
+            self.copied,
+            self.linked,
+            self.bytes_copied,
+            self.skipped,
+            self.bytes_skipped,
+            self.deleted,
+        )
+
+
+def _is_unchanged(
+    source: Path, dest: Path, source_stat: os.stat_result, dest_stat: os.stat_result, *, checksum: bool
+) -> bool:
+    if source_stat.st_size != dest_stat.st_size:
+        return False
+    if (source_stat.st_dev, source_stat.st_ino) == (dest_stat.st_dev, dest_stat.st_ino):
+        return True
+    if checksum:
+        return hash_file(source) == hash_file(dest)
+    return source_stat.st_mtime_ns == dest_stat.st_mtime_ns
+
+
+def _reflink(source: Path, dest: Path) -> None:
+    import fcntl  # noqa: PLC0415
+
+    with source.open("rb") as src, dest.open("wb") as dst:
+        fcntl.ioctl(dst.fileno(), _FICLONE, src.fileno())
+    shutil.copystat(source, dest)
+
+
+def _copy_file_range(infd: int, outfd: int, offset: int) -> int:
+    return os.copy_file_range(infd, outfd, _CHUNK, offset, offset)
+
+
+def _sendfile(infd: int, outfd: int, offset: int) -> int:
+    return os.sendfile(outfd, infd, offset, _CHUNK)
+
+
+# in kernel copies, best first: copy_file_range can clone or copy on the device, sendfile avoids the
+# copy to user space
+_KERNEL_COPIES = [
+    copy for name, copy in [("copy_file_range", _copy_file_range), ("sendfile", _sendfile)] if hasattr(os, name)
+]
+
+
+def _kernel_copy(infd: int, outfd: int) -> bool:
+    """Copies a whole file inside the kernel.
+
+    Returns:
+        False when no kernel copy works for these files and nothing was copied, so the caller must
+        copy in user space
+    """
+    for copy in _KERNEL_COPIES:
+        offset = 0
+        try:
+            while sent := copy(infd, outfd, offset):
+                offset += sent
+        except OSError:
+            # not supported between these file systems, or by this kernel
+            if offset:
+                raise
+            continue
+        return True
+    return False
+
+
+def copy_file(source: str | Path, dest: str | Path, source_stat: os.stat_result | None = None) -> None:
+    """Copies the content, permissions and modification time of a file.
+
+    The data is copied inside the kernel where possible, so it never passes through Python, and the
+    files are handled through bare descriptors to keep the per file cost down.
+
+    Args:
+        source: file to copy
+        dest: file to write, overwritten in place if it exists
+        source_stat: stat result of source, when the caller already has it
+    """
+    if source_stat is None:
+        source_stat = Path(source).stat()
+    infd = os.open(source, os.O_RDONLY)
+    try:
+        outfd = os.open(dest, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        try:
+            if not _kernel_copy(infd, outfd):
+                with os.fdopen(infd, "rb", closefd=False) as src, os.fdopen(outfd, "wb", closefd=False) as dst:
+                    shutil.copyfileobj(src, dst, _BUFFER)
+        finally:
+            os.close(outfd)
+    finally:
+        os.close(infd)
+    Path(dest).chmod(stat.S_IMODE(source_stat.st_mode))
+    os.utime(dest, ns=(source_stat.st_atime_ns, source_stat.st_mtime_ns))
+
+
+def _link(source: Path, target: Path, link: LinkMode) -> bool:
+    try:
+        if link is LinkMode.HARDLINK:
+            target.unlink(missing_ok=True)
+            target.hardlink_to(source)
+        else:
+            _reflink(source, target)
+    except (OSError, ImportError):
+        # other file system, or no reflink support: the caller copies instead
+        logger.debug("can not %s %s, copying it", link.value, source)
+        return False
+    return True
+
+
+def _place(source: Path, dest: Path, source_stat: os.stat_result, link: LinkMode, *, replace: bool) -> bool:
+    """Puts a copy or link of source at dest.
+
+    An existing dest is replaced atomically through a temporary file, which also keeps a dest that is
+    a hardlink from being written through. A new dest is written directly.
+
+    Returns:
+        True when the file was linked, False when it was copied
+    """
+    target = dest
+    if replace:
+        fd, name = tempfile.mkstemp(dir=dest.parent, prefix=f".{dest.name}.", suffix=".tmp")
+        os.close(fd)
+        target = Path(name)
+    try:
+        linked = link is not LinkMode.COPY and _link(source, target, link)
+        if not linked:
+            copy_file(source, target, source_stat)
+        if replace:
+            _ = target.replace(dest)
+    except BaseException:
+        target.unlink(missing_ok=True)
+        raise
+    return linked
+
+
+def scan_tree(source: str | Path) -> tuple[list[str], list[tuple[str, os.stat_result]]]:
+    """Lists a tree with os.scandir, reusing the stat results of the directory entries.
+
+    Args:
+        source: root of the tree
+
+    Returns:
+        the directories and the files with their stat results, as paths relative to source, in
+        name order with the files of a directory before its subdirectories
+    """
+    directories: list[str] = []
+    files: list[tuple[str, os.stat_result]] = []
+    stack = [""]
+    while stack:
+        relative = stack.pop()
+        with os.scandir(Path(source) / relative) as scan:
+            entries = sorted(scan, key=lambda entry: entry.name)
+        subdirectories: list[str] = []
+        for entry in entries:
+            path = f"{relative}/{entry.name}" if relative else entry.name
+            if entry.is_dir():
+                subdirectories.append(path)
+            else:
+                files.append((path, entry.stat()))
+        directories.extend(subdirectories)
+        stack.extend(reversed(subdirectories))
+    return directories, files
+
+
+def _sync_file(
+    source: Path, dest: Path, item: tuple[str, os.stat_result], *, checksum: bool, link: LinkMode
+) -> bool | None:
+    """Copies one file of the tree unless it is unchanged.
+
+    Returns:
+        None when the file was unchanged, else whether it was linked rather than copied
+    """
+    relative, source_stat = item
+    src = source / relative
+    target = dest / relative
+    try:
+        dest_stat = target.stat()
+    except FileNotFoundError:
+        dest_stat = None
+    if dest_stat is not None and _is_unchanged(src, target, source_stat, dest_stat, checksum=checksum):
+        return None
+    logger.debug("copying %s to %s", src, target)
+    return _place(src, target, source_stat, link, replace=dest_stat is not None)
+
+
+def sync_asset(
+    source: str | Path, dest: str | Path, relative: str, *, checksum: bool = False, link: LinkMode = LinkMode.COPY
+) -> bool | None:
+    """Brings one file of dest up to date with the same file of source, see sync_tree.
+
+    Args:
+        source: root of the asset tree
+        dest: root of the output tree
+        relative: path of the file relative to both roots
+        checksum: compare content hashes instead of modification times
+        link: hardlink or reflink the file instead of copying it when the file system allows it
+
+    Returns:
+        None when the file was unchanged, else whether it was linked rather than copied
+    """
+    source = Path(source)
+    dest = Path(dest)
+    (dest / relative).parent.mkdir(parents=True, exist_ok=True)
+    return _sync_file(source, dest, (relative, (source / relative).stat()), checksum=checksum, link=link)
+
+
+def sync_tree(  # noqa: PLR0913
+    source: str | Path,
+    dest: str | Path,
+    previous: Iterable[str] = (),
+    *,
+    checksum: bool = False,
+    link: LinkMode = LinkMode.COPY,
+    workers: int = DEFAULT_WORKERS,
+) -> SyncStats:
+    """Brings the files of dest up to date with the files of source, writing only what changed.
+
+    A file is unchanged when its destination has the same size and modification time, or the same
+    size and content hash when checksum is set. Files of an earlier sync that are no longer in source
+    are deleted; any other file in dest, such as a generated page, is left alone.
+
+    The tree is scanned first and every directory is created up front, then the files are compared
+    and copied by a pool of threads. Copying is mostly spent in system calls that release the GIL,
+    so the threads keep the disk busy rather than waiting on Python.
+
+    Args:
+        source: root of the asset tree
+        dest: root of the output tree
+        previous: assets of the previous sync, as paths relative to dest, see SyncStats.assets
+        checksum: compare content hashes instead of modification times
+        link: hardlink or reflink files instead of copying them when the file system allows it
+        workers: number of threads copying files, 1 copies them in the calling thread
+
+    Returns:
+        counters of the sync, and the assets now in dest
+
+    Raises:
+        FileNotFoundError: source is not a directory, or dest is not a directory
+    """
+    source = Path(source)
+    dest = Path(dest)
+    if not source.is_dir():
+        msg = f"{source} is not a directory"
+        raise FileNotFoundError(msg)
+    if dest.exists() and not dest.is_dir():
+        msg = f"{dest} is not a directory"
+        raise FileNotFoundError(msg)
+
+    directories, files = scan_tree(source)
+    dest.mkdir(parents=True, exist_ok=True)
+    for directory in directories:
+        (dest / directory).mkdir(exist_ok=True)
+
+    sync_file = partial(_sync_file, source, dest, checksum=checksum, link=link)
+    stats = SyncStats()
+    if workers > 1 and len(files) > 1:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(sync_file, files))
+    else:
+        results = [sync_file(item) for item in files]
+    for (relative, src_stat), linked in zip(files, results, strict=True):
+        stats.add(relative, src_stat.st_size, linked=linked)
+
+    for stale in sorted(set(previous) - set(stats.assets)):
+        path = dest / stale
+        if path.is_file():
+            path.unlink()
+            stats.deleted += 1
+            logger.info("removed stale asset %s", path)
+            prune_empty_dirs(path.parent, dest)
+    return stats
@@ -1,10 +1,17 @@
 """Handles markdown Blocks and converts them to HTMLNode tree representation."""
 
 import re
+from collections.abc import Callable, Iterable, Iterator
 from enum import Enum
+from typing import override
 
-from ssg.htmlnode import HTMLNode, ParentNode
-from ssg.inline import text_node_to_html_node, text_to_textnodes
+from ssg.escape import escape_attr
+from ssg.highlight import highlight, normalize_language
+from ssg.htmlnode import HTMLNode, ParentNode, RawNode
+from ssg.inline import iter_spans, render_spans, text_to_html_nodes
+
+# a line opening or closing a fenced code block, the info string can not contain backticks
+_FENCE_PATTERN = re.compile(r" {0,3}```[^`]*$")
 
 
 class BlockType(Enum):
@@ -15,6 +22,7 @@ class BlockType(Enum):
         UL (str): unordered list block type.
         OL (srt): ordered list block type.
         QUOTE (str): quote block type.
+        CODE (str): fenced code block type.
         PARAGRAPH (str): Paragraph block type.
     """
 
@@ -22,9 +30,65 @@ class BlockType(Enum):
     UL = "unorderd"
     OL = "ordered"
     QUOTE = "quote"
+    CODE = "code"
     PARAGRAPH = "paragraph"
 
 
+def iter_lines(text: str) -> Iterator[str]:
+    """Yields the lines of a string one at a time, keeping their line endings.
+
+    Unlike str.splitlines this only splits on newlines and does not build a list of every line.
+
+    Args:
+        text: text to split
+
+    Yields:
+        each line of the text
+    """
+    start = 0
+    while (end := text.find("\n", start) + 1) != 0:
+        yield text[start:end]
+        start = end
+    if start < len(text):
+        yield text[start:]
+
+
+def iter_blocks(lines: Iterable[str]) -> Iterator[str]:
+    """Groups lines into markdown blocks, yielding each block as soon as it is complete.
+
+    A markdown file is understood to be a collection of blocks separated by an empty line. lines can
+    be an open file or any other iterable of lines, only the lines of the current block are held in
+    memory. Runs of several empty lines do not produce empty blocks. Empty lines inside a fenced
+    code block do not end the block.
+
+    Args:
+        lines: lines of a markdown file, with or without their line endings
+
+    Yields:
+        each block, stripped of surrounding whitespace
+    """
+    block: list[str] = []
+    in_fence = False
+    fence = _FENCE_PATTERN.match
+    for line in lines:
+        stripped = line.rstrip("\r\n")
+        if stripped:
+            if fence(stripped):
+                in_fence = not in_fence
+            block.append(stripped)
+            continue
+        if in_fence:
+            block.append(stripped)
+            continue
+        if block:
+            text = "\n".join(block).strip()
+            block.clear()
+            if text:
+                yield text
+    if block and (text := "\n".join(block).strip()):
+        yield text
+
+
 def markdown_to_blocks(markdown: str) -> list[str]:
     """Takes a string that represents a whole block.
 
@@ -36,38 +100,298 @@ def markdown_to_blocks(markdown: str) -> list[str]:
     Returns:
         list of strings each representing a block in the original
     """
-    blocks = markdown.split("\n\n")
-    return [block.strip() for block in blocks]
+    return list(iter_blocks(iter_lines(markdown)))
+
+
+BlockKind = BlockType | str
+"""Built-in blocks use BlockType, blocks added with register_block_rule may use any string."""
+
+BlockHandler = Callable[[str], HTMLNode]
+BlockRenderer = Callable[[str, list[str]], None]
+
+
+class BlockRule:
+    """Rule that recognises one kind of markdown block and builds its HTMLNode.
+
+    A block matches a rule when its start matches the start pattern and every one of its lines
+    matches the line pattern. A rule without either pattern matches every block. A rule may also have
+    a renderer that appends the block's html straight to a list of fragments, which markdown_to_html
+    uses instead of building the HTMLNode; it must produce exactly what the handler's node renders to.
+    """
+
+    def __init__(
+        self,
+        block_type: BlockKind,
+        handler: BlockHandler,
+        start: str | None = None,
+        line: str | None = None,
+        render: BlockRenderer | None = None,
+    ) -> None:
+        """BlockRule constructor, the patterns are compiled once here.
+
+        Args:
+            block_type: type reported for matching blocks
+            handler: builds the HTMLNode for a matching block
+            start: regex that must match at the start of the block
+            line: regex that must match at the start of every line of the block
+            render: appends the html of a matching block to a list, without building nodes
+        """
+        self.block_type: BlockKind = block_type
+        self.handler: BlockHandler = handler
+        self.start: re.Pattern[str] | None = re.compile(start) if start is not None else None
+        self.line: re.Pattern[str] | None = re.compile(line) if line is not None else None
+        self.render: BlockRenderer | None = render
+
+    @override
+    def __repr__(self) -> str:
+        return f"BlockRule({self.block_type}, {self.start}, {self.line})"
+
+
+def _header_parts(block: str) -> tuple[str, str]:
+    hashtag, head = block.split(maxsplit=1)
+    return f"h{len(hashtag)}", head
+
+
+def _quote_text(block: str) -> str:
+    return "\n".join(map(str.strip, block.replace(">", "").split("\n")))
+
+
+def _ul_items(block: str) -> list[str]:
+    list_items = block.split("\n* ")
+    if list_items[0] == block:
+        list_items = block.split("\n- ")
+    return [re.sub(r"^[-\*] ", "", item) for item in list_items if item != ""]
+
+
+def _ol_items(block: str) -> list[str]:
+    list_items = re.sub(r"[\n]?\d+\. ", "|%<~DEL~>%|", block).split("|%<~DEL~>%|")
+    return [item for item in list_items if item != ""]
+
+
+def _code_parts(block: str) -> tuple[dict[str, str] | None, str]:
+    lines = block.split("\n")
+    language = lines[0].lstrip("`").strip()
+    if len(lines) > 1 and _FENCE_PATTERN.match(lines[-1]):
+        lines.pop()
+    code = "\n".join(lines[1:])
+    if not language:
+        return None, highlight(code, "")
+    return {"class": f"language-{normalize_language(language)}"}, highlight(code, language)
+
+
+def _header_to_html_node(block: str) -> HTMLNode:
+    tag, head = _header_parts(block)
+    return ParentNode(tag=tag, children=text_to_html_nodes(head))
+
+
+def _quote_to_html_node(block: str) -> HTMLNode:
+    return ParentNode(tag="blockquote", children=text_to_html_nodes(_quote_text(block)))
+
+
+def _ul_to_html_node(block: str) -> HTMLNode:
+    list_item_nodes: list[HTMLNode] = [
+        ParentNode(tag="li", children=text_to_html_nodes(item)) for item in _ul_items(block)
+    ]
+    return ParentNode(tag="ul", children=list_item_nodes)
+
+
+def _ol_to_html_node(block: str) -> HTMLNode:
+    list_item_nodes: list[HTMLNode] = [
+        ParentNode(tag="li", children=text_to_html_nodes(item)) for item in _ol_items(block)
+    ]
+    return ParentNode(tag="ol", children=list_item_nodes)
+
+
+def _code_to_html_node(block: str) -> HTMLNode:
+    props, code = _code_parts(block)
+    # the highlighter already escaped the code
+    return ParentNode(tag="pre", children=[RawNode(code, "code", props)])
+
+
+def _paragraph_to_html_node(block: str) -> HTMLNode:
+    return ParentNode(tag="p", children=text_to_html_nodes(block))
+
+
+def _render_inline(tag: str, text: str, out: list[str]) -> None:
+    out.append(f"<{tag}>")
+    size = len(out)
+    render_spans(text, iter_spans(text), out)
+    if len(out) == size:
+        # same error as the empty ParentNode the tree would have built
+        msg = "children can not be None"
+        raise ValueError(msg)
+    out.append(f"</{tag}>")
+
+
+def _render_items(tag: str, items: list[str], out: list[str]) -> None:
+    if not items:
+        msg = "children can not be None"
+        raise ValueError(msg)
+    out.append(f"<{tag}>")
+    for item in items:
+        _render_inline("li", item, out)
+    out.append(f"</{tag}>")
+
+
+def _render_header(block: str, out: list[str]) -> None:
+    tag, head = _header_parts(block)
+    _render_inline(tag, head, out)
+
+
+def _render_quote(block: str, out: list[str]) -> None:
+    _render_inline("blockquote", _quote_text(block), out)
+
+
+def _render_ul(block: str, out: list[str]) -> None:
+    _render_items("ul", _ul_items(block), out)
+
+
+def _render_ol(block: str, out: list[str]) -> None:
+    _render_items("ol", _ol_items(block), out)
+
+
+def _render_code(block: str, out: list[str]) -> None:
+    props, code = _code_parts(block)
+    attributes = "" if props is None else f' class="{escape_attr(props["class"])}"'
+    out.append(f"<pre><code{attributes}>{code}</code></pre>")
+
+
+def _render_paragraph(block: str, out: list[str]) -> None:
+    _render_inline("p", block, out)
+
+
+_PARAGRAPH_RULE = BlockRule(BlockType.PARAGRAPH, _paragraph_to_html_node, render=_render_paragraph)
+
+# tried in order, the paragraph rule matches everything and always stays last
+_BLOCK_RULES: list[BlockRule] = [
+    BlockRule(BlockType.CODE, _code_to_html_node, start=r"```[^`\n]*(?:\n|$)", render=_render_code),
+    BlockRule(BlockType.HEADER, _header_to_html_node, start=r"#{1,6} ", render=_render_header),
+    BlockRule(BlockType.QUOTE, _quote_to_html_node, line=r">", render=_render_quote),
+    BlockRule(BlockType.UL, _ul_to_html_node, line=r"\*", render=_render_ul),
+    BlockRule(BlockType.UL, _ul_to_html_node, line=r"-", render=_render_ul),
+    BlockRule(BlockType.OL, _ol_to_html_node, line=r"\s*\d\.", render=_render_ol),
+    _PARAGRAPH_RULE,
+]
+
+
+def register_block_rule(rule: BlockRule) -> None:
+    """Adds a block rule, it is tried before every rule registered earlier and the built-in ones.
+
+    Args:
+        rule: the rule to add
+    """
+    _BLOCK_RULES.insert(0, rule)
+
 
+def unregister_block_rule(block_type: BlockKind) -> None:
+    """Removes every registered rule for a block type.
+
+    Args:
+        block_type: the type of the rules to remove
+
+    Raises:
+        ValueError: the paragraph rule can not be removed
+    """
+    if block_type == BlockType.PARAGRAPH:
+        msg = "the paragraph rule can not be removed"
+        raise ValueError(msg)
+    _BLOCK_RULES[:] = [rule for rule in _BLOCK_RULES if rule.block_type != block_type]
+
+
+def block_to_rule(block: str) -> BlockRule:
+    """Finds the first rule matching a block, reading the block's lines at most once.
+
+    start patterns are checked first, then the lines are walked a single time while the rules with a
+    line pattern that still match are narrowed down, stopping as soon as none are left.
+
+    Args:
+        block: original block
 
-def block_to_block_type(block: str) -> BlockType:
+    Returns:
+        the matching rule
+    """
+    pending: list[tuple[BlockRule, re.Pattern[str]]] = []
+    fallback = _PARAGRAPH_RULE
+    for rule in _BLOCK_RULES:
+        if rule.start is not None and not rule.start.match(block):
+            continue
+        if rule.line is None:
+            fallback = rule
+            break
+        pending.append((rule, rule.line))
+
+    if pending:
+        for line in iter_lines(block):
+            pending = [pair for pair in pending if pair[1].match(line)]
+            if not pending:
+                return fallback
+        return pending[0][0]
+    return fallback
+
+
+def block_to_block_type(block: str) -> BlockKind:
     r"""Takes a single markdown block and performs pattern mattching to return the type of block it is.
 
+    starting with ``` on a line of its own is a fenced code block
     starting with 1-6 # is a header
     each line starting with > is a quote
     each line starting with \* or - is unordered list
     \d\. at the start of every line is an ordered list
     else just a paragraph
 
+    Rules added with register_block_rule are tried first.
+
     Args:
         block: original block
 
     Returns:
         block type
     """
-    pattern = re.compile(r"^#{1,6} ")
-    if re.match(pattern, block):
-        return BlockType.HEADER
-    lines = block.split("\n")
-    if all(x[0] == ">" for x in lines):
-        return BlockType.QUOTE
-    if all(x[0] == "*" for x in lines) or all(x[0] == "-" for x in lines):
-        return BlockType.UL
+    return block_to_rule(block).block_type
+
+
+def block_to_html_node(block: str, block_type: BlockKind | None = None) -> HTMLNode:
+    """Converts a single markdown block to its HTMLNode tree.
+
+    Args:
+        block: original block
+        block_type: type of the block, classified from the block when not given
+
+    Returns:
+        HTMLNode for the block
+    """
+    if block_type is None:
+        return block_to_rule(block).handler(block)
+    for rule in _BLOCK_RULES:
+        if rule.block_type == block_type:
+            return rule.handler(block)
+    return _PARAGRAPH_RULE.handler(block)
+
 
-    pattern = re.compile(r"^\s*\d\.")
-    if all(re.match(pattern, x) for x in lines):
-        return BlockType.OL
-    return BlockType.PARAGRAPH
+def iter_classified_blocks(lines: Iterable[str]) -> Iterator[tuple[BlockKind, str]]:
+    """Streams the blocks of a markdown file together with their block type.
+
+    Args:
+        lines: lines of a markdown file, such as an open file
+
+    Yields:
+        (block type, block) for each block, in order
+    """
+    for block in iter_blocks(lines):
+        yield block_to_rule(block).block_type, block
+
+
+def iter_block_nodes(lines: Iterable[str]) -> Iterator[HTMLNode]:
+    """Streams the HTMLNode of each block of a markdown file, one block at a time.
+
+    Args:
+        lines: lines of a markdown file, such as an open file
+
+    Yields:
+        HTMLNode for each block, in order
+    """
+    for block in iter_blocks(lines):
+        yield block_to_rule(block).handler(block)
 
 
 def markdown_to_html_node(markdown: str) -> ParentNode:
@@ -79,41 +403,60 @@ def markdown_to_html_node(markdown: str) -> ParentNode:
     Returns:
         single HTMLNode that is the head of the HTMLNode tree for the content
     """
-    blocks = markdown_to_blocks(markdown)
-    block_nodes: list[HTMLNode] = []
-    for block in blocks:
-        block_type = block_to_block_type(block)
-        match block_type:
-            case BlockType.HEADER:
-                hashtag, head = block.split(maxsplit=1)
-                tag = f"h{len(hashtag)}"
-                children = list(map(text_node_to_html_node, text_to_textnodes(head)))
-                block_nodes.append(ParentNode(tag=tag, children=children))
-            case BlockType.PARAGRAPH:
-                children = list(map(text_node_to_html_node, text_to_textnodes(block)))
-                block_nodes.append(ParentNode(tag="p", children=children))
-            case BlockType.QUOTE:
-                quote = "\n".join(map(str.strip, block.replace(">", "").split("\n")))
-                children = list(map(text_node_to_html_node, text_to_textnodes(quote)))
-                block_nodes.append(ParentNode(tag="blockquote", children=children))
-            case BlockType.UL:
-                list_items = block.split("\n* ")
-                if list_items[0] == block:
-                    list_items = block.split("\n- ")
-                list_items = [re.sub(r"^[-\*] ", "", item) for item in list_items if item != ""]
-                list_item_nodes: list[HTMLNode] = []
-                for item in list_items:
-                    children = list(map(text_node_to_html_node, text_to_textnodes(item)))
-                    list_item_nodes.append(ParentNode(tag="li", children=children))
-                block_nodes.append(ParentNode(tag="ul", children=list_item_nodes))
-            case BlockType.OL:
-                block = re.sub(r"[\n]?\d+\. ", "|%<~DEL~>%|", block)  # noqa: PLW2901
-                list_items = block.split("|%<~DEL~>%|")
-                list_items = [item for item in list_items if item != ""]
-                list_item_nodes = []
-                for item in list_items:
-                    children = list(map(text_node_to_html_node, text_to_textnodes(item)))
-                    list_item_nodes.append(ParentNode(tag="li", children=children))
-                block_nodes.append(ParentNode(tag="ol", children=list_item_nodes))
-
-    return ParentNode(tag="div", children=block_nodes)
+    return ParentNode(tag="div", children=list(iter_block_nodes(iter_lines(markdown))))
+
+
+def render_block(block: str, out: list[str]) -> None:
+    """Appends the html of a single block to a list of fragments, without building its HTMLNode.
+
+    Rules without a renderer fall back to rendering the node built by their handler.
+
+    Args:
+        block: original block
+        out: list of html fragments to append to
+    """
+    rule = block_to_rule(block)
+    if rule.render is not None:
+        rule.render(block, out)
+    else:
+        out.extend(rule.handler(block).iter_html())
+
+
+def iter_markdown_html(lines: Iterable[str]) -> Iterator[str]:
+    """Streams the html of a markdown file one block at a time, without building any HTMLNode tree.
+
+    The output is byte for byte what markdown_to_html_node(...).to_html() returns.
+
+    Args:
+        lines: lines of a markdown file, such as an open file
+
+    Yields:
+        html of the wrapping div and of each block, in order
+
+    Raises:
+        ValueError: the markdown has no blocks
+    """
+    yield "<div>"
+    out: list[str] = []
+    empty = True
+    for block in iter_blocks(lines):
+        render_block(block, out)
+        yield "".join(out)
+        out.clear()
+        empty = False
+    if empty:
+        msg = "children can not be None"
+        raise ValueError(msg)
+    yield "</div>"
+
+
+def markdown_to_html(markdown: str) -> str:
+    """Converts a whole md file straight to html, the fast path for callers that only need the text.
+
+    Args:
+        markdown: full md file
+
+    Returns:
+        html text, identical to markdown_to_html_node(markdown).to_html()
+    """
+    return "".join(iter_markdown_html(iter_lines(markdown)))
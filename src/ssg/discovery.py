@@ -0,0 +1,103 @@
+"""Discovery of the markdown pages of a site, before anything is rendered."""
+
+from __future__ import annotations
+
+import fnmatch
+import logging
+import os
+from pathlib import Path
+from typing import TYPE_CHECKING, NamedTuple
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Sequence
+
+logger = logging.getLogger(__name__)
+
+
+class PageSource(NamedTuple):
+    """A markdown page found by discover_pages and the html page it is built to."""
+
+    source: Path
+    dest: Path
+    size: int
+
+
+def _matches(relative: str, patterns: Sequence[str]) -> bool:
+    return any(fnmatch.fnmatchcase(relative, pattern) for pattern in patterns)
+
+
+def is_selected(relative: str, include: Sequence[str] = (), exclude: Sequence[str] = ()) -> bool:
+    """Tells whether the include and exclude patterns of discover_pages keep a page.
+
+    Args:
+        relative: posix path of the page relative to content, such as ``blog/post.md``
+        include: see discover_pages
+        exclude: see discover_pages
+
+    Returns:
+        whether the page is kept
+    """
+    return (not include or _matches(relative, include)) and not _matches(relative, exclude)
+
+
+def discover_pages(
+    content: str | Path,
+    dest: str | Path,
+    roots: Iterable[str | Path] = (),
+    *,
+    include: Sequence[str] = (),
+    exclude: Sequence[str] = (),
+) -> list[PageSource]:
+    """Lists the pages of a site with one os.scandir walk, without reading any of them.
+
+    Directories are walked depth first in name order, so the pages always come out in the same order.
+    ``content/blog/post.md`` is built to ``dest/blog/post.html``.
+
+    Args:
+        content: directory of the markdown sources
+        dest: directory the html pages are written to
+        roots: files and directories inside content to limit the walk to, all of content when empty
+        include: when given, only pages whose path relative to content matches one of these fnmatch
+            patterns are kept, such as ``blog/*``
+        exclude: pages whose path relative to content matches one of these patterns are left out
+
+    Returns:
+        the pages, with the size of their source in bytes
+
+    Raises:
+        ValueError: a root is not inside content
+    """
+    content = Path(content)
+    dest = Path(dest)
+    # entries still to visit: path, path relative to content, whether it is a directory, and the
+    # scandir entry, None for the roots
+    stack: list[tuple[str, str, bool, os.DirEntry[str] | None]] = []
+    for root in reversed(list(roots) or [content]):
+        root_path = Path(root)
+        try:
+            relative = root_path.relative_to(content).as_posix()
+        except ValueError:
+            msg = f"{root} is not inside {content}"
+            raise ValueError(msg) from None
+        stack.append((str(root_path), "" if relative == "." else relative, root_path.is_dir(), None))
+
+    pages: list[PageSource] = []
+    while stack:
+        path, relative, is_dir, entry = stack.pop()
+        if is_dir:
+            with os.scandir(path) as scan:
+                entries = sorted(scan, key=lambda child: child.name)
+            prefix = f"{relative}/" if relative else ""
+            stack.extend((child.path, prefix + child.name, child.is_dir(), child) for child in reversed(entries))
+            continue
+        name = relative.rpartition("/")[2]
+        if not name.endswith(".md"):
+            continue
+        if not is_selected(relative, include, exclude):
+            continue
+        output = dest / relative.removesuffix(name) / name.replace(".md", ".html")
+        # the scandir entry caches its stat, and on Windows already got it with the directory listing
+        stat = Path(path).stat() if entry is None else entry.stat()
+        pages.append(PageSource(Path(path), output, stat.st_size))
+    logger.info("discovered %d pages, %d bytes of markdown", len(pages), sum(page.size for page in pages))
+    return pages
@@ -0,0 +1,35 @@
+"""Escaping of text and attribute values for the rendered html."""
+
+_TEXT_TABLE = str.maketrans({"&": "&amp;", "<": "&lt;", ">": "&gt;"})
+_ATTR_TABLE = str.maketrans({"&": "&amp;", "<": "&lt;", ">": "&gt;", '"': "&quot;"})
+
+
+def escape_text(text: str) -> str:
+    """Escapes &, < and > so text can be placed between tags.
+
+    Most text has none of these characters, so they are looked for first and such text is returned as
+    it is, without a copy.
+
+    Args:
+        text: text to escape
+
+    Returns:
+        escaped text, text itself when nothing needed escaping
+    """
+    if "&" in text or "<" in text or ">" in text:
+        return text.translate(_TEXT_TABLE)
+    return text
+
+
+def escape_attr(value: str) -> str:
+    """Escapes &, <, > and double quotes so a value can be placed in a double quoted attribute.
+
+    Args:
+        value: attribute value to escape
+
+    Returns:
+        escaped value, value itself when nothing needed escaping
+    """
+    if "&" in value or "<" in value or ">" in value or '"' in value:
+        return value.translate(_ATTR_TABLE)
+    return value
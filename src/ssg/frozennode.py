@@ -0,0 +1,344 @@
+"""Immutable, hashable HTMLNodes and a cache of their rendered html, or of rendered markdown blocks."""
+
+from __future__ import annotations
+
+import logging
+from collections import OrderedDict
+from types import MappingProxyType
+from typing import TYPE_CHECKING, Any, NoReturn, override
+
+from ssg.block import render_block
+from ssg.htmlnode import HTMLNode, LeafNode, ParentNode, RawNode
+from ssg.links import LinkRecorder
+from ssg.urls import get_url_resolver, reset_url_resolver, set_url_resolver
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Mapping
+
+    from ssg.urls import UrlResolver
+
+logger = logging.getLogger(__name__)
+
+
+def _frozen_props(props: Mapping[str, str] | None) -> Mapping[str, str] | None:
+    return None if props is None else MappingProxyType(dict(props))
+
+
+def _props_key(props: Mapping[str, str] | None) -> tuple[tuple[str, str], ...] | None:
+    return None if props is None else tuple(props.items())
+
+
+class _FrozenNode(HTMLNode):
+    """Shared behaviour of the frozen node classes, the _hash slot lives in each of them."""
+
+    __slots__ = ()
+    _hash: int
+
+    @override
+    def __setattr__(self, name: str, value: Any, /) -> NoReturn:
+        msg = f"{type(self).__name__} is immutable"
+        raise AttributeError(msg)
+
+    @override
+    def __delattr__(self, name: str, /) -> NoReturn:
+        msg = f"{type(self).__name__} is immutable"
+        raise AttributeError(msg)
+
+    @override
+    def __hash__(self) -> int:
+        return self._hash
+
+    @override
+    def __eq__(self, other: object, /) -> bool:
+        if self is other:
+            return True
+        if isinstance(other, _FrozenNode):
+            if self._hash != other._hash:
+                return False
+        elif not isinstance(other, HTMLNode):
+            return NotImplemented
+        if (
+            isinstance(self, RawNode) != isinstance(other, RawNode)
+            or self.tag != other.tag
+            or self.value != other.value
+            or self.props != other.props
+        ):
+            return False
+        if self.children is None or other.children is None:
+            return self.children is other.children
+        return list(self.children) == list(other.children)
+
+
+class FrozenLeafNode(_FrozenNode, LeafNode):
+    """Immutable LeafNode whose structural hash is computed once, at construction."""
+
+    __slots__ = ("_hash",)
+
+    def __init__(
+        self,
+        value: str,
+        tag: str | None = None,
+        props: Mapping[str, str] | None = None,
+    ) -> None:
+        """FrozenLeafNode constructor.
+
+        Args:
+            value (str): text value of the node
+            tag (str | None): tag name of the node
+            props (Mapping[str, str] | None): properties of the node, copied into a read-only mapping
+        """
+        frozen_props = _frozen_props(props)
+        object.__setattr__(self, "tag", tag)
+        object.__setattr__(self, "value", value)
+        object.__setattr__(self, "children", None)
+        object.__setattr__(self, "props", frozen_props)
+        object.__setattr__(self, "_hash", hash((tag, value, _props_key(frozen_props), isinstance(self, RawNode))))
+
+
+class FrozenRawNode(FrozenLeafNode, RawNode):
+    """Immutable RawNode, never equal to a FrozenLeafNode with the same value."""
+
+    __slots__ = ()
+
+
+class FrozenParentNode(_FrozenNode, ParentNode):
+    """Immutable ParentNode, its children are a tuple of frozen nodes and its hash covers the subtree.
+
+    The hash is built from the already cached hashes of the children, so it costs one pass over the
+    direct children only.
+    """
+
+    __slots__ = ("_hash",)
+
+    def __init__(
+        self,
+        children: Iterable[HTMLNode],
+        tag: str | None = None,
+        props: Mapping[str, str] | None = None,
+    ) -> None:
+        """FrozenParentNode constructor.
+
+        Args:
+            children (Iterable[HTMLNode]): child nodes, frozen with freeze if they are not already
+            tag (str | None): tag name of the node
+            props (Mapping[str, str] | None): properties of the node, copied into a read-only mapping
+        """
+        frozen_children = tuple(child if isinstance(child, _FrozenNode) else freeze(child) for child in children)
+        frozen_props = _frozen_props(props)
+        object.__setattr__(self, "tag", tag)
+        object.__setattr__(self, "value", None)
+        object.__setattr__(self, "children", frozen_children)
+        object.__setattr__(self, "props", frozen_props)
+        object.__setattr__(
+            self, "_hash", hash((tag, _props_key(frozen_props), tuple(hash(child) for child in frozen_children)))
+        )
+
+
+def freeze(node: HTMLNode) -> HTMLNode:
+    """Builds the frozen copy of a tree of LeafNodes and ParentNodes.
+
+    The tree is walked with an explicit stack, so deep trees can not hit the recursion limit. Nodes
+    that are already frozen are reused as they are.
+
+    Args:
+        node: root of the tree to freeze
+
+    Returns:
+        frozen root
+
+    Raises:
+        ValueError: LeafNode must have value
+        TypeError: the tree contains a node that is neither a LeafNode nor a ParentNode
+    """
+    done: list[HTMLNode] = []
+    stack: list[tuple[HTMLNode, bool]] = [(node, False)]
+    while stack:
+        item, expanded = stack.pop()
+        if isinstance(item, _FrozenNode):
+            done.append(item)
+        elif isinstance(item, LeafNode):
+            if item.value is None:
+                msg = "LeafNode must have value"
+                raise ValueError(msg)
+            frozen_leaf = FrozenRawNode if isinstance(item, RawNode) else FrozenLeafNode
+            done.append(frozen_leaf(item.value, item.tag, item.props))
+        elif not isinstance(item, ParentNode):
+            msg = f"can not freeze {type(item).__name__}"
+            raise TypeError(msg)
+        elif expanded:
+            count = len(item.children or ())
+            children = done[len(done) - count :] if count else []
+            del done[len(done) - count :]
+            done.append(FrozenParentNode(children, item.tag, item.props))
+        else:
+            stack.append((item, True))
+            stack.extend((child, False) for child in reversed(item.children or ()))
+    return done[0]
+
+
+class FragmentCache:
+    """Bounded LRU cache from frozen subtrees, or from markdown blocks, to their rendered html.
+
+    Equal subtrees share a hash and compare equal, so a subtree that repeats across pages, such as a
+    boilerplate notice or a list of links, is only serialized the first time it is seen.
+
+    Serializing a tree is the cheap part of rendering it, so the build caches whole markdown blocks
+    instead, see render_block: a block repeated across pages is parsed and rendered once.
+    """
+
+    def __init__(self, max_entries: int = 4096) -> None:
+        """FragmentCache constructor.
+
+        Args:
+            max_entries: number of subtrees kept before the least recently used are evicted
+        """
+        self.max_entries: int = max_entries
+        self.hits: int = 0
+        self.misses: int = 0
+        self.evictions: int = 0
+        self._entries: OrderedDict[HTMLNode, str] = OrderedDict()
+        self._blocks: OrderedDict[tuple[str, UrlResolver], tuple[str, tuple[str, ...]]] = OrderedDict()
+
+    def __len__(self) -> int:
+        """Number of cached subtrees and blocks."""
+        return len(self._entries) + len(self._blocks)
+
+    @property
+    def hit_rate(self) -> float:
+        """Fraction of cacheable subtrees and blocks that were found in the cache."""
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def _lookup(self, node: HTMLNode) -> str | None:
+        html = self._entries.get(node)
+        if html is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(node)
+        self.hits += 1
+        return html
+
+    def _store(self, node: HTMLNode, html: str) -> None:
+        self._entries[node] = html
+        if len(self._entries) > self.max_entries:
+            _ = self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def render(self, node: HTMLNode) -> str:
+        """Renders a tree, reusing the cached html of every frozen subtree seen before.
+
+        Only FrozenParentNodes are cached, other nodes are rendered with to_html every time.
+
+        Args:
+            node: root of the tree to render
+
+        Returns:
+            html text of the tree, identical to node.to_html()
+
+        Raises:
+            ValueError: tag can not be None
+            ValueError: children can not be None
+        """
+        done: list[str] = []
+        stack: list[tuple[HTMLNode, int]] = [(node, -1)]
+        while stack:
+            item, start = stack.pop()
+            if not isinstance(item, FrozenParentNode):
+                done.append(item.to_html())
+                continue
+            if start >= 0:
+                html = f"<{item.tag}{item.props_to_html()}>{''.join(done[start:])}</{item.tag}>"
+                del done[start:]
+                done.append(html)
+                self._store(item, html)
+                continue
+            cached = self._lookup(item)
+            if cached is not None:
+                done.append(cached)
+                continue
+            if item.tag is None:
+                msg = "tag can not be None"
+                raise ValueError(msg)
+            if not item.children:
+                msg = "children can not be None"
+                raise ValueError(msg)
+            stack.append((item, len(done)))
+            stack.extend((child, -1) for child in reversed(item.children))
+        return done[0]
+
+    def render_block(self, block: str, resolver: UrlResolver) -> str:
+        """Renders a markdown block, reusing the html of an equal block rendered before.
+
+        The html of a block depends on the base path its urls are resolved against, so blocks are
+        cached by their text and resolver. The urls of a cached block are passed to the current url
+        resolver hook again, so a LinkRecorder sees the links of the page whether the block was
+        cached or not.
+
+        Args:
+            block: markdown block, as iter_blocks yields it
+            resolver: resolver of the page the block belongs to
+
+        Returns:
+            html of the block, identical to what ssg.block.render_block appends
+        """
+        hook = get_url_resolver()
+        key = (block, resolver)
+        cached = self._blocks.get(key)
+        if cached is not None:
+            self._blocks.move_to_end(key)
+            self.hits += 1
+            html, urls = cached
+            for url in urls:
+                _ = hook(url)
+            return html
+        self.misses += 1
+        recorder = LinkRecorder(hook)
+        out: list[str] = []
+        # set and reset by hand, a contextmanager would cost as much as rendering a short block
+        token = set_url_resolver(recorder)
+        try:
+            render_block(block, out)
+        finally:
+            reset_url_resolver(token)
+        html = "".join(out)
+        self._blocks[key] = (html, tuple(recorder.urls))
+        if len(self._blocks) > self.max_entries:
+            _ = self._blocks.popitem(last=False)
+            self.evictions += 1
+        return html
+
+    def count(self, hits: int, misses: int, evictions: int) -> None:
+        """Adds the counters of another cache, such as the one of a worker process, to this one.
+
+        Args:
+            hits: hits to add
+            misses: misses to add
+            evictions: evictions to add
+        """
+        self.hits += hits
+        self.misses += misses
+        self.evictions += evictions
+
+    def stats(self) -> dict[str, float]:
+        """Counters of the cache, to check whether it pays off.
+
+        Returns:
+            hits, misses, evictions, entries and hit_rate
+        """
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(self),
+            "hit_rate": self.hit_rate,
+        }
+
+    def log_stats(self) -> None:
+        """Writes the cache counters to the build log."""
+        logger.info(
+            "fragment cache: %d hits, %d misses (%.1f%% hit rate), %d evictions",
+            self.hits,
+            self.misses,
+            100 * self.hit_rate,
+            self.evictions,
+        )
@@ -0,0 +1,347 @@
+"""Syntax highlighting for fenced code blocks, with a persistent on-disk cache."""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import re
+import tempfile
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+from ssg.escape import escape_text
+
+logger = logging.getLogger(__name__)
+
+_PYTHON_KEYWORDS = (
+    "False None True and as assert async await break class continue def del elif else except finally for from "
+    "global if import in is lambda nonlocal not or pass raise return try while with yield match case"
+)
+_JS_KEYWORDS = (
+    "async await break case catch class const continue default delete do else export extends false finally for "
+    "function if import in instanceof let new null return super switch this throw true try typeof undefined var "
+    "void while yield"
+)
+_BASH_KEYWORDS = "case do done elif else esac export fi for function if in local return select then until while"
+
+
+def _words(words: str) -> str:
+    return r"\b(?:" + "|".join(words.split()) + r")\b"
+
+
+_NUMBER = r"\b\d+(?:\.\d+)?(?:[eE][+-]?\d+)?\b"
+_DOUBLE_QUOTED = r'"(?:\\.|[^"\\\n])*"'
+_SINGLE_QUOTED = r"'(?:\\.|[^'\\\n])*'"
+
+# token class and regex pairs, tried in order at each position
+_LANGUAGE_RULES: dict[str, list[tuple[str, str]]] = {
+    "python": [
+        ("comment", r"#[^\n]*"),
+        ("string", r'(?s:""".*?"""|\'\'\'.*?\'\'\')|' + _DOUBLE_QUOTED + "|" + _SINGLE_QUOTED),
+        ("keyword", _words(_PYTHON_KEYWORDS)),
+        ("builtin", _words("print len range str int float list dict set tuple open isinstance super self")),
+        ("number", _NUMBER),
+    ],
+    "javascript": [
+        ("comment", r"//[^\n]*|(?s:/\*.*?\*/)"),
+        ("string", r"(?s:`(?:\\.|[^`\\])*`)|" + _DOUBLE_QUOTED + "|" + _SINGLE_QUOTED),
+        ("keyword", _words(_JS_KEYWORDS)),
+        ("number", _NUMBER),
+    ],
+    "bash": [
+        ("comment", r"(?<![\w$])#[^\n]*"),
+        ("string", _DOUBLE_QUOTED + "|" + _SINGLE_QUOTED),
+        ("variable", r"\$\{[^}\n]*\}|\$\w+"),
+        ("keyword", _words(_BASH_KEYWORDS)),
+        ("number", _NUMBER),
+    ],
+    "json": [
+        ("string", _DOUBLE_QUOTED),
+        ("keyword", _words("true false null")),
+        ("number", r"-?" + _NUMBER),
+    ],
+}
+# bump when tokenize_to_html renders the same rules differently, cached entries of other versions are never read
+_TOKENIZER_VERSION = 1
+
+
+def _rules_digest(rules: list[tuple[str, str]]) -> str:
+    return hashlib.sha256(repr((_TOKENIZER_VERSION, rules)).encode()).hexdigest()[:16]
+
+
+# part of the cache key of each language, so editing the rules of a language invalidates its cached entries
+_RULES_DIGESTS: dict[str, str] = {name: _rules_digest(rules) for name, rules in _LANGUAGE_RULES.items()}
+_NO_RULES_DIGEST = _rules_digest([])
+_ALIASES = {
+    "py": "python",
+    "python3": "python",
+    "js": "javascript",
+    "sh": "bash",
+    "shell": "bash",
+    "zsh": "bash",
+}
+_LANGUAGE_PATTERNS: dict[str, tuple[re.Pattern[str], tuple[str, ...]]] = {
+    name: (
+        re.compile("|".join(f"({regex})" for _, regex in rules)),
+        tuple(f'<span class="tok-{kind}">' for kind, _ in rules),
+    )
+    for name, rules in _LANGUAGE_RULES.items()
+}
+
+
+def normalize_language(language: str) -> str:
+    """Maps a fence info string to the name of a supported language.
+
+    Args:
+        language: language tag from the code fence
+
+    Returns:
+        canonical language name, or "text" when the language is not supported
+    """
+    language = language.strip().lower()
+    language = _ALIASES.get(language, language)
+    return language if language in _LANGUAGE_PATTERNS else "text"
+
+
+def tokenize_to_html(code: str, language: str) -> str:
+    """Highlights code by wrapping each token in a span with a tok-<kind> class.
+
+    Code in an unsupported language is only escaped.
+
+    Args:
+        code: source code to highlight
+        language: language of the code
+
+    Returns:
+        escaped and highlighted html
+    """
+    compiled = _LANGUAGE_PATTERNS.get(normalize_language(language))
+    if compiled is None:
+        return escape_text(code)
+
+    pattern, opening_tags = compiled
+    out: list[str] = []
+    pos = 0
+    for match in pattern.finditer(code):
+        start, end = match.span()
+        if start == end:
+            continue
+        if start > pos:
+            out.append(escape_text(code[pos:start]))
+        out.append(opening_tags[(match.lastindex or 1) - 1])
+        out.append(escape_text(match[0]))
+        out.append("</span>")
+        pos = end
+    out.append(escape_text(code[pos:]))
+    return "".join(out)
+
+
+# a cache re-reads its directory after writing this fraction of max_bytes, so that caches of several
+# processes sharing a directory go at most this much over the cap each before seeing each other's entries
+_RESCAN_FRACTION = 16
+
+
+class HighlightCache:
+    """On-disk cache of highlighted code keyed by language and a hash of the code.
+
+    Each entry is one file in the cache directory, so the cache survives between builds. The least
+    recently used entries are evicted once the total size goes over max_bytes; recency is kept in the
+    file modification times so it persists too.
+
+    Worker processes of a build each open the same directory. The size is taken from the directory
+    before evicting, not from the entries this process wrote, so together they keep to the cap.
+    Threads of one process, such as the requests of the preview server, can share a cache, its index
+    and counters are only changed under a lock.
+    """
+
+    def __init__(self, directory: str | Path, max_bytes: int = 64 * 1024 * 1024) -> None:
+        """HighlightCache constructor, indexes the entries already in the directory.
+
+        Args:
+            directory: directory holding the cache entries, created if missing
+            max_bytes: total size of the entries above which the oldest are evicted
+        """
+        self.directory: Path = Path(directory)
+        self.max_bytes: int = max_bytes
+        self.hits: int = 0
+        self.misses: int = 0
+        self.evictions: int = 0
+        self._entries: OrderedDict[str, int] = OrderedDict()
+        self._size: int = 0
+        # bytes written since the directory was last read
+        self._unscanned: int = 0
+        self._lock: threading.Lock = threading.Lock()
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.refresh()
+
+    def refresh(self) -> None:
+        """Re-reads the entries and their recency from the directory.
+
+        This picks up the entries other processes sharing the directory wrote or evicted.
+        """
+        entries = self._scan()
+        with self._lock:
+            self._refresh(entries)
+
+    def _refresh(self, entries: list[tuple[float, str, int]]) -> None:
+        self._entries = OrderedDict((name, size) for _, name, size in sorted(entries))
+        self._size = sum(self._entries.values())
+        self._unscanned = 0
+
+    def _scan(self) -> list[tuple[float, str, int]]:
+        entries: list[tuple[float, str, int]] = []
+        with os.scandir(self.directory) as scan:
+            for entry in scan:
+                if not entry.name.endswith(".html") or not entry.is_file():
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    # evicted by another process since the directory was listed
+                    continue
+                entries.append((stat.st_mtime, entry.name, stat.st_size))
+        return entries
+
+    @staticmethod
+    def key(code: str, language: str) -> str:
+        """File name of the entry for a snippet.
+
+        The name covers the tokenizer version and the rules of the language, so entries highlighted
+        with other rules are never read again and age out of the cache.
+
+        Args:
+            code: source code
+            language: canonical language name
+
+        Returns:
+            cache entry name
+        """
+        digest = hashlib.sha256(code.encode()).hexdigest()
+        return f"{language}-{_RULES_DIGESTS.get(language, _NO_RULES_DIGEST)}-{digest}.html"
+
+    def get(self, code: str, language: str) -> str | None:
+        """Looks up highlighted html, marking the entry as recently used.
+
+        Args:
+            code: source code
+            language: canonical language name
+
+        Returns:
+            cached html, or None on a miss
+        """
+        name = self.key(code, language)
+        path = self.directory / name
+        with self._lock:
+            indexed = name in self._entries
+        if indexed:
+            try:
+                cached = path.read_text(encoding="utf-8")
+                os.utime(path)
+            except FileNotFoundError:
+                # evicted by another build sharing the directory, or by another thread
+                with self._lock:
+                    self._size -= self._entries.pop(name, 0)
+            else:
+                with self._lock:
+                    # another thread may have evicted it since it was read
+                    if name in self._entries:
+                        self._entries.move_to_end(name)
+                    self.hits += 1
+                return cached
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, code: str, language: str, highlighted: str) -> None:
+        """Stores highlighted html, evicting the least recently used entries if over the size cap.
+
+        Args:
+            code: source code
+            language: canonical language name
+            highlighted: html to store
+        """
+        name = self.key(code, language)
+        data = highlighted.encode()
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "wb") as file:
+            _ = file.write(data)
+        Path(tmp).replace(self.directory / name)
+
+        with self._lock:
+            self._size += len(data) - self._entries.pop(name, 0)
+            self._entries[name] = len(data)
+            self._unscanned += len(data)
+            if self._size > self.max_bytes or self._unscanned > self.max_bytes // _RESCAN_FRACTION:
+                self._refresh(self._scan())
+            while self._size > self.max_bytes and len(self._entries) > 1:
+                oldest, size = self._entries.popitem(last=False)
+                self._size -= size
+                self.evictions += 1
+                (self.directory / oldest).unlink(missing_ok=True)
+
+    def count(self, hits: int, misses: int, evictions: int) -> None:
+        """Adds the counters of another cache, such as the one of a worker process, to this one.
+
+        Args:
+            hits: hits to add
+            misses: misses to add
+            evictions: evictions to add
+        """
+        with self._lock:
+            self.hits += hits
+            self.misses += misses
+            self.evictions += evictions
+
+    def log_stats(self) -> None:
+        """Writes the hit, miss and eviction counters to the build log."""
+        with self._lock:
+            counters = (self.hits, self.misses, self.evictions, len(self._entries), self._size)
+        logger.info("highlight cache: %d hits, %d misses, %d evictions, %d entries (%d bytes)", *counters)
+
+
+_cache: HighlightCache | None = None
+
+
+def set_highlight_cache(cache: HighlightCache | None) -> None:
+    """Sets the cache used by highlight, None disables caching.
+
+    Args:
+        cache: the cache to use
+    """
+    global _cache  # noqa: PLW0603
+    _cache = cache
+
+
+def get_highlight_cache() -> HighlightCache | None:
+    """Returns the cache used by highlight.
+
+    Returns:
+        the current cache, if any
+    """
+    return _cache
+
+
+def highlight(code: str, language: str) -> str:
+    """Highlights code, going through the highlight cache when one is set.
+
+    Args:
+        code: source code
+        language: language tag from the code fence
+
+    Returns:
+        escaped and highlighted html
+    """
+    language = normalize_language(language)
+    if language == "text":
+        return escape_text(code)
+    if _cache is None:
+        return tokenize_to_html(code, language)
+
+    cached = _cache.get(code, language)
+    if cached is None:
+        cached = tokenize_to_html(code, language)
+        _cache.put(code, language, cached)
+    return cached
@@ -2,12 +2,19 @@
 
 from __future__ import annotations
 
-from typing import override
+from typing import TYPE_CHECKING, TextIO, override
+
+from ssg.escape import escape_attr, escape_text
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
 
 
 class HTMLNode:
     """Class to represent an inline HTML node."""
 
+    __slots__ = ("children", "props", "tag", "value")
+
     def __init__(
         self,
         value: str | None = None,
@@ -32,15 +39,31 @@ class HTMLNode:
         """To be implemented by child classes."""
         raise NotImplementedError
 
+    def iter_html(self) -> Iterator[str]:
+        """Yields the html text of the node in fragments that concatenate to to_html.
+
+        Yields:
+            html fragments in document order
+        """
+        yield self.to_html()
+
+    def write_html(self, fp: TextIO) -> None:
+        """Streams the html text of the node to a file without building it as one string.
+
+        Args:
+            fp: text file to write to
+        """
+        fp.writelines(self.iter_html())
+
     def props_to_html(self) -> str:
-        """Converts property dictionary to html string.
+        """Converts property dictionary to html string, the values are escaped.
 
         Returns:
             html representation of the property dictionary
         """
         if self.props is None:
             return ""
-        return " " + " ".join(f'{pair[0]}="{pair[1]}"' for pair in self.props.items())
+        return " " + " ".join(f'{pair[0]}="{escape_attr(pair[1])}"' for pair in self.props.items())
 
     @override
     def __repr__(self) -> str:
@@ -61,6 +84,8 @@ class HTMLNode:
 class LeafNode(HTMLNode):
     """class to represnt a HTML node that has a text value and no children."""
 
+    __slots__ = ()
+
     def __init__(
         self,
         value: str,
@@ -77,7 +102,32 @@ class LeafNode(HTMLNode):
         super().__init__(value, tag, props, None)
 
     def to_html(self) -> str:
-        """Convert node to html text.
+        """Convert node to html text, the value is escaped.
+
+        Returns:
+            full html text representation of node
+
+        Raises:
+            ValueError: leaf node must have a value
+        """
+        if self.value is None:
+            msg = "LeafNode must have value"
+            raise ValueError(msg)
+
+        if self.tag is None:
+            return escape_text(self.value)
+
+        return f"<{self.tag}{self.props_to_html()}>{escape_text(self.value)}</{self.tag}>"
+
+
+class RawNode(LeafNode):
+    """LeafNode whose value is trusted html, such as highlighted code, and is written out unescaped."""
+
+    __slots__ = ()
+
+    @override
+    def to_html(self) -> str:
+        """Convert node to html text, the value is used as it is.
 
         Returns:
             full html text representation of node
@@ -94,10 +144,19 @@ class LeafNode(HTMLNode):
 
         return f"<{self.tag}{self.props_to_html()}>{self.value}</{self.tag}>"
 
+    @override
+    def __eq__(self, other: object, /) -> bool:
+        # raw and escaped leaves with the same value render differently
+        if not isinstance(other, HTMLNode):
+            return NotImplemented
+        return isinstance(other, RawNode) and super().__eq__(other)
+
 
 class ParentNode(HTMLNode):
     """Parent nodes have no value and hsold have children."""
 
+    __slots__ = ()
+
     def __init__(
         self,
         children: list[HTMLNode],
@@ -123,13 +182,37 @@ class ParentNode(HTMLNode):
             ValueError: tag can not be None
             ValueError: children can not be None
         """
-        if self.tag is None:
-            msg = "tag can not be None"
-            raise ValueError(msg)
+        return "".join(self.iter_html())
 
-        if not self.children:
-            msg = "children can not be None"
-            raise ValueError(msg)
+    def iter_html(self) -> Iterator[str]:
+        """Yields the html text of the subtree in fragments.
+
+        The tree is walked with an explicit stack rather than recursion, so deep trees can not hit the
+        recursion limit, and no subtree is ever joined into an intermediate string.
 
-        inner_html = "".join(x.to_html() for x in self.children)
-        return f"<{self.tag}{self.props_to_html()}>{inner_html}</{self.tag}>"
+        Yields:
+            html fragments in document order
+
+        Raises:
+            ValueError: tag can not be None
+            ValueError: children can not be None
+        """
+        stack: list[HTMLNode | str] = [self]
+        while stack:
+            item = stack.pop()
+            if isinstance(item, str):
+                yield item
+            elif isinstance(item, ParentNode):
+                if item.tag is None:
+                    msg = "tag can not be None"
+                    raise ValueError(msg)
+                if not item.children:
+                    msg = "children can not be None"
+                    raise ValueError(msg)
+                yield f"<{item.tag}{item.props_to_html()}>"
+                stack.append(f"</{item.tag}>")
+                stack.extend(reversed(item.children))
+            elif isinstance(item, LeafNode):
+                yield item.to_html()
+            else:
+                yield from item.iter_html()
@@ -1,15 +1,19 @@
 """Handles the conversion of inline tags to HTML."""
 
 import re
+from collections.abc import Iterable, Iterator
 
+from ssg.escape import escape_attr, escape_text
 from ssg.htmlnode import HTMLNode, LeafNode
 from ssg.textnode import TextNode, TextType
+from ssg.urls import get_url_resolver, resolve_url
 
 
 def text_node_to_html_node(text_node: TextNode) -> HTMLNode:
     """Convert a TextNode to a HTMLNode.
 
-    used the TextType of a TextNode to generate a new HTMLNode
+    used the TextType of a TextNode to generate a new HTMLNode, link and image urls are resolved
+    through the url resolver, see ssg.urls
 
     Args:
         text_node: the TextNode to convert
@@ -30,66 +34,84 @@ def text_node_to_html_node(text_node: TextNode) -> HTMLNode:
             if text_node.url is None:
                 msg = "Link requires a url"
                 raise ValueError(msg)
-            return LeafNode(text_node.text, "a", props={"href": text_node.url})
+            return LeafNode(text_node.text, "a", props={"href": resolve_url(text_node.url)})
         case TextType.IMAGE:
             if text_node.url is None:
                 msg = "Image requires a url"
                 raise ValueError(msg)
-            return LeafNode("", "img", props={"src": text_node.url, "alt": text_node.text})
+            return LeafNode("", "img", props={"src": resolve_url(text_node.url), "alt": text_node.text})
 
 
-def split_nodes_delimiter(old_nodes: list[TextNode], delimiter: str, text_type: TextType) -> list[TextNode]:
-    """Creates new list of TextNodes with appropriate TextType.
+_DELIMITERS = {
+    TextType.BOLD: "**",
+    TextType.ITALIC: "_",
+    TextType.CODE: "`",
+}
+_IMAGE_PATTERN = re.compile(r"!\[(.*?)\]\((.*?)\)")
+_LINK_PATTERN = re.compile(r"(?<!!)\[(.*?)\]\((.*?)\)")
 
-    takes a list of TextNodes and a delimiter and splits each TextNode by the delimter and changes
-    the appropriate parts to the target TextTypei
+
+def iter_split_nodes_delimiter(
+    old_nodes: Iterable[TextNode], delimiter: str, text_type: TextType
+) -> Iterator[TextNode]:
+    """Lazily splits each TextNode by the delimiter and labels the delimited parts with text_type.
+
+    Nodes are consumed one at a time, so any iterable of TextNodes can be used and nothing is kept
+    around for nodes that have already been yielded. Empty nodes are skipped.
 
     Args:
-        old_nodes: original list of nodes
+        old_nodes: original nodes
         delimiter: delimiter to split on
         text_type: target TextType
 
     Returns:
-        new list of shorter TextNodes labeled appropriately
+        iterator of shorter TextNodes labeled appropriately
 
     Raises:
-        ValueError: if text_type not in delim_dic or the delimiter is the wrong one
+        ValueError: if text_type has no delimiter or the delimiter is the wrong one
     """
-    delim_dic = {
-        TextType.BOLD: "**",
-        TextType.ITALIC: "_",
-        TextType.CODE: "`",
-    }
+    if text_type not in _DELIMITERS:
+        raise ValueError(f"the accepted text_type must be one of {_DELIMITERS.keys()}")
+    if _DELIMITERS[text_type] != delimiter:
+        raise ValueError(f"the delimiter for {text_type} is {_DELIMITERS[text_type]}")
+    return _iter_split_delimiter(old_nodes, delimiter, text_type)
 
-    if text_type not in delim_dic:
-        raise ValueError(f"the accepted text_type must be one of {delim_dic.keys()}")
-    if delim_dic[text_type] != delimiter:
-        raise ValueError(f"the delimiter for {text_type} is {delim_dic[text_type]}")
 
-    if len(old_nodes) == 0:
-        return []
+def _iter_split_delimiter(old_nodes: Iterable[TextNode], delimiter: str, text_type: TextType) -> Iterator[TextNode]:
+    for node in old_nodes:
+        if node.text == "":
+            continue
 
-    first, rest = old_nodes[0], old_nodes[1:]
-    if first.text == "":
-        return []
+        parts = node.text.split(delimiter)
+        if len(parts) == 1:
+            yield node
+            continue
 
-    mod = int(first.text.find(delimiter) == 0)
-    parts = first.text.split(delimiter)
+        mod = int(parts[0] == "")
+        start = mod
+        stop = len(parts) - int(parts[-1] == "")
+        for i in range(start, stop):
+            part = parts[i]
+            if part.strip() == "":
+                continue
+            yield TextNode(part, TextType.TEXT if (i - start) % 2 == mod else text_type, node.url)
 
-    if len(parts) == 1:
-        return [first, *split_nodes_delimiter(rest, delimiter, text_type)]
-    if parts[0] == "":
-        parts = parts[1:]
-    if parts[-1] == "":
-        parts = parts[:-1]
 
-    new_nodes = [
-        TextNode(a, TextType.TEXT, first.url) if i % 2 == mod else TextNode(a, text_type, first.url)
-        for i, a in enumerate(parts)
-        if a.strip() != ""
-    ]
-    new_nodes.extend(split_nodes_delimiter(rest, delimiter, text_type))
-    return new_nodes
+def split_nodes_delimiter(old_nodes: list[TextNode], delimiter: str, text_type: TextType) -> list[TextNode]:
+    """Creates new list of TextNodes with appropriate TextType.
+
+    takes a list of TextNodes and a delimiter and splits each TextNode by the delimter and changes
+    the appropriate parts to the target TextTypei
+
+    Args:
+        old_nodes: original list of nodes
+        delimiter: delimiter to split on
+        text_type: target TextType
+
+    Returns:
+        new list of shorter TextNodes labeled appropriately
+    """
+    return list(iter_split_nodes_delimiter(old_nodes, delimiter, text_type))
 
 
 def extract_markdown_images(text: str) -> list[tuple[str, str]]:
@@ -103,8 +125,7 @@ def extract_markdown_images(text: str) -> list[tuple[str, str]]:
     Returns:
         list of alt_text, url tuples
     """
-    pattern = re.compile(r"!\[(.*?)\]\((.*?)\)")
-    return re.findall(pattern, text)
+    return _IMAGE_PATTERN.findall(text)
 
 
 def extract_markdown_links(text: str) -> list[tuple[str, str]]:
@@ -118,8 +139,51 @@ def extract_markdown_links(text: str) -> list[tuple[str, str]]:
     Returns:
     list of (anchor_text, url) tuples
     """
-    pattern = re.compile(r"(?<!!)\[(.*?)\]\((.*?)\)")
-    return re.findall(pattern, text)
+    return _LINK_PATTERN.findall(text)
+
+
+def _iter_split_pattern(
+    old_nodes: Iterable[TextNode], pattern: re.Pattern[str], text_type: TextType
+) -> Iterator[TextNode]:
+    for node in old_nodes:
+        text = node.text
+        if text == "":
+            continue
+
+        pos = 0
+        for match in pattern.finditer(text):
+            start, end = match.span()
+            if start > pos:
+                yield TextNode(text[pos:start], TextType.TEXT)
+            yield TextNode(match[1], text_type, match[2])
+            pos = end
+
+        if pos == 0:
+            yield node
+        elif pos < len(text):
+            yield TextNode(text[pos:], TextType.TEXT)
+
+
+def iter_split_nodes_image(old_nodes: Iterable[TextNode]) -> Iterator[TextNode]:
+    """Lazily splits TextNodes so that each image is its own node of TextType.IMAGE.
+
+    Args:
+        old_nodes: original nodes
+    Returns:
+        iterator of TextNodes split appropriately
+    """
+    return _iter_split_pattern(old_nodes, _IMAGE_PATTERN, TextType.IMAGE)
+
+
+def iter_split_nodes_link(old_nodes: Iterable[TextNode]) -> Iterator[TextNode]:
+    """Lazily splits TextNodes so that each link is its own node of TextType.LINK.
+
+    Args:
+        old_nodes: original nodes
+    Returns:
+        iterator of TextNodes split appropriately
+    """
+    return _iter_split_pattern(old_nodes, _LINK_PATTERN, TextType.LINK)
 
 
 def split_nodes_image(old_nodes: list[TextNode]) -> list[TextNode]:
@@ -130,77 +194,199 @@ def split_nodes_image(old_nodes: list[TextNode]) -> list[TextNode]:
     Returns:
         longer list split appropriately
     """
-    if len(old_nodes) == 0:
-        return []
+    return list(iter_split_nodes_image(old_nodes))
+
+
+def split_nodes_link(old_nodes: list[TextNode]) -> list[TextNode]:
+    """Splits TextNodes so that link text is its own node of TextType.LINK.
 
-    first, rest = old_nodes[0], old_nodes[1:]
-    if first.text == "":
-        return []
+    Args:
+        old_nodes: old list of TextNodes
+    Returns:
+        longer list split appropriately
+    """
+    return list(iter_split_nodes_link(old_nodes))
 
-    matches = extract_markdown_images(first.text)
-    new_string = re.sub(r"!\[(.*?)\]\((.*?)\)", "|%<~DEL~>%| |%<~DEL~>%|", first.text)
-    parts = [part for part in new_string.split("|%<~DEL~>%|") if part != ""]
 
-    if not matches:
-        return [first, *split_nodes_image(rest)]
+# one alternation per inline construct, numbered so that Match.lastindex identifies the construct:
+# 1 bold, 2 italic, 3 code, 4/5 image alt/src, 6/7 link anchor/href
+_INLINE_PATTERN = re.compile(
+    r"\*\*((?s:.*?))\*\*"
+    r"|_((?s:.*?))_"
+    r"|`((?s:.*?))`"
+    r"|!\[(.*?)\]\((.*?)\)"
+    r"|\[(.*?)\]\((.*?)\)"
+)
+_BLANK_PATTERN = re.compile(r"\s*")
+_IMAGE_GROUP = 5
+_LINK_GROUP = 7
 
-    new_nodes: list[TextNode] = []
-    while matches or parts:
-        if parts[0] == " ":
-            pair = matches.pop(0)
-            new_nodes.append(TextNode(pair[0], TextType.IMAGE, pair[1]))
-            _ = parts.pop(0)
+# span type codes, the delimited ones share their number with their regex group
+SPAN_TEXT = 0
+SPAN_BOLD = 1
+SPAN_ITALIC = 2
+SPAN_CODE = 3
+SPAN_LINK = 4
+SPAN_IMAGE = 5
+
+Span = tuple[int, int, int, int, int]
+"""(type code, start, end, url start, url end) offsets into the scanned string."""
+
+_SPAN_TEXT_TYPES = (TextType.TEXT, TextType.BOLD, TextType.ITALIC, TextType.CODE, TextType.LINK, TextType.IMAGE)
+_SPAN_TAGS = ("", "b", "i", "code")
+
+
+def iter_spans(text: str) -> Iterator[Span]:
+    """Scans a string once and yields the offsets of its inline elements in order.
+
+    Bold, italic, code, images and links are all recognised by the same left to right scan, so the
+    text is only walked a single time and no substrings are copied. delimited spans that only contain
+    whitespace are dropped, and unmatched delimiters are kept as plain text. Text, bold, italic and
+    code spans have an empty url span.
+
+    Args:
+        text: the string to scan
+
+    Yields:
+        (type code, start, end, url start, url end) for each inline element
+    """
+    pos = 0
+    blank = _BLANK_PATTERN.fullmatch
+    for match in _INLINE_PATTERN.finditer(text):
+        start, end = match.span()
+        if start > pos:
+            yield (SPAN_TEXT, pos, start, 0, 0)
+        pos = end
+        group = match.lastindex or 0
+        if group == _IMAGE_GROUP:
+            yield (SPAN_IMAGE, *match.span(4), *match.span(5))
+        elif group == _LINK_GROUP:
+            yield (SPAN_LINK, *match.span(6), *match.span(7))
         else:
-            new_nodes.append(TextNode(parts.pop(0), TextType.TEXT))
-    return new_nodes + split_nodes_image(rest)
+            start, end = match.span(group)
+            if not blank(text, start, end):
+                yield (group, start, end, 0, 0)
+    if pos < len(text):
+        yield (SPAN_TEXT, pos, len(text), 0, 0)
 
 
-def split_nodes_link(old_nodes: list[TextNode]) -> list[TextNode]:
-    """Splits TextNodes so that image test is its own node of TextType.IMAGE.
+def _span_url(text: str, span: Span) -> str:
+    if span[3] == span[4]:
+        msg = "link or image requires a url"
+        raise ValueError(msg)
+    return text[span[3] : span[4]]
+
+
+def span_to_text_node(text: str, span: Span) -> TextNode:
+    """Materialize a TextNode from a span.
 
     Args:
-        old_nodes: old list of TextNodes
+        text: the string the span was scanned from
+        span: span produced by iter_spans
+
     Returns:
-        longer list split appropriately
+        the associated TextNode
+    """
+    code, start, end, url_start, url_end = span
+    if code < SPAN_LINK:
+        return TextNode(text[start:end], _SPAN_TEXT_TYPES[code])
+    return TextNode(text[start:end], _SPAN_TEXT_TYPES[code], text[url_start:url_end])
+
+
+def span_to_html_node(text: str, span: Span) -> LeafNode:
+    """Materialize a LeafNode straight from a span, without building a TextNode first.
+
+    Args:
+        text: the string the span was scanned from
+        span: span produced by iter_spans
+
+    Returns:
+        the associated LeafNode
     """
-    if len(old_nodes) == 0:
-        return []
+    code, start, end = span[0], span[1], span[2]
+    if code == SPAN_TEXT:
+        return LeafNode(text[start:end])
+    if code == SPAN_LINK:
+        return LeafNode(text[start:end], "a", props={"href": resolve_url(_span_url(text, span))})
+    if code == SPAN_IMAGE:
+        return LeafNode("", "img", props={"src": resolve_url(_span_url(text, span)), "alt": text[start:end]})
+    return LeafNode(text[start:end], _SPAN_TAGS[code])
 
-    first, rest = old_nodes[0], old_nodes[1:]
-    if first.text == "":
-        return []
 
-    matches = extract_markdown_links(first.text)
-    new_string = re.sub(r"\[(.*?)\]\((.*?)\)", "|%<~DEL~>%| |%<~DEL~>%|", first.text)
-    parts = [part for part in new_string.split("|%<~DEL~>%|") if part != ""]
+def render_spans(text: str, spans: Iterable[Span], out: list[str]) -> None:
+    """Append the html for each span to out without creating any nodes.
 
-    if not matches:
-        return [first, *split_nodes_link(rest)]
+    The output is identical to calling to_html on the LeafNodes from span_to_html_node, text and urls
+    are escaped and urls resolved the same way.
 
-    new_nodes = []
-    while matches or parts:
-        if parts[0] == " ":
-            pair = matches.pop(0)
-            new_nodes.append(TextNode(pair[0], TextType.LINK, pair[1]))
-            _ = parts.pop(0)
+    Args:
+        text: the string the spans were scanned from
+        spans: spans produced by iter_spans
+        out: list of html fragments to append to
+    """
+    append = out.append
+    resolve = get_url_resolver()
+    for code, start, end, url_start, url_end in spans:
+        if code == SPAN_TEXT:
+            append(escape_text(text[start:end]))
+        elif code < SPAN_LINK:
+            tag = _SPAN_TAGS[code]
+            append(f"<{tag}>{escape_text(text[start:end])}</{tag}>")
+        elif url_start == url_end:
+            msg = "link or image requires a url"
+            raise ValueError(msg)
+        elif code == SPAN_LINK:
+            append(f'<a href="{escape_attr(resolve(text[url_start:url_end]))}">{escape_text(text[start:end])}</a>')
         else:
-            new_nodes.append(TextNode(parts.pop(0), TextType.TEXT))
-    return new_nodes + split_nodes_link(rest)
+            url = escape_attr(resolve(text[url_start:url_end]))
+            append(f'<img src="{url}" alt="{escape_attr(text[start:end])}"></img>')
+
+
+def iter_text_nodes(text: str) -> Iterator[TextNode]:
+    """Scans a string once and yields its TextNodes in order.
+
+    Args:
+        text: the string to scan
+
+    Yields:
+        TextNodes in the order they appear in the text
+    """
+    for span in iter_spans(text):
+        yield span_to_text_node(text, span)
 
 
 def text_to_textnodes(text: str) -> list[TextNode]:
     """Converts a string to a list of TextNodes.
 
-    The string is split by spaces and each part is converted to a TextNode.
+    The string is scanned once by iter_spans and each inline element is converted to a TextNode.
 
     Args:
         text: the string to convert
     Returns:
         list of TextNodes
     """
-    nodes = [TextNode(text, TextType.TEXT)]
-    nodes = split_nodes_delimiter(nodes, "**", TextType.BOLD)
-    nodes = split_nodes_delimiter(nodes, "_", TextType.ITALIC)
-    nodes = split_nodes_delimiter(nodes, "`", TextType.CODE)
-    nodes = split_nodes_image(nodes)
-    return split_nodes_link(nodes)
+    return [span_to_text_node(text, span) for span in iter_spans(text)]
+
+
+def text_to_html_nodes(text: str) -> list[HTMLNode]:
+    """Converts a string straight to a list of LeafNodes, skipping the TextNode stage.
+
+    Args:
+        text: the string to convert
+    Returns:
+        list of HTMLNodes, one per inline element
+    """
+    return [span_to_html_node(text, span) for span in iter_spans(text)]
+
+
+def text_to_html(text: str) -> str:
+    """Renders the inline markdown in a string to html without allocating any nodes.
+
+    Args:
+        text: the string to convert
+    Returns:
+        html for the inline elements of the string
+    """
+    out: list[str] = []
+    render_spans(text, iter_spans(text), out)
+    return "".join(out)
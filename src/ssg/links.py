@@ -0,0 +1,164 @@
+"""Index of the routes a build produced and checker of the internal links of its pages."""
+
+from __future__ import annotations
+
+import logging
+import posixpath
+import re
+import urllib.parse
+from pathlib import Path
+from typing import TYPE_CHECKING, NamedTuple
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterable
+
+logger = logging.getLogger(__name__)
+
+_SCHEME_PATTERN = re.compile(r"[A-Za-z][A-Za-z0-9+.-]*:")
+
+
+class PageLinks(NamedTuple):
+    """The urls of the links and images of one page, as written in its markdown."""
+
+    source: str
+    urls: tuple[str, ...]
+
+
+class BrokenLink(NamedTuple):
+    """An internal link or image whose target the build did not produce."""
+
+    source: str
+    line: int | None
+    url: str
+
+    def __str__(self) -> str:
+        """The link as source:line: url."""
+        where = self.source if self.line is None else f"{self.source}:{self.line}"
+        return f"{where}: broken link {self.url}"
+
+
+class LinkRecorder:
+    """Url resolver hook recording every url it resolves, see ssg.urls.
+
+    It sits on the path every link and image url already takes while a page renders, so collecting
+    the links of a page costs one set insertion per link and no parsing.
+    """
+
+    def __init__(self, resolver: Callable[[str], str], urls: set[str] | None = None) -> None:
+        """LinkRecorder constructor.
+
+        Args:
+            resolver: the resolver that does the resolving
+            urls: set the urls are added to, a new one by default
+        """
+        self.resolver: Callable[[str], str] = resolver
+        self.urls: set[str] = set() if urls is None else urls
+
+    def __call__(self, url: str) -> str:
+        """Records and resolves a url.
+
+        Args:
+            url: url as written in the markdown
+
+        Returns:
+            the resolved url
+        """
+        self.urls.add(url)
+        return self.resolver(url)
+
+
+def _routes(output: str) -> list[str]:
+    route = "/" + output
+    if output == "index.html" or output.endswith("/index.html"):
+        directory = route.removesuffix("index.html")
+        return [route, directory, directory.rstrip("/") or "/"]
+    return [route]
+
+
+def link_target(page: str, url: str) -> str | None:
+    """Finds the route an internal url points to.
+
+    Args:
+        page: output path of the page holding the url, relative to the output root
+        url: url as written in the markdown
+
+    Returns:
+        the route, None when the url is external or only points into the page itself
+    """
+    if url.startswith("//") or _SCHEME_PATTERN.match(url):
+        return None
+    path = urllib.parse.unquote(urllib.parse.urlsplit(url).path)
+    if not path:
+        return None
+    if not path.startswith("/"):
+        directory = posixpath.dirname("/" + page)
+        joined = posixpath.normpath(posixpath.join(directory, path))
+        path = joined + "/" if path.endswith("/") and joined != "/" else joined
+    return path
+
+
+def _find_lines(source: str, url: str) -> list[int]:
+    try:
+        with Path(source).open(encoding="utf-8") as file:
+            return [number for number, line in enumerate(file, 1) if f"({url}" in line]
+    except OSError:
+        return []
+
+
+class LinkIndex:
+    """The routes of a build and the links of its pages, checked against each other in one pass."""
+
+    def __init__(self) -> None:
+        """LinkIndex constructor."""
+        self.routes: set[str] = set()
+        self.pages: dict[str, PageLinks] = {}
+
+    def add_page(self, output: str, links: PageLinks | None = None) -> None:
+        """Adds a generated page.
+
+        Args:
+            output: path of the page relative to the output root, such as blog/index.html
+            links: links of the page, when it has any
+        """
+        self.routes.update(_routes(output))
+        if links is not None:
+            self.pages[output] = links
+
+    def add_asset(self, output: str) -> None:
+        """Adds a static file.
+
+        Args:
+            output: path of the file relative to the output root
+        """
+        self.routes.add("/" + output)
+
+    def add_assets(self, outputs: Iterable[str]) -> None:
+        """Adds static files, see add_asset.
+
+        Args:
+            outputs: paths of the files relative to the output root
+        """
+        for output in outputs:
+            self.add_asset(output)
+
+    def check(self) -> list[BrokenLink]:
+        """Checks every internal link of every page against the routes.
+
+        The markdown of a page is only read again when it has a broken link, to find its lines.
+
+        Returns:
+            the broken links, ordered by page
+        """
+        broken: list[BrokenLink] = []
+        for output in sorted(self.pages):
+            source, urls = self.pages[output]
+            for url in urls:
+                target = link_target(output, url)
+                if target is None or target in self.routes:
+                    continue
+                lines = _find_lines(source, url) or [None]
+                broken.extend(BrokenLink(source, line, url) for line in lines)
+        logger.info(
+            "checked links of %d pages against %d routes, %d broken", len(self.pages), len(self.routes), len(broken)
+        )
+        return broken
@@ -0,0 +1,111 @@
+"""Logging setup of the command line, records are written by a background thread.
+
+Importing ssg configures no logging at all, a program using it as a library keeps its own setup.
+The command line sends every record through a queue to a QueueListener thread, so rendering and
+copying never wait for the log file or the terminal.
+"""
+
+from __future__ import annotations
+
+import logging
+import multiprocessing
+import sys
+from contextlib import contextmanager
+from logging.handlers import QueueHandler, QueueListener
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+    from multiprocessing.context import BaseContext
+    from multiprocessing.queues import Queue
+
+LEVELS = ("debug", "info", "warning", "error")
+DEFAULT_LEVEL = "warning"
+
+_FILE_FORMAT = "%(asctime)s %(levelname)s %(name)s: %(message)s"
+_STREAM_FORMAT = "%(levelname)s %(name)s: %(message)s"
+
+_queue: Queue[logging.LogRecord] | None = None
+
+
+@contextmanager
+def logging_to(level: str | int = DEFAULT_LEVEL, file: str | Path | None = None) -> Iterator[None]:
+    """Sends the records of every logger to a file or stderr while the context runs.
+
+    The records go through a multiprocessing queue, so worker processes can log to it as well, see
+    get_log_queue. The records still queued are written before the context exits.
+
+    Args:
+        level: lowest level logged, such as "info" or logging.INFO
+        file: file the records are appended to, stderr when None
+
+    Yields:
+        nothing
+    """
+    global _queue  # noqa: PLW0603
+    if file is None:
+        handler: logging.Handler = logging.StreamHandler(sys.stderr)
+        handler.setFormatter(logging.Formatter(_STREAM_FORMAT))
+    else:
+        handler = logging.FileHandler(Path(file), encoding="utf-8")
+        handler.setFormatter(logging.Formatter(_FILE_FORMAT))
+    queue: Queue[logging.LogRecord] = worker_context().Queue()
+    listener = QueueListener(queue, handler)
+    root = logging.getLogger()
+    previous_level = root.level
+    queue_handler = QueueHandler(queue)
+    root.addHandler(queue_handler)
+    root.setLevel(_level(level))
+    listener.start()
+    _queue = queue
+    try:
+        yield
+    finally:
+        _queue = None
+        root.removeHandler(queue_handler)
+        root.setLevel(previous_level)
+        listener.stop()
+        handler.close()
+        queue.close()
+
+
+def worker_context() -> BaseContext:
+    """The start method of worker processes, the log queue is created in it.
+
+    The command line runs threads, such as the log listener, before it starts workers, and forking a
+    process that runs threads can deadlock the child. Workers are started from a fork server instead,
+    or spawned where there is none.
+
+    Returns:
+        the multiprocessing context
+    """
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+
+def get_log_queue() -> Queue[logging.LogRecord] | None:
+    """Returns the queue the records are sent to while logging_to runs.
+
+    Returns:
+        the queue, None outside of logging_to
+    """
+    return _queue
+
+
+def log_to_queue(queue: Queue[logging.LogRecord], level: int) -> None:
+    """Sends the records of this process to a queue, the initializer of worker processes calls it.
+
+    Args:
+        queue: queue of logging_to in the parent process
+        level: lowest level logged
+    """
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.addHandler(QueueHandler(queue))
+    root.setLevel(level)
+
+
+def _level(level: str | int) -> int:
+    return level if isinstance(level, int) else logging.getLevelNamesMapping()[level.upper()]
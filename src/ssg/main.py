@@ -1,48 +1,87 @@
 """Main module for the static site generator."""
 
+import argparse
+import functools
 import logging
 import os
 import re
 import shutil
 import sys
+import threading
+import time
+from collections.abc import Callable, Iterable, Iterator, Sequence
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain
+from multiprocessing.queues import Queue
 from pathlib import Path
+from typing import NamedTuple, TextIO
 
-from ssg.block import markdown_to_html_node
+from ssg import inline
+from ssg.assets import DEFAULT_WORKERS, LinkMode, scan_tree, sync_asset, sync_tree
+from ssg.block import block_to_rule, iter_blocks, iter_markdown_html, markdown_to_blocks
+from ssg.discovery import PageSource, discover_pages, is_selected
+from ssg.frozennode import FragmentCache
+from ssg.highlight import HighlightCache, get_highlight_cache, set_highlight_cache
+from ssg.htmlnode import ParentNode
+from ssg.links import BrokenLink, LinkIndex, LinkRecorder, PageLinks
+from ssg.logs import DEFAULT_LEVEL, LEVELS, get_log_queue, log_to_queue, logging_to, worker_context
+from ssg.manifest import BuildManifest, PageInputs
+from ssg.preview import DEFAULT_CACHE_BYTES, STATS_PATH, PageCache, PreviewPages, start_preview_server
+from ssg.profiling import BuildProfile, site_phase
+from ssg.serve import ReloadBroadcaster, start_server
+from ssg.sink import DirectorySink, Sink, open_sink
+from ssg.template import Markup, Template, load_template, preload_templates, read_front_matter
+from ssg.urls import UrlResolver, using_url_resolver
+from ssg.watch import Changes, Watcher, watch
 
 logger = logging.getLogger(__name__)
-logging.basicConfig(filename="out.log", level=logging.INFO)
 
 
-def dircopy(source: str | Path, dest: str | Path) -> None:
+def dircopy(
+    source: str | Path,
+    dest: str | Path,
+    *,
+    clean: bool = True,
+    workers: int = DEFAULT_WORKERS,
+    sink: Sink | None = None,
+) -> None:
     """Copy all content recursively from one tree to the other.
 
-    Deletes the target file tree before the copy.
+    Deletes the target file tree before the copy, unless clean is False. Files are copied by the
+    threaded copy engine of sync_tree, or handed to the sink one by one when it is not a directory.
 
     Args:
         source (str | Path): Path that is the root of the copy source tree.
         dest (str | Path): Path that is the root of the destination tree.
+        clean (bool): delete the destination tree first, otherwise files are copied over it and files
+            that are only in the destination, such as generated pages, are kept.
+        workers (int): number of threads copying files.
+        sink (Sink | None): where the files are written, dest being a directory of the sink. A
+            DirectorySink of the working directory by default.
 
     Raises:
         FileNotFoundError: If either path is a file and not a directory.
     """
     if not Path(source).is_dir() or not Path(source).exists():
-        raise FileNotFoundError(f"{source} is not a directory")
+        msg = f"{source} is not a directory"
+        raise FileNotFoundError(msg)
+    if sink is not None and not isinstance(sink, DirectorySink):
+        _, files = scan_tree(source)
+        for relative, _ in files:
+            sink.copy_file(Path(source) / relative, Path(dest) / relative)
+        logger.info("assets: %d copied", len(files))
+        return
+    if sink is not None:
+        dest = sink.root / dest
     if Path(dest).exists() and not Path(dest).is_dir():
-        logger.info(f"{dest} is not a directory")
-        raise FileNotFoundError(f"{dest} is not a directory")
+        logger.info("%s is not a directory", dest)
+        msg = f"{dest} is not a directory"
+        raise FileNotFoundError(msg)
 
-    if Path(dest).exists():
+    if clean and Path(dest).exists():
         shutil.rmtree(dest)
-    Path(dest).mkdir(parents=True, exist_ok=True)
-
-    children = Path(source).iterdir()
-    for child in children:
-        if child.is_dir():
-            # dircopy using Pathlib
-            dircopy(child, Path(dest) / child.name)
-        else:
-            logger.info(f"copying {child} to {Path(dest) / child.name}")
-            _ = shutil.copy(child, Path(dest) / child.name)
+    stats = sync_tree(source, dest, workers=workers)
+    stats.log_stats()
 
 
 def extract_title(markdown: str) -> str:
@@ -68,45 +107,390 @@ def extract_title(markdown: str) -> str:
     return h1.group(1)
 
 
-def generate_page(
+def _iter_cached_html(lines: Iterable[str], fragment_cache: FragmentCache, resolver: UrlResolver) -> Iterator[str]:
+    yield "<div>"
+    empty = True
+    for block in iter_blocks(lines):
+        yield fragment_cache.render_block(block, resolver)
+        empty = False
+    if empty:
+        msg = "children can not be None"
+        raise ValueError(msg)
+    yield "</div>"
+
+
+def generate_page(  # noqa: PLR0913
     from_path: str | Path,
     template_path: str | Path,
     dest_path: str | Path,
     base_path: str | Path,
+    fragment_cache: FragmentCache | None = None,
+    *,
+    sink: Sink | None = None,
+    links: set[str] | None = None,
 ) -> None:
     """Generate an html page based on the template and teh source markdown storing at dest_path.
 
+    The page is streamed to the sink one block at a time, so neither the markdown nor the html of the
+    whole page is ever held in memory at once. The default sink writes it to a temporary file first
+    and moves it into place once complete.
+
+    The template is compiled once and cached, see ssg.template. Its {{ Title }} is the title field
+    of the page front matter, or else the first line of the markdown, {{ Content }} is the html of
+    the markdown and every other front matter field can be used by name.
+
     Args:
         from_path: source path for markdown
         template_path: template path containing html skeleton
         dest_path: path to write final html page
         base_path: base path for the site
+        fragment_cache: when given, blocks repeated across pages are only rendered once, see
+            FragmentCache.render_block
+        sink: where the page is written, dest_path being its path in the sink, a DirectorySink of the
+            working directory by default
+        links: when given, the urls of the links and images of the page are added to it as the page
+            renders, see ssg.links
     """
-    logger.info(f"Generating page from {from_path} to {dest_path} using {template_path}")
-    # open with Path.open
+    logger.info("Generating page from %s to %s using %s", from_path, dest_path, template_path)
+    template = load_template(template_path)
+    if sink is None:
+        sink = DirectorySink()
+
     with Path(from_path).open() as source:
-        markdown = source.read()
+        html = _iter_page(source, template, base_path, fragment_cache, links)
+        with sink.open_text(dest_path) as file:
+            file.writelines(html)
+
+
+def render_page(
+    from_path: str | Path,
+    template_path: str | Path,
+    base_path: str | Path,
+    fragment_cache: FragmentCache | None = None,
+    *,
+    links: set[str] | None = None,
+) -> str:
+    """Renders an html page in memory instead of writing it, see generate_page.
+
+    Args:
+        from_path: source path for markdown
+        template_path: template path containing html skeleton
+        base_path: base path for the site
+        fragment_cache: see generate_page
+        links: see generate_page
+
+    Returns:
+        the html of the page
+    """
+    template = load_template(template_path)
+    with Path(from_path).open() as source:
+        return "".join(_iter_page(source, template, base_path, fragment_cache, links))
+
+
+def _iter_page(
+    source: TextIO,
+    template: Template,
+    base_path: str | Path,
+    fragment_cache: FragmentCache | None,
+    links: set[str] | None = None,
+) -> Iterator[str]:
+    """Reads the front matter and title of a page, then renders it lazily as the returned iterator is consumed.
 
-    with Path(template_path).open() as template:
-        html_temp = template.read()
+    Site absolute urls are resolved against base_path as the page is rendered: the url resolver hook
+    is set for the links and images of the markdown while it renders, and the template resolves its
+    own urls.
 
-    content = markdown_to_html_node(markdown).to_html()
-    title = extract_title(markdown)
-    full = html_temp.replace("{{ Title }}", title).replace("{{ Content }}", content)
+    Raises:
+        ValueError: the page has no title
+    """
+    resolver = UrlResolver(str(base_path))
+    front_matter, first_line = read_front_matter(source)
+    title = front_matter["title"] if "title" in front_matter else extract_title(first_line)
+    lines = chain((first_line,), source)
+    if fragment_cache is None:
+        fragments = iter_markdown_html(lines)
+    else:
+        fragments = _iter_cached_html(lines, fragment_cache, resolver)
+    context = {**front_matter, "Title": title, "Content": fragments}
+    hook = resolver if links is None else LinkRecorder(resolver, links)
+    return _resolving(hook, template.resolve_urls(resolver).iter_render(context))
+
+
+def _resolving(resolver: Callable[[str], str], fragments: Iterator[str]) -> Iterator[str]:
+    with using_url_resolver(resolver):
+        yield from fragments
 
-    full = full.replace('href="/', f'href="{base_path}/').replace('src="/', f'src="{base_path}/')
 
-    Path(dest_path).parent.mkdir(exist_ok=True, parents=True)
-    with Path(dest_path).open("w") as file:
-        _ = file.write(full)
+class PageJob(NamedTuple):
+    """One page to generate, collected by collect_page_jobs and run by run_page_jobs."""
 
+    source: Path
+    dest: Path
+    template: Path
+    base_path: Path
+    # recorded in the build manifest once the page is built, None when there is no manifest
+    inputs: PageInputs | None = None
+    # size of the source in bytes, the largest pages are handed to workers first
+    size: int = 0
 
-def generate_pages_recursive(
+
+def collect_page_jobs(  # noqa: PLR0913
     dir_path_content: str | Path,
     template_path: str | Path,
     dest_dir_path: str | Path,
     base_path: str | Path,
+    manifest: BuildManifest | None = None,
+    *,
+    pages: Iterable[PageSource] | None = None,
+) -> list[PageJob]:
+    """Lists the pages to generate, without generating them.
+
+    Args:
+        dir_path_content: path where the md content lives
+        template_path: path where the html template lives
+        dest_dir_path: path to put all html pages in
+        base_path: base path for the site
+        manifest: when given, pages whose source, template and base path are unchanged since they
+            were last built are left out
+        pages: pages found by discover_pages, every page of dir_path_content in name order by default
+
+    Returns:
+        the pages to generate, in the order of pages
+    """
+    if pages is None:
+        pages = discover_pages(dir_path_content, dest_dir_path)
+    jobs: list[PageJob] = []
+    partials = [] if manifest is None else list(load_template(template_path).dependencies)[1:]
+    for source, dest, size in pages:
+        inputs = None
+        if manifest is not None:
+            inputs = manifest.inputs(source, template_path, Path(base_path), partials)
+            if manifest.is_current(dest, inputs):
+                logger.info("%s is up to date", dest)
+                continue
+        jobs.append(PageJob(source, dest, Path(template_path), Path(base_path), inputs, size))
+    return jobs
+
+
+def _generate_profiled_page(job: PageJob, profile: BuildProfile, sink: Sink, links: set[str]) -> None:
+    """Generates a page phase by phase, timing each phase, see ssg.profiling.
+
+    The page is rendered through its HTMLNode tree rather than streamed, so that each phase runs on
+    its own. The html is the same as the one generate_page writes.
+    """
+    template = load_template(job.template)
+    resolver = UrlResolver(str(job.base_path))
+    with profile.page(job.source, job.dest):
+        with profile.phase("read"), job.source.open() as source:
+            front_matter, first_line = read_front_matter(source)
+            title = front_matter["title"] if "title" in front_matter else extract_title(first_line)
+            markdown = first_line + source.read()
+        with profile.phase("blocks"):
+            blocks = markdown_to_blocks(markdown)
+        with profile.phase("classify"):
+            rules = [block_to_rule(block) for block in blocks]
+        hook = profile.timed("urls", LinkRecorder(resolver, links))
+        with (
+            using_url_resolver(hook),
+            profile.phase("tree"),
+            profile.instrument(inline, "iter_spans", "inline"),
+        ):
+            children = [rule.handler(block) for rule, block in zip(rules, blocks, strict=True)]
+            root = ParentNode(tag="div", children=children)
+        with profile.phase("to_html"):
+            content = Markup(root.to_html())
+        with profile.phase("urls"):
+            template = template.resolve_urls(resolver)
+        with profile.phase("template"):
+            html = template.render({**front_matter, "Title": title, "Content": content})
+        with profile.phase("write"):
+            sink.write_text(job.dest, html)
+
+
+def _generate_job(
+    job: PageJob, fragment_cache: FragmentCache | None, sink: Sink, profile: BuildProfile | None
+) -> set[str]:
+    """Generates the page of a job in this process.
+
+    Returns:
+        the urls of the links and images of the page
+    """
+    urls: set[str] = set()
+    if profile is None:
+        generate_page(job.source, job.template, job.dest, job.base_path, fragment_cache, sink=sink, links=urls)
+    else:
+        _generate_profiled_page(job, profile, sink, urls)
+    return urls
+
+
+_worker_fragment_cache: FragmentCache | None = None
+_worker_sink: DirectorySink | None = None
+
+
+def _init_worker(
+    highlight: tuple[Path, int] | None,
+    fragment_cache_size: int | None,
+    templates: list[Template],
+    sink: DirectorySink | None,
+    log: tuple[Queue[logging.LogRecord], int] | None,
 ) -> None:
+    global _worker_fragment_cache, _worker_sink  # noqa: PLW0603
+    if log is not None:
+        log_to_queue(*log)
+    preload_templates(templates)
+    set_highlight_cache(None if highlight is None else HighlightCache(*highlight))
+    _worker_fragment_cache = None if fragment_cache_size is None else FragmentCache(fragment_cache_size)
+    _worker_sink = sink
+
+
+def _worker_log() -> tuple[Queue[logging.LogRecord], int] | None:
+    """The log queue of the command line and the level of this process, for the worker initializer."""
+    queue = get_log_queue()
+    return None if queue is None else (queue, logging.getLogger().getEffectiveLevel())
+
+
+class _CacheCounts(NamedTuple):
+    """Hits, misses and evictions of a cache, or what a worker added to them while rendering a page."""
+
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+
+
+def _cache_counts(cache: FragmentCache | HighlightCache | None) -> _CacheCounts:
+    return _CacheCounts() if cache is None else _CacheCounts(cache.hits, cache.misses, cache.evictions)
+
+
+def _add_counts(cache: FragmentCache | HighlightCache | None, counts: _CacheCounts) -> None:
+    if cache is not None:
+        cache.count(*counts)
+
+
+def _run_page_job(job: PageJob) -> tuple[str | None, set[str], _CacheCounts, _CacheCounts]:
+    """Writes a page straight to the worker sink, or returns its html when the parent has to write it.
+
+    Returns:
+        the html or None, the urls of the links of the page, and what rendering the page added to the
+        counters of the worker fragment cache and highlight cache
+    """
+    fragment_cache = _worker_fragment_cache
+    highlight_cache = get_highlight_cache()
+    fragments_before = _cache_counts(fragment_cache)
+    highlights_before = _cache_counts(highlight_cache)
+    links: set[str] = set()
+    html = None
+    if _worker_sink is None:
+        html = render_page(job.source, job.template, job.base_path, fragment_cache, links=links)
+    else:
+        generate_page(job.source, job.template, job.dest, job.base_path, fragment_cache, sink=_worker_sink, links=links)
+    fragments = _CacheCounts(*(a - b for a, b in zip(_cache_counts(fragment_cache), fragments_before, strict=True)))
+    highlights = _CacheCounts(*(a - b for a, b in zip(_cache_counts(highlight_cache), highlights_before, strict=True)))
+    return html, links, fragments, highlights
+
+
+def _page_links(source: Path, urls: set[str]) -> PageLinks | None:
+    return PageLinks(str(source), tuple(sorted(urls))) if urls else None
+
+
+def run_page_jobs(  # noqa: PLR0913
+    jobs: Sequence[PageJob],
+    workers: int = 1,
+    fragment_cache: FragmentCache | None = None,
+    manifest: BuildManifest | None = None,
+    *,
+    sink: Sink | None = None,
+    progress: Callable[[int, int], None] | None = None,
+    profile: BuildProfile | None = None,
+) -> dict[Path, PageLinks | None]:
+    """Generates the pages of a list of jobs, across a process pool when more than one worker is asked for.
+
+    The jobs are handed to the workers largest page first, so that a few large pages left for the
+    end do not keep one worker busy while the others idle, and in chunks so that small pages do not
+    each pay for a round trip to a worker. The pages are the same whatever the number of workers.
+
+    Workers write to a DirectorySink themselves. Any other sink, such as an archive, can only be
+    written by this process, so workers send it the html of their pages instead.
+
+    Workers are started from a fork server rather than forked from this process, which already runs
+    threads such as the log listener. They get the templates, the highlight cache and the log queue
+    from their initializer, state changed at run time, such as added block rules, does not reach them.
+    Each worker opens the directory of the highlight cache on its own, the hits and misses of its
+    caches come back with every page and are added to the caches of this process.
+
+    Args:
+        jobs: pages to generate, from collect_page_jobs
+        workers: number of worker processes, 1 generates the pages in this process
+        fragment_cache: cache used when generating in this process, each worker process gets a
+            FragmentCache of its own when this is given and their counters are added to this one
+        manifest: build manifest that every generated page is recorded in, with its links
+        sink: where the pages are written, see generate_page
+        progress: called with the number of pages done and the number of jobs after every page
+        profile: when given, the pages are generated phase by phase in this process and timed into it,
+            whatever the number of workers
+
+    Returns:
+        the links of every generated page, by page
+    """
+    if sink is None:
+        sink = DirectorySink()
+    links: dict[Path, PageLinks | None] = {}
+
+    def done(job: PageJob, urls: set[str]) -> None:
+        links[job.dest] = _page_links(job.source, urls)
+        if manifest is not None and job.inputs is not None:
+            manifest.record(job.dest, job.inputs, links[job.dest])
+        if progress is not None:
+            progress(len(links), len(jobs))
+
+    if workers <= 1 or len(jobs) <= 1 or profile is not None:
+        for job in jobs:
+            done(job, _generate_job(job, fragment_cache, sink, profile))
+        return links
+
+    workers = min(workers, len(jobs))
+    jobs = sorted(jobs, key=lambda job: job.size, reverse=True)
+    # a few chunks per worker keeps them all busy when page sizes are uneven
+    chunksize = max(1, len(jobs) // (workers * 4))
+    highlight_cache = get_highlight_cache()
+    # compiled here once and handed to every worker
+    templates = [load_template(path) for path in dict.fromkeys(job.template for job in jobs)]
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=worker_context(),
+        initializer=_init_worker,
+        initargs=(
+            None if highlight_cache is None else (highlight_cache.directory, highlight_cache.max_bytes),
+            None if fragment_cache is None else fragment_cache.max_entries,
+            templates,
+            sink if isinstance(sink, DirectorySink) else None,
+            _worker_log(),
+        ),
+    ) as executor:
+        for job, (html, urls, fragments, highlights) in zip(
+            jobs, executor.map(_run_page_job, jobs, chunksize=chunksize), strict=True
+        ):
+            if html is not None:
+                sink.write_text(job.dest, html)
+            _add_counts(fragment_cache, fragments)
+            _add_counts(highlight_cache, highlights)
+            done(job, urls)
+    if highlight_cache is not None:
+        # the workers wrote and evicted entries this process has not seen
+        highlight_cache.refresh()
+    return links
+
+
+def generate_pages_recursive(  # noqa: PLR0913
+    dir_path_content: str | Path,
+    template_path: str | Path,
+    dest_dir_path: str | Path,
+    base_path: str | Path,
+    fragment_cache: FragmentCache | None = None,
+    *,
+    manifest: BuildManifest | None = None,
+    jobs: int = 1,
+    sink: Sink | None = None,
+) -> dict[Path, PageLinks | None]:
     """Generates html pages recursively from a directory containing markdown files.
 
     This function will create a directory tree in the desination directory
@@ -116,44 +500,527 @@ def generate_pages_recursive(
         template_path: path where the html template lives
         dest_dir_path: path to put all html pages in
         base_path: base path for the site
+        fragment_cache: cache shared by every page, see generate_page
+        manifest: when given, pages whose source, template and base path are unchanged since they
+            were last built are skipped, and every page built is recorded in it
+        jobs: number of processes generating pages, see run_page_jobs
+        sink: where the pages are written, dest_dir_path being a directory of the sink, see generate_page
+
+    Returns:
+        the links of every generated page, see run_page_jobs
     """
-    children = Path(dir_path_content).iterdir()
-    for child in children:
-        if child.name.endswith(".md"):
-            generate_page(
-                child, template_path, Path(dest_dir_path) / child.name.replace(".md", ".html"), Path(base_path)
-            )
-        if child.is_dir():
-            generate_pages_recursive(child, template_path, Path(dest_dir_path) / child.name, Path(base_path))
+    page_jobs = collect_page_jobs(dir_path_content, template_path, dest_dir_path, base_path, manifest)
+    return run_page_jobs(page_jobs, jobs, fragment_cache, manifest, sink=sink)
 
 
-def main() -> None:
-    """Main function.
+COMMANDS = ("build", "watch", "serve")
 
-    does everything
+
+class Site(NamedTuple):
+    """Where the inputs and the outputs of the site live."""
+
+    content: Path
+    static: Path
+    template: Path
+    docs: Path
+    cache: Path
+
+    @classmethod
+    def at(cls, root: Path) -> "Site":
+        """The site laid out in the usual way under a root directory.
+
+        Args:
+            root: project directory
+
+        Returns:
+            the site
+        """
+        return cls(root / "content", root / "static", root / "template.html", root / "docs", root / ".ssg-cache")
+
+
+def _page_dest(source: Path, site: Site) -> Path:
+    return site.docs / source.parent.relative_to(site.content) / source.name.replace(".md", ".html")
+
+
+class _ProgressLine:
+    """Shows how many pages of a build are done, on one line of a terminal."""
+
+    # seconds between two updates of the line
+    interval = 0.1
+
+    def __init__(self, stream: TextIO) -> None:
+        self.stream: TextIO = stream
+        self._shown: float = 0.0
+
+    def __call__(self, done: int, total: int) -> None:
+        now = time.monotonic()
+        if done < total and now - self._shown < self.interval:
+            return
+        self._shown = now
+        _ = self.stream.write(f"\rgenerating pages {done}/{total}" + ("\n" if done == total else ""))
+        self.stream.flush()
+
+
+def build_site(site: Site, base_path: str, args: argparse.Namespace) -> BuildManifest:
+    """Builds the site, only writing the pages and assets whose inputs changed unless args.force is set.
+
+    The pages are discovered up front, limited to args.paths and filtered by args.include and
+    args.exclude, then generated.
+
+    With args.profile, the pages are generated in this process phase by phase and the time of every
+    phase is written to the json file args.profile names, with a summary on stderr.
+
+    With args.fragment_cache above 0, blocks repeated across pages are rendered once, see
+    FragmentCache.render_block, and the hits and misses of the cache are logged at the end.
+
+    Args:
+        site: the site to build
+        base_path: base path for the site
+        args: options of the build command
+
+    Returns:
+        the build manifest, already saved
+    """
+    profile = BuildProfile() if args.profile else None
+    if args.force and site.docs.exists():
+        shutil.rmtree(site.docs)
+
+    manifest = BuildManifest(site.cache / "manifest.json")
+    if args.force:
+        manifest.clear()
+    with site_phase(profile, "assets"):
+        assets = sync_tree(
+            site.static,
+            site.docs,
+            manifest.assets,
+            checksum=args.checksum,
+            link=LinkMode(args.link),
+            workers=args.copy_workers,
+        )
+    manifest.assets = assets.assets
+    assets.log_stats()
+
+    highlight_cache = HighlightCache(site.cache / "highlight")
+    set_highlight_cache(highlight_cache)
+    fragment_cache = FragmentCache(args.fragment_cache) if args.fragment_cache > 0 else None
+
+    roots = args.paths or [site.content]
+    with site_phase(profile, "discover"):
+        pages = discover_pages(site.content, site.docs, roots, include=args.include, exclude=args.exclude)
+    try:
+        with site_phase(profile, "collect"):
+            jobs = collect_page_jobs(site.content, site.template, site.docs, base_path, manifest, pages=pages)
+        progress = _ProgressLine(sys.stderr) if sys.stderr.isatty() else None
+        workers = args.jobs or os.cpu_count() or 1
+        run_page_jobs(jobs, workers, fragment_cache, manifest, progress=progress, profile=profile)
+        _ = manifest.remove_orphans(_orphan_scope(site, manifest, args), root=site.docs)
+    finally:
+        manifest.save()
+    manifest.log_stats()
+    highlight_cache.log_stats()
+    if fragment_cache is not None:
+        fragment_cache.log_stats()
+    with site_phase(profile, "links"):
+        broken = check_links(site, manifest)
+    if profile is not None:
+        profile.write(args.profile)
+        _ = sys.stderr.write(profile.summary())
+        _ = sys.stderr.write(f"profile written to {args.profile}\n")
+    _report_broken_links(broken, strict=args.strict_links)
+    return manifest
+
+
+def _orphan_scope(site: Site, manifest: BuildManifest, args: argparse.Namespace) -> list[Path] | None:
+    """The outputs a build may delete as orphans, None for all of them.
+
+    A build limited to paths, or filtered by patterns, did not visit the pages outside its selection,
+    so their outputs are kept.
+    """
+    within = [site.docs / Path(root).relative_to(site.content) for root in args.paths] if args.paths else None
+    if not args.include and not args.exclude:
+        return within
+    selected: list[Path] = []
+    for key in manifest.orphans(within):
+        relative = Path(key).relative_to(site.docs).with_suffix(".md").as_posix()
+        if is_selected(relative, args.include, args.exclude):
+            selected.append(Path(key))
+    return selected
+
+
+def check_links(site: Site, manifest: BuildManifest) -> list[BrokenLink]:
+    """Checks the internal links of every page of the site against the pages and assets it was built to.
+
+    The links were recorded in the manifest while the pages rendered, so pages that were up to date
+    are checked without being read.
+
+    Args:
+        site: the site
+        manifest: manifest of the last build of the site
+
+    Returns:
+        the broken links
+    """
+    index = LinkIndex()
+    for output in manifest.entries:
+        index.add_page(Path(output).relative_to(site.docs).as_posix(), manifest.links.get(output))
+    index.add_assets(manifest.assets)
+    return index.check()
+
+
+def _report_broken_links(broken: list[BrokenLink], *, strict: bool) -> None:
+    """Logs the broken links as warnings, and fails the build with them when strict.
+
+    Raises:
+        SystemExit: there are broken links and strict is set
+    """
+    for link in broken:
+        logger.warning("%s", link)
+    if broken and strict:
+        msg = f"{len(broken)} broken links"
+        raise SystemExit(msg)
+
+
+def export_site(site: Site, base_path: str, args: argparse.Namespace) -> None:
+    """Builds the whole site straight into the sink named by args.output, leaving docs/ alone.
+
+    Pages go from the generator into the sink, so an archive is written without the site being
+    written to disk and read back first.
+
+    Args:
+        site: the site to build
+        base_path: base path for the site
+        args: options of the build command
+    """
+    set_highlight_cache(HighlightCache(site.cache / "highlight"))
+    fragment_cache = FragmentCache(args.fragment_cache) if args.fragment_cache > 0 else None
+    with open_sink(args.output) as sink:
+        dircopy(site.static, Path(), clean=False, workers=args.copy_workers, sink=sink)
+        links = generate_pages_recursive(
+            site.content,
+            site.template,
+            Path(),
+            base_path,
+            fragment_cache,
+            jobs=args.jobs or os.cpu_count() or 1,
+            sink=sink,
+        )
+    if fragment_cache is not None:
+        fragment_cache.log_stats()
+    index = LinkIndex()
+    for output, page_links in links.items():
+        index.add_page(output.as_posix(), page_links)
+    index.add_assets(relative for relative, _ in scan_tree(site.static)[1])
+    _report_broken_links(index.check(), strict=args.strict_links)
+
+
+def _rebuild_path(site: Site, base_path: str, manifest: BuildManifest, path: Path, partials: list[Path]) -> Path | None:
+    """Rebuilds the output of one created or modified source.
+
+    Returns:
+        the output written, None when path is not a source or its output was already up to date
+    """
+    content = site.content.resolve()
+    if path.is_relative_to(content):
+        if not path.name.endswith(".md"):
+            return None
+        source = site.content / path.relative_to(content)
+        dest = _page_dest(source, site)
+        inputs = manifest.inputs(source, site.template, Path(base_path), partials)
+        urls: set[str] = set()
+        generate_page(source, site.template, dest, base_path, links=urls)
+        manifest.record(dest, inputs, _page_links(source, urls))
+        return dest
+    static = site.static.resolve()
+    if path.is_relative_to(static):
+        relative = path.relative_to(static).as_posix()
+        if relative not in manifest.assets:
+            manifest.assets.append(relative)
+        if sync_asset(site.static, site.docs, relative) is not None:
+            return site.docs / relative
+    return None
+
+
+def _remove_output(site: Site, manifest: BuildManifest, path: Path) -> Path | None:
+    """Deletes the output of a deleted source.
+
+    Returns:
+        the output deleted, None when path is not a source
     """
-    base_path = sys.argv[1] if len(sys.argv) > 1 else "/"
+    content = site.content.resolve()
+    static = site.static.resolve()
+    if path.is_relative_to(content) and path.name.endswith(".md"):
+        dest = _page_dest(site.content / path.relative_to(content), site)
+        manifest.forget(dest)
+    elif path.is_relative_to(static):
+        relative = path.relative_to(static).as_posix()
+        dest = site.docs / relative
+        if relative in manifest.assets:
+            manifest.assets.remove(relative)
+    else:
+        return None
+    dest.unlink(missing_ok=True)
+    return dest
+
+
+def rebuild_changes(site: Site, base_path: str, manifest: BuildManifest, changes: Changes) -> list[Path]:
+    """Rebuilds only what a batch of file changes affects.
+
+    A changed markdown file regenerates its own page and a changed static file is copied on its own.
+    A change to the template or to one of its partials regenerates every page. Deleted sources have
+    their outputs deleted.
+
+    Args:
+        site: the site being watched
+        base_path: base path for the site
+        manifest: build manifest, kept up to date with what is rebuilt
+        changes: changes reported by the watcher, as resolved paths
+
+    Returns:
+        the outputs written or deleted
+    """
+    template = load_template(site.template)
+    if any(path in template.dependencies for path in changes.paths):
+        manifest.forget_hashes()
+        jobs = collect_page_jobs(site.content, site.template, site.docs, base_path, manifest)
+        run_page_jobs(jobs, manifest=manifest)
+        return [job.dest for job in jobs]
+
+    partials = list(template.dependencies)[1:]
+    outputs = [_rebuild_path(site, base_path, manifest, path, partials) for path in changes.created + changes.modified]
+    outputs.extend(_remove_output(site, manifest, path) for path in changes.deleted)
+    return [output for output in outputs if output is not None]
+
+
+def watch_site(site: Site, base_path: str, args: argparse.Namespace) -> None:
+    """Builds the site, serves it and rebuilds what changes until interrupted.
+
+    Browsers viewing the site reload through server-sent events once a rebuild is done.
+
+    Args:
+        site: the site to watch
+        base_path: base path for the site
+        args: options of the watch command
+    """
+    manifest = build_site(site, base_path, args)
+    broadcaster = ReloadBroadcaster()
+    server, _ = start_server(site.docs, args.host, args.port, broadcaster)
+    host, port = server.server_address[:2]
+    _ = sys.stderr.write(f"serving {site.docs} at http://{host}:{port}/, watching for changes\n")
+
+    def template_files() -> list[Path]:
+        return list(load_template(site.template).dependencies)
+
+    watched_templates = template_files()
+    watcher = Watcher([site.content, site.static, *watched_templates])
+
+    def on_change(changes: Changes) -> None:
+        nonlocal watched_templates
+        started = time.perf_counter()
+        outputs = rebuild_changes(site, base_path, manifest, changes)
+        if template_files() != watched_templates:
+            # the template now includes other partials
+            watched_templates = template_files()
+            watcher.set_roots([site.content, site.static, *watched_templates])
+        broadcaster.notify()
+        elapsed = 1000 * (time.perf_counter() - started)
+        _ = sys.stderr.write(f"rebuilt {len(outputs)} files in {elapsed:.0f} ms\n")
+        _report_broken_links(check_links(site, manifest), strict=False)
+
+    stop = threading.Event()
+    try:
+        watch(watcher, on_change, stop, args.interval)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop.set()
+        broadcaster.close()
+        server.shutdown()
+        manifest.save()
+
+
+def serve_site(site: Site, base_path: str, args: argparse.Namespace) -> None:
+    """Serves a preview of the site that renders each page when it is requested, until interrupted.
+
+    Nothing is built up front, so the server starts at once however large the site is. Rendered
+    pages are kept in a cache bounded by args.cache_size and rendered again once their source or the
+    template changes.
+
+    Args:
+        site: the site to preview
+        base_path: base path for the site
+        args: options of the serve command
+    """
+    set_highlight_cache(HighlightCache(site.cache / "highlight"))
+    cache = PageCache(args.cache_size << 20)
+    pages = PreviewPages(
+        site.content,
+        site.template,
+        functools.partial(render_page, template_path=site.template, base_path=base_path),
+        cache,
+    )
+    server, thread = start_preview_server(site.static, args.host, args.port, pages, base_path)
+    host, port = server.server_address[:2]
+    _ = sys.stderr.write(f"previewing {site.content} at http://{host}:{port}{base_path}, stats at {STATS_PATH}\n")
+    try:
+        thread.join()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
+
+
+def _normalize_base_path(base_path: str) -> str:
     if not base_path.startswith("/"):
         base_path = "/" + base_path
     if not base_path.endswith("/"):
         base_path = base_path + "/"
+    return base_path
+
+
+def _add_logging_options(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "--log-level", choices=LEVELS, default=DEFAULT_LEVEL, help=f"lowest level logged (default {DEFAULT_LEVEL})"
+    )
+    parser.add_argument("--log-file", metavar="FILE", help="append the log to FILE instead of writing it to stderr")
+
+
+def _add_build_options(parser: argparse.ArgumentParser) -> None:
+    _add_logging_options(parser)
+    parser.add_argument("--base-path", help="path the site is served under (default /)")
+    parser.add_argument(
+        "--force", action="store_true", help="rebuild every page instead of only the ones whose inputs changed"
+    )
+    parser.add_argument(
+        "--checksum", action="store_true", help="compare static files by content hash instead of modification time"
+    )
+    parser.add_argument(
+        "--link",
+        choices=[mode.value for mode in LinkMode],
+        default=LinkMode.COPY.value,
+        help="hardlink or reflink static files into docs/ instead of copying them, when the file system allows it",
+    )
+    parser.add_argument(
+        "--copy-workers",
+        type=int,
+        default=DEFAULT_WORKERS,
+        help=f"number of threads copying static files (default {DEFAULT_WORKERS})",
+    )
+    parser.add_argument(
+        "--strict-links",
+        action="store_true",
+        help="fail the build when a page links to a page or file that is not built",
+    )
+    parser.add_argument(
+        "-j", "--jobs", type=int, default=1, help="number of processes generating pages, 0 uses one per core"
+    )
+    parser.add_argument(
+        "--fragment-cache",
+        type=int,
+        default=0,
+        metavar="ENTRIES",
+        help="render markdown blocks repeated across pages once, keeping up to ENTRIES blocks per process "
+        "(default 0, off)",
+    )
+
+
+def _parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="ssg", description="Static site generator, builds content/ into docs/.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    build = commands.add_parser("build", help="build the site")
+    build.add_argument("paths", nargs="*", help="only build these files and directories of content/")
+    _add_build_options(build)
+    build.add_argument(
+        "--include",
+        action="append",
+        default=[],
+        metavar="GLOB",
+        help="only build pages whose path relative to content/ matches this pattern, such as 'blog/*'",
+    )
+    build.add_argument(
+        "--exclude",
+        action="append",
+        default=[],
+        metavar="GLOB",
+        help="leave out pages whose path relative to content/ matches this pattern, such as '*/drafts/*'",
+    )
+    build.add_argument(
+        "--profile",
+        nargs="?",
+        const="profile.json",
+        metavar="FILE",
+        help="time every phase of every generated page and write the report to FILE (default profile.json), "
+        "pages are then generated in one process, add --force to profile every page",
+    )
+    build.add_argument(
+        "-o",
+        "--output",
+        help="write the whole site to this directory, .zip, .tar or .tar.gz archive instead of docs/, - streams a tar "
+        "to stdout",
+    )
+
+    watch = commands.add_parser("watch", help="build and serve the site, rebuilding what changes")
+    _add_build_options(watch)
+    watch.set_defaults(paths=[], include=[], exclude=[], profile=None)
+    watch.add_argument("--host", default="127.0.0.1", help="address to serve on (default 127.0.0.1)")
+    watch.add_argument("--port", type=int, default=8888, help="port to serve on (default 8888)")
+    watch.add_argument(
+        "--interval", type=float, default=0.05, help="seconds between two scans for changes (default 0.05)"
+    )
+
+    serve = commands.add_parser("serve", help="preview the site, rendering pages on request without building it")
+    _add_logging_options(serve)
+    serve.add_argument("--base-path", help="path the site is served under (default /)")
+    serve.add_argument("--host", default="127.0.0.1", help="address to serve on (default 127.0.0.1)")
+    serve.add_argument("--port", type=int, default=8888, help="port to serve on (default 8888)")
+    serve.add_argument(
+        "--cache-size",
+        type=int,
+        default=DEFAULT_CACHE_BYTES >> 20,
+        help=f"megabytes of rendered pages kept in memory (default {DEFAULT_CACHE_BYTES >> 20})",
+    )
+    return parser
+
+
+def main(argv: Sequence[str] | None = None) -> None:
+    """Main function.
+
+    does everything
+
+    Args:
+        argv: command line arguments, sys.argv[1:] when None. A command line without a command, such
+            as the older ``main.py <base_path>``, runs the build command.
+    """
+    argv = list(sys.argv[1:] if argv is None else argv)
+    if not argv or argv[0] not in (*COMMANDS, "-h", "--help"):
+        argv.insert(0, "build")
+    parser = _parser()
+    args = parser.parse_args(argv)
+    paths = getattr(args, "paths", [])
+    if len(paths) == 1 and args.base_path is None and not Path(paths[0]).exists():
+        # the older main.py <base_path>
+        args.base_path = paths.pop()
+    base_path = _normalize_base_path(args.base_path or "/")
+    paths = [Path(path).resolve() for path in paths]
 
     if Path.cwd().name == "ssg":
         os.chdir("..")
-    if Path("docs").exists():
-        shutil.rmtree("docs")
-
-    base_dir = Path.cwd()
-    if base_dir.name == "src":
-        base_dir = base_dir.parent
-    source = base_dir / Path("static")
-    dest = base_dir / Path("docs")
-    dircopy(source, dest)
-
-    template_path = "template.html"
-    content_path = "content"
-    dest_path = "docs"
-    generate_pages_recursive(content_path, template_path, dest_path, base_path)
+    site = Site.at(Path("..") if Path.cwd().name == "src" else Path())
+    content = site.content.resolve()
+    if any(not path.is_relative_to(content) for path in paths):
+        parser.error(f"paths to build must be inside {site.content}")
+    if paths:
+        args.paths = [site.content / path.relative_to(content) for path in paths]
+
+    with logging_to(args.log_level, args.log_file):
+        if args.command == "watch":
+            watch_site(site, base_path, args)
+        elif args.command == "serve":
+            serve_site(site, base_path, args)
+        elif args.output:
+            export_site(site, base_path, args)
+        else:
+            _ = build_site(site, base_path, args)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,247 @@
+"""Build manifest recording the inputs of every generated page, for incremental builds."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from ssg.links import PageLinks
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+
+logger = logging.getLogger(__name__)
+
+# bumped whenever the layout of the manifest changes, older manifests are then ignored
+MANIFEST_VERSION = 2
+
+PageInputs = dict[str, str]
+
+
+def hash_file(path: str | Path) -> str:
+    """Hashes the content of a file.
+
+    Args:
+        path: file to hash
+
+    Returns:
+        hex sha256 digest of the file
+    """
+    digest = hashlib.sha256()
+    with Path(path).open("rb") as file:
+        for chunk in iter(lambda: file.read(1 << 16), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def prune_empty_dirs(path: str | Path, root: str | Path) -> None:
+    """Deletes a directory and its parents for as long as they are empty, stopping below root.
+
+    root itself and directories outside of it are never deleted.
+
+    Args:
+        path: directory a file was removed from
+        root: output directory, such as docs/
+    """
+    path = Path(path)
+    root = Path(root)
+    while path != root and root in path.parents:
+        try:
+            path.rmdir()
+        except OSError:
+            return
+        path = path.parent
+
+
+class BuildManifest:
+    """Persisted record of the source hash, template hash and base path each output was built from.
+
+    An output is current when it still exists and the inputs recorded for it are the inputs it would
+    be built from now. Outputs that were recorded by an earlier build but not visited by this one
+    belong to deleted sources and are removed by remove_orphans.
+    """
+
+    def __init__(self, path: str | Path) -> None:
+        """BuildManifest constructor, loads the manifest written by the previous build if there is one.
+
+        A missing, unreadable or outdated manifest is treated as empty, which rebuilds everything.
+
+        Args:
+            path: json file the manifest is stored in
+        """
+        self.path: Path = Path(path)
+        self.entries: dict[str, PageInputs] = {}
+        # static files synced into the output by the last build, relative to the output directory
+        self.assets: list[str] = []
+        # urls of the links and images of each output, checked by ssg.links
+        self.links: dict[str, PageLinks] = {}
+        self.built: int = 0
+        self.skipped: int = 0
+        self._seen: set[str] = set()
+        self._hashes: dict[tuple[Path, ...], str] = {}
+
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError):
+            logger.warning("ignoring unreadable build manifest %s", self.path)
+            return
+        if isinstance(data, dict) and data.get("version") == MANIFEST_VERSION:
+            self.entries = data.get("outputs", {})
+            self.assets = data.get("assets", [])
+            self.links = {
+                key: PageLinks(page["source"], tuple(page["urls"])) for key, page in data.get("links", {}).items()
+            }
+
+    def clear(self) -> None:
+        """Forgets every recorded output and asset, so that everything is rebuilt."""
+        self.entries.clear()
+        self.assets.clear()
+        self.links.clear()
+
+    def inputs(
+        self,
+        source: str | Path,
+        template: str | Path,
+        base_path: str | Path,
+        partials: Iterable[Path] = (),
+    ) -> PageInputs:
+        """Computes the inputs a page is built from.
+
+        The template is hashed once per build, however many pages use it. The base path is recorded
+        with one trailing slash, ``/ssg`` and ``/ssg/`` build the same pages.
+
+        Args:
+            source: markdown source of the page
+            template: html template of the page
+            base_path: base path of the site
+            partials: files included by the template, hashed together with it
+
+        Returns:
+            hashes of the source and template, and the base path
+        """
+        key = (Path(template), *sorted(partials))
+        template_hash = self._hashes.get(key)
+        if template_hash is None:
+            template_hash = hash_file(template)
+            if len(key) > 1:
+                digests = [template_hash, *(hash_file(partial) for partial in key[1:])]
+                template_hash = hashlib.sha256(" ".join(digests).encode()).hexdigest()
+            self._hashes[key] = template_hash
+        base = Path(base_path).as_posix().rstrip("/") + "/"
+        return {"source": hash_file(source), "template": template_hash, "base_path": base}
+
+    def forget_hashes(self) -> None:
+        """Forgets the template hashes computed so far, for when a template changed during the build."""
+        self._hashes.clear()
+
+    def is_current(self, output: str | Path, inputs: PageInputs) -> bool:
+        """Checks whether an output is up to date, and marks it as part of this build.
+
+        Args:
+            output: generated page
+            inputs: inputs the page would be built from, see inputs
+
+        Returns:
+            True when the output exists and was built from the same inputs
+        """
+        key = Path(output).as_posix()
+        self._seen.add(key)
+        if self.entries.get(key) == inputs and Path(output).exists():
+            self.skipped += 1
+            return True
+        return False
+
+    def record(self, output: str | Path, inputs: PageInputs, links: PageLinks | None = None) -> None:
+        """Records the inputs an output was just built from.
+
+        Args:
+            output: generated page
+            inputs: inputs the page was built from
+            links: links found in the page while it was built
+        """
+        key = Path(output).as_posix()
+        self._seen.add(key)
+        self.entries[key] = inputs
+        if links is None:
+            _ = self.links.pop(key, None)
+        else:
+            self.links[key] = links
+        self.built += 1
+
+    def forget(self, output: str | Path) -> None:
+        """Drops the record of an output that was deleted.
+
+        Args:
+            output: generated page
+        """
+        key = Path(output).as_posix()
+        self._seen.discard(key)
+        _ = self.entries.pop(key, None)
+        _ = self.links.pop(key, None)
+
+    def orphans(self, within: Iterable[str | Path] | None = None) -> list[str]:
+        """Lists the outputs of an earlier build that were not visited by this one.
+
+        Args:
+            within: outputs and output directories a partial build was limited to, outputs elsewhere
+                were not visited but are not orphans
+
+        Returns:
+            the orphaned outputs, sorted
+        """
+        orphans = set(self.entries) - self._seen
+        if within is not None:
+            prefixes = [Path(path).as_posix() for path in within]
+            orphans = {key for key in orphans if any(key == p or key.startswith(p + "/") for p in prefixes)}
+        return sorted(orphans)
+
+    def remove_orphans(
+        self, within: Iterable[str | Path] | None = None, *, root: str | Path | None = None
+    ) -> list[Path]:
+        """Deletes the outputs of an earlier build that were not visited by this one.
+
+        Directories under root left empty by the removal are deleted too, root itself is always kept.
+
+        Args:
+            within: see orphans
+            root: directory the outputs are built into, such as docs/, no directory is deleted when None
+
+        Returns:
+            paths of the deleted outputs
+        """
+        removed: list[Path] = []
+        for key in self.orphans(within):
+            del self.entries[key]
+            _ = self.links.pop(key, None)
+            output = Path(key)
+            output.unlink(missing_ok=True)
+            removed.append(output)
+            logger.info("removed orphaned output %s", output)
+            if root is not None:
+                prune_empty_dirs(output.parent, root)
+        return removed
+
+    def save(self) -> None:
+        """Writes the manifest, replacing the previous one atomically."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        data = {
+            "version": MANIFEST_VERSION,
+            "outputs": dict(sorted(self.entries.items())),
+            "assets": self.assets,
+            "links": {key: {"source": page.source, "urls": page.urls} for key, page in sorted(self.links.items())},
+        }
+        fd, tmp = tempfile.mkstemp(dir=self.path.parent, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as file:
+            json.dump(data, file, indent=1)
+        Path(tmp).replace(self.path)
+
+    def log_stats(self) -> None:
+        """Writes the number of built and skipped pages to the build log."""
+        logger.info("incremental build: %d pages built, %d up to date", self.built, self.skipped)
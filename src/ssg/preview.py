@@ -0,0 +1,274 @@
+"""Preview server rendering pages from their markdown on request, without building the site first."""
+
+from __future__ import annotations
+
+import io
+import json
+import logging
+import threading
+import time
+import urllib.parse
+from collections import OrderedDict
+from functools import partial
+from http import HTTPStatus
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, BinaryIO, override
+
+from ssg.template import load_template
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+logger = logging.getLogger(__name__)
+
+STATS_PATH = "/__ssg/stats"
+DEFAULT_CACHE_BYTES = 64 << 20
+
+# modification time and size of the source, then modification times of the template and its partials
+_Signature = tuple[int, ...]
+
+
+class PageCache:
+    """LRU cache of rendered pages, bounded by their total size in bytes.
+
+    Each page is stored with the signature of the files it was rendered from. A lookup with another
+    signature is a miss, so an edited page is rendered again on its next request.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_CACHE_BYTES) -> None:
+        """PageCache constructor.
+
+        Args:
+            max_bytes: total size of the cached pages before the least recently used are evicted
+        """
+        self.max_bytes: int = max_bytes
+        self.size: int = 0
+        self.hits: int = 0
+        self.misses: int = 0
+        self.stale: int = 0
+        self.evictions: int = 0
+        self._entries: OrderedDict[Path, tuple[_Signature, bytes]] = OrderedDict()
+        self._lock: threading.Lock = threading.Lock()
+
+    def __len__(self) -> int:
+        """Number of cached pages."""
+        return len(self._entries)
+
+    def get(self, key: Path, signature: _Signature) -> bytes | None:
+        """Looks a page up.
+
+        Args:
+            key: source of the page
+            signature: signature of the files the page would be rendered from now
+
+        Returns:
+            the cached page, None when it is not cached or was rendered from older files
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != signature:
+                self.misses += 1
+                self.stale += entry is not None
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: Path, signature: _Signature, body: bytes) -> None:
+        """Stores a page, evicting the least recently used pages to stay within max_bytes.
+
+        A page larger than max_bytes on its own is not stored.
+
+        Args:
+            key: source of the page
+            signature: signature of the files the page was rendered from
+            body: the rendered page
+        """
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.size -= len(previous[1])
+            if len(body) > self.max_bytes:
+                return
+            self._entries[key] = (signature, body)
+            self.size += len(body)
+            while self.size > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.size -= len(evicted)
+                self.evictions += 1
+
+    def stats(self) -> dict[str, int]:
+        """Counters of the cache.
+
+        Returns:
+            the counters by name
+        """
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self.size,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "stale": self.stale,
+                "evictions": self.evictions,
+            }
+
+
+class PreviewPages:
+    """Maps request paths to markdown sources and renders them through a PageCache.
+
+    ``/blog/`` is rendered from ``content/blog/index.md`` and ``/blog/post.html`` from
+    ``content/blog/post.md``, the same pages a build would write.
+    """
+
+    def __init__(
+        self, content: str | Path, template: str | Path, render: Callable[[Path], str], cache: PageCache
+    ) -> None:
+        """PreviewPages constructor, reads nothing until the first request.
+
+        Args:
+            content: directory of the markdown sources
+            template: html template of the pages, watched for changes together with its partials
+            render: renders the source of a page to html
+            cache: cache of rendered pages
+        """
+        self.content: Path = Path(content).resolve()
+        self.template: Path = Path(template)
+        self.render: Callable[[Path], str] = render
+        self.cache: PageCache = cache
+        self.rendered: int = 0
+        self.render_seconds: float = 0.0
+
+    def find(self, url_path: str) -> Path | None:
+        """Finds the source of a page.
+
+        Args:
+            url_path: unquoted path of the request, without the query
+
+        Returns:
+            the markdown source, None when the path is not a page of the site
+        """
+        relative = url_path.lstrip("/")
+        if not relative or relative.endswith("/"):
+            relative += "index.md"
+        elif relative.endswith(".html"):
+            relative = relative.removesuffix(".html") + ".md"
+        else:
+            return None
+        source = (self.content / relative).resolve()
+        if not source.is_relative_to(self.content) or not source.is_file():
+            return None
+        return source
+
+    def page(self, source: Path) -> bytes:
+        """Returns a rendered page, from the cache when its source and template are unchanged.
+
+        Args:
+            source: markdown source, see find
+
+        Returns:
+            the html of the page
+        """
+        stat = source.stat()
+        signature = (stat.st_mtime_ns, stat.st_size, *load_template(self.template).dependencies.values())
+        body = self.cache.get(source, signature)
+        if body is None:
+            started = time.perf_counter()
+            body = self.render(source).encode()
+            self.render_seconds += time.perf_counter() - started
+            self.rendered += 1
+            self.cache.put(source, signature, body)
+        return body
+
+    def stats(self) -> dict[str, Any]:
+        """Counters of the cache and of the rendering.
+
+        Returns:
+            the counters by name
+        """
+        return {**self.cache.stats(), "rendered": self.rendered, "render_ms": round(1000 * self.render_seconds, 1)}
+
+
+class PreviewRequestHandler(SimpleHTTPRequestHandler):
+    """Serves rendered pages, falling back to the files of the static directory for everything else."""
+
+    def __init__(self, *args: Any, pages: PreviewPages, base_path: str = "/", **kwargs: Any) -> None:  # noqa: ANN401
+        """PreviewRequestHandler constructor.
+
+        Args:
+            args: arguments of SimpleHTTPRequestHandler
+            pages: the pages to serve
+            base_path: base path of the site, stripped from request paths
+            kwargs: keyword arguments of SimpleHTTPRequestHandler, such as directory
+        """
+        self.pages: PreviewPages = pages
+        self.base_path: str = base_path
+        super().__init__(*args, **kwargs)
+
+    @override
+    def send_head(self) -> BinaryIO | None:
+        """Sends the headers of a GET or HEAD request.
+
+        Returns:
+            the body to send, None when there is none
+        """
+        if self.base_path != "/" and self.path.startswith(self.base_path):
+            self.path = "/" + self.path.removeprefix(self.base_path)
+        path = urllib.parse.unquote(urllib.parse.urlsplit(self.path).path)
+        if path == STATS_PATH:
+            return self._send_body(json.dumps(self.pages.stats()).encode(), "application/json")
+        source = self.pages.find(path)
+        if source is None:
+            if not path.endswith("/") and self.pages.find(path + "/") is not None:
+                self.send_response(HTTPStatus.MOVED_PERMANENTLY)
+                self.send_header("Location", path + "/")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return None
+            return super().send_head()
+        try:
+            body = self.pages.page(source)
+        except Exception:
+            logger.exception("can not render %s", source)
+            self.send_error(HTTPStatus.INTERNAL_SERVER_ERROR, f"can not render {source.name}, see the log")
+            return None
+        return self._send_body(body, "text/html; charset=utf-8")
+
+    def _send_body(self, body: bytes, content_type: str) -> BinaryIO:
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        return io.BytesIO(body)
+
+    @override
+    def log_message(self, format: str, *args: Any) -> None:
+        logger.debug("%s - %s", self.address_string(), format % args)
+
+
+def start_preview_server(
+    static: str | Path, host: str, port: int, pages: PreviewPages, base_path: str = "/"
+) -> tuple[ThreadingHTTPServer, threading.Thread]:
+    """Starts the preview server in a background thread.
+
+    Args:
+        static: directory of the static files
+        host: address to listen on
+        port: port to listen on, 0 picks a free one
+        pages: the pages to serve
+        base_path: base path of the site
+
+    Returns:
+        the server and the thread running it, stop it with server.shutdown
+    """
+    handler: Callable[..., PreviewRequestHandler] = partial(
+        PreviewRequestHandler, directory=str(static), pages=pages, base_path=base_path
+    )
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, name="ssg-preview", daemon=True)
+    thread.start()
+    return server, thread
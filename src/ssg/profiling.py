@@ -0,0 +1,226 @@
+"""Build profiler timing each phase of the rendering of every page, enabled by ``ssg build --profile``.
+
+Nothing in the normal rendering path refers to the profiler. A profiled build renders its pages
+through a separate, phase by phase path that produces the same html, so a build without --profile
+pays nothing for it.
+"""
+
+from __future__ import annotations
+
+import inspect
+import json
+import time
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, NamedTuple
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterator
+    from contextlib import AbstractContextManager
+
+# phases of the rendering of a page, in pipeline order
+PAGE_PHASES = ("read", "blocks", "classify", "inline", "tree", "to_html", "template", "urls", "write")
+
+
+class PageProfile(NamedTuple):
+    """Time spent in each phase of the rendering of one page, in seconds."""
+
+    source: str
+    dest: str
+    phases: dict[str, float]
+
+    @property
+    def total(self) -> float:
+        """Time spent rendering the page, in seconds."""
+        return sum(self.phases.values())
+
+
+class BuildProfile:
+    """Collects the time of the phases of a build, for every page and for the whole site.
+
+    Phases nest: time spent in a phase entered while another one runs, such as inline parsing while
+    the tree of a block is built, is only counted for the inner phase.
+    """
+
+    def __init__(self) -> None:
+        """BuildProfile constructor."""
+        self.pages: list[PageProfile] = []
+        # phases outside of any page, such as copying the static files
+        self.site: dict[str, float] = {}
+        self.started: float = time.perf_counter()
+        self._current: dict[str, float] = self.site
+        # time spent in the phases nested in each running phase
+        self._nested: list[float] = []
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Times a phase of the current page, or of the site outside of a page.
+
+        Args:
+            name: name of the phase, such as one of PAGE_PHASES
+
+        Yields:
+            nothing, the phase lasts until the context exits
+        """
+        self._nested.append(0.0)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            nested = self._nested.pop()
+            if self._nested:
+                self._nested[-1] += elapsed
+            self._current[name] = self._current.get(name, 0.0) + elapsed - nested
+
+    @contextmanager
+    def page(self, source: str | Path, dest: str | Path) -> Iterator[None]:
+        """Attributes the phases timed in the context to a page.
+
+        Args:
+            source: markdown source of the page
+            dest: html output of the page
+
+        Yields:
+            nothing
+        """
+        phases: dict[str, float] = {}
+        self._current = phases
+        try:
+            yield
+        finally:
+            self._current = self.site
+            self.pages.append(PageProfile(str(source), str(dest), phases))
+
+    def timed[**P, R](self, name: str, func: Callable[P, R]) -> Callable[P, R]:
+        """Wraps a function so that every call to it is timed as a phase.
+
+        Args:
+            name: name of the phase
+            func: the function
+
+        Returns:
+            the wrapped function
+        """
+
+        def call(*args: P.args, **kwargs: P.kwargs) -> R:
+            with self.phase(name):
+                return func(*args, **kwargs)
+
+        return call
+
+    @contextmanager
+    def instrument(self, owner: object, name: str, phase: str) -> Iterator[None]:
+        """Times every call to a function of a module or class as a phase, while the context runs.
+
+        The function is looked up by name when it is called, such as iter_spans by the functions of
+        ssg.inline, so the function is swapped for a timed one and restored afterwards. The items of a
+        generator function are all produced while it is timed.
+
+        Args:
+            owner: module or class holding the function
+            name: name of the function
+            phase: name of the phase
+
+        Yields:
+            nothing
+        """
+        original = getattr(owner, name)
+        if inspect.isgeneratorfunction(original):
+
+            def generate(*args: object, **kwargs: object) -> Iterator[object]:
+                with self.phase(phase):
+                    items = list(original(*args, **kwargs))
+                return iter(items)
+
+            setattr(owner, name, generate)
+        else:
+            setattr(owner, name, self.timed(phase, original))
+        try:
+            yield
+        finally:
+            setattr(owner, name, original)
+
+    def phases(self) -> dict[str, float]:
+        """Total time of each page phase over every page, hottest first.
+
+        Returns:
+            seconds by phase name
+        """
+        totals: dict[str, float] = dict.fromkeys(PAGE_PHASES, 0.0)
+        for page in self.pages:
+            for name, seconds in page.phases.items():
+                totals[name] = totals.get(name, 0.0) + seconds
+        return dict(sorted(totals.items(), key=lambda item: item[1], reverse=True))
+
+    def report(self) -> dict[str, Any]:
+        """The profile as a json serializable dict, times in milliseconds.
+
+        Returns:
+            the report, with the pages slowest first
+        """
+        pages = sorted(self.pages, key=lambda page: page.total, reverse=True)
+        return {
+            "wall_ms": _ms(time.perf_counter() - self.started),
+            "pages_ms": _ms(sum(page.total for page in pages)),
+            "site": {name: _ms(seconds) for name, seconds in self.site.items()},
+            "phases": {name: _ms(seconds) for name, seconds in self.phases().items()},
+            "pages": [
+                {
+                    "source": page.source,
+                    "dest": page.dest,
+                    "ms": _ms(page.total),
+                    "phases": {name: _ms(seconds) for name, seconds in page.phases.items()},
+                }
+                for page in pages
+            ],
+        }
+
+    def write(self, path: str | Path) -> None:
+        """Writes the report as json.
+
+        Args:
+            path: file to write
+        """
+        with Path(path).open("w") as file:
+            json.dump(self.report(), file, indent=2)
+
+    def summary(self, top: int = 10) -> str:
+        """A text summary of the hottest phases and the slowest pages.
+
+        Args:
+            top: number of slowest pages listed
+
+        Returns:
+            the summary, one line per phase and per page
+        """
+        total = sum(page.total for page in self.pages)
+        lines = [f"profiled {len(self.pages)} pages, {_ms(total)} ms rendering"]
+        lines.append("hottest phases:")
+        lines.extend(
+            f"  {name:<10} {_ms(seconds):>10.1f} ms {100 * seconds / (total or 1):>5.1f}%"
+            for name, seconds in self.phases().items()
+        )
+        lines.append("slowest pages:")
+        slowest = sorted(self.pages, key=lambda page: page.total, reverse=True)[:top]
+        lines.extend(f"  {_ms(page.total):>10.1f} ms  {page.source}" for page in slowest)
+        if self.site:
+            lines.append("site: " + ", ".join(f"{name} {_ms(seconds)} ms" for name, seconds in self.site.items()))
+        return "\n".join(lines) + "\n"
+
+
+def site_phase(profile: BuildProfile | None, name: str) -> AbstractContextManager[None]:
+    """Times a phase of the site when a build is profiled, does nothing otherwise.
+
+    Args:
+        profile: profile of the build, None when it is not profiled
+        name: name of the phase
+
+    Returns:
+        context manager timing the phase
+    """
+    return nullcontext() if profile is None else profile.phase(name)
+
+
+def _ms(seconds: float) -> float:
+    return round(1000 * seconds, 3)
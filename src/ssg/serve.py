@@ -0,0 +1,149 @@
+"""Development http server that reloads connected browsers through server-sent events."""
+
+from __future__ import annotations
+
+import logging
+import threading
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, override
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+logger = logging.getLogger(__name__)
+
+EVENTS_PATH = "/__ssg/events"
+RELOAD_SCRIPT = (
+    f'<script>new EventSource("{EVENTS_PATH}").addEventListener("reload", () => location.reload());</script>'
+)
+# seconds between keep alive comments on an idle event stream
+_KEEPALIVE = 15.0
+
+
+class ReloadBroadcaster:
+    """Wakes every open event stream when the site was rebuilt."""
+
+    def __init__(self) -> None:
+        """ReloadBroadcaster constructor."""
+        self.version: int = 0
+        self.closed: bool = False
+        self._condition: threading.Condition = threading.Condition()
+
+    def notify(self) -> None:
+        """Tells every connected browser to reload."""
+        with self._condition:
+            self.version += 1
+            self._condition.notify_all()
+
+    def close(self) -> None:
+        """Ends every open event stream."""
+        with self._condition:
+            self.closed = True
+            self._condition.notify_all()
+
+    def wait(self, version: int, timeout: float) -> int:
+        """Blocks until a reload newer than version, close, or the timeout.
+
+        Args:
+            version: last version the caller has seen
+            timeout: seconds to wait at most
+
+        Returns:
+            the current version
+        """
+        with self._condition:
+            _ = self._condition.wait_for(lambda: self.version != version or self.closed, timeout)
+            return self.version
+
+
+class ReloadingRequestHandler(SimpleHTTPRequestHandler):
+    """Serves the output directory, adds the reload script to html pages and serves the event stream.
+
+    The script is added while serving, so the pages on disk stay exactly as a build writes them.
+    """
+
+    def __init__(self, *args: Any, broadcaster: ReloadBroadcaster, **kwargs: Any) -> None:  # noqa: ANN401
+        """ReloadingRequestHandler constructor.
+
+        Args:
+            args: arguments of SimpleHTTPRequestHandler
+            broadcaster: source of the reload events
+            kwargs: keyword arguments of SimpleHTTPRequestHandler, such as directory
+        """
+        self.broadcaster: ReloadBroadcaster = broadcaster
+        super().__init__(*args, **kwargs)
+
+    @override
+    def do_GET(self) -> None:
+        """Serves a GET request."""
+        if self.path == EVENTS_PATH:
+            self._stream_events()
+            return
+        path = Path(self.translate_path(self.path))
+        if path.is_dir() and self.path.split("?", 1)[0].endswith("/"):
+            path /= "index.html"
+        if path.suffix == ".html" and path.is_file():
+            self._send_html(path)
+            return
+        super().do_GET()
+
+    def _send_html(self, path: Path) -> None:
+        html = path.read_text(encoding="utf-8")
+        head, found, tail = html.rpartition("</body>")
+        html = f"{head}{RELOAD_SCRIPT}{found}{tail}" if found else html + RELOAD_SCRIPT
+        body = html.encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        _ = self.wfile.write(body)
+
+    def _stream_events(self) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        version = self.broadcaster.version
+        try:
+            while not self.broadcaster.closed:
+                current = self.broadcaster.wait(version, _KEEPALIVE)
+                if current != version:
+                    version = current
+                    _ = self.wfile.write(b"event: reload\ndata: reload\n\n")
+                else:
+                    _ = self.wfile.write(b": keep alive\n\n")
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            # the browser navigated away
+            return
+
+    @override
+    def log_message(self, format: str, *args: Any) -> None:
+        logger.debug("%s - %s", self.address_string(), format % args)
+
+
+def start_server(
+    directory: str | Path, host: str, port: int, broadcaster: ReloadBroadcaster
+) -> tuple[ThreadingHTTPServer, threading.Thread]:
+    """Starts serving a directory in a background thread.
+
+    Args:
+        directory: directory to serve
+        host: address to listen on
+        port: port to listen on, 0 picks a free one
+        broadcaster: source of the reload events
+
+    Returns:
+        the server and the thread running it, stop it with server.shutdown
+    """
+    handler: Callable[..., ReloadingRequestHandler] = partial(
+        ReloadingRequestHandler, directory=str(directory), broadcaster=broadcaster
+    )
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, name="ssg-server", daemon=True)
+    thread.start()
+    return server, thread
@@ -0,0 +1,242 @@
+"""Output sinks, the destinations a build writes its pages and static files to."""
+
+from __future__ import annotations
+
+import io
+import sys
+import tarfile
+import time
+import zipfile
+from contextlib import contextmanager
+from pathlib import Path
+from typing import TYPE_CHECKING, BinaryIO, Literal, Self, TextIO, override
+
+from ssg.assets import copy_file
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+    from contextlib import AbstractContextManager
+
+
+class Sink:
+    """Destination of the files of a build, addressed by their path in the output tree.
+
+    Pages are written as text through open_text. Static files are handed over with copy_file, so that
+    a sink can stream them from disk rather than have them read into memory first.
+    """
+
+    def open_text(self, path: str | Path) -> AbstractContextManager[TextIO]:
+        """Opens a file of the output for writing text.
+
+        The file only appears in the output once the context exits without an error.
+
+        Args:
+            path: path of the file in the output tree
+
+        Raises:
+            NotImplementedError: the base Sink writes nowhere
+        """
+        raise NotImplementedError
+
+    def write_text(self, path: str | Path, text: str) -> None:
+        """Writes a whole text file to the output.
+
+        Args:
+            path: path of the file in the output tree
+            text: content of the file
+        """
+        with self.open_text(path) as file:
+            _ = file.write(text)
+
+    def copy_file(self, source: str | Path, path: str | Path) -> None:
+        """Copies a file from disk into the output.
+
+        Args:
+            source: file to copy
+            path: path of the file in the output tree
+
+        Raises:
+            NotImplementedError: the base Sink writes nowhere
+        """
+        raise NotImplementedError
+
+    def close(self) -> None:
+        """Finishes the output, such as the end of an archive. Nothing can be written afterwards."""
+
+    def __enter__(self) -> Self:
+        """Returns the sink, which is closed when the block exits."""
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        """Closes the sink."""
+        self.close()
+
+
+class DirectorySink(Sink):
+    """Writes the output to a directory tree on disk, the default sink."""
+
+    def __init__(self, root: str | Path = "") -> None:
+        """DirectorySink constructor.
+
+        Args:
+            root: directory output paths are relative to, the working directory by default
+        """
+        self.root: Path = Path(root)
+
+    @override
+    @contextmanager
+    def open_text(self, path: str | Path) -> Iterator[TextIO]:
+        """Writes a file to a temporary file first and moves it into place once complete.
+
+        Args:
+            path: path of the file under root
+
+        Yields:
+            the temporary file
+        """
+        dest = self.root / path
+        dest.parent.mkdir(exist_ok=True, parents=True)
+        partial = dest.with_name(dest.name + ".partial")
+        try:
+            with partial.open("w") as file:
+                yield file
+        except BaseException:
+            partial.unlink(missing_ok=True)
+            raise
+        _ = partial.replace(dest)
+
+    @override
+    def copy_file(self, source: str | Path, path: str | Path) -> None:
+        dest = self.root / path
+        dest.parent.mkdir(exist_ok=True, parents=True)
+        copy_file(source, dest)
+
+
+class MemorySink(Sink):
+    """Keeps the output in a dict, for tests and dry runs."""
+
+    def __init__(self) -> None:
+        """MemorySink constructor."""
+        self.files: dict[str, bytes] = {}
+
+    @override
+    @contextmanager
+    def open_text(self, path: str | Path) -> Iterator[TextIO]:
+        file = io.StringIO()
+        yield file
+        self.files[Path(path).as_posix()] = file.getvalue().encode()
+
+    @override
+    def copy_file(self, source: str | Path, path: str | Path) -> None:
+        self.files[Path(path).as_posix()] = Path(source).read_bytes()
+
+
+class ZipSink(Sink):
+    """Writes the output into a zip archive, pages are compressed as they are rendered."""
+
+    def __init__(self, file: str | Path | BinaryIO, compression: int = zipfile.ZIP_DEFLATED) -> None:
+        """ZipSink constructor.
+
+        Args:
+            file: path or binary file object of the archive
+            compression: zipfile compression method
+        """
+        self._zip: zipfile.ZipFile = zipfile.ZipFile(file, "w", compression)
+
+    @override
+    @contextmanager
+    def open_text(self, path: str | Path) -> Iterator[TextIO]:
+        with self._zip.open(Path(path).as_posix(), "w") as raw, io.TextIOWrapper(raw, encoding="utf-8") as file:
+            yield file
+
+    @override
+    def copy_file(self, source: str | Path, path: str | Path) -> None:
+        self._zip.write(source, Path(path).as_posix())
+
+    @override
+    def close(self) -> None:
+        self._zip.close()
+
+
+_TAR_STREAM_MODES: dict[str, Literal["w|", "w|gz", "w|bz2", "w|xz"]] = {
+    "": "w|",
+    "gz": "w|gz",
+    "bz2": "w|bz2",
+    "xz": "w|xz",
+}
+
+
+class TarStreamSink(Sink):
+    """Writes the output as a tar stream, to stdout by default.
+
+    The stream is written strictly forward, so it can go into a pipe. A tar member needs its size up
+    front, so each page is held in memory until it is complete, static files are streamed from disk.
+    """
+
+    def __init__(self, file: str | Path | BinaryIO | None = None, compression: str = "") -> None:
+        """TarStreamSink constructor.
+
+        Args:
+            file: path or binary file object to write to, stdout when None
+            compression: "", "gz", "bz2" or "xz"
+
+        Raises:
+            ValueError: compression is not one of these
+        """
+        if compression not in _TAR_STREAM_MODES:
+            msg = f"unknown tar compression {compression!r}"
+            raise ValueError(msg)
+        self._file: BinaryIO | None = None
+        stream: BinaryIO
+        if file is None:
+            stream = sys.stdout.buffer
+        elif isinstance(file, str | Path):
+            stream = self._file = Path(file).open("wb")  # noqa: SIM115
+        else:
+            stream = file
+        self._tar: tarfile.TarFile = tarfile.open(fileobj=stream, mode=_TAR_STREAM_MODES[compression])  # noqa: SIM115
+        self._mtime: float = time.time()
+
+    @override
+    @contextmanager
+    def open_text(self, path: str | Path) -> Iterator[TextIO]:
+        file = io.StringIO()
+        yield file
+        data = file.getvalue().encode()
+        info = tarfile.TarInfo(Path(path).as_posix())
+        info.size = len(data)
+        info.mtime = int(self._mtime)
+        info.mode = 0o644
+        self._tar.addfile(info, io.BytesIO(data))
+
+    @override
+    def copy_file(self, source: str | Path, path: str | Path) -> None:
+        self._tar.add(source, Path(path).as_posix(), recursive=False)
+
+    @override
+    def close(self) -> None:
+        self._tar.close()
+        if self._file is not None:
+            self._file.close()
+
+
+def open_sink(output: str | Path) -> Sink:
+    """Picks the sink for an output name.
+
+    Args:
+        output: "-" for a tar stream on stdout, a .zip, .tar, .tar.gz or .tgz file for an archive,
+            anything else for a directory
+
+    Returns:
+        the sink
+    """
+    name = str(output)
+    if name == "-":
+        return TarStreamSink()
+    if name.endswith(".zip"):
+        return ZipSink(output)
+    if name.endswith((".tar.gz", ".tgz")):
+        return TarStreamSink(output, "gz")
+    if name.endswith(".tar"):
+        return TarStreamSink(output)
+    return DirectorySink(output)
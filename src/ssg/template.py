@@ -0,0 +1,366 @@
+"""Page templates compiled once into literal segments and slots, and page front matter.
+
+A template is html with these placeholders:
+
+- ``{{ name }}`` inserts a value from the context, ``{{ name.field }}`` a field of it
+- ``{{> path }}`` includes another template, relative to the including one
+- ``{% if name %}`` ... ``{% else %}`` ... ``{% endif %}`` keeps one branch depending on a value
+- ``{% for item in name %}`` ... ``{% endfor %}`` repeats its body for every element of a value
+
+Values are escaped when they are inserted, double quotes included so that a value can sit in a
+double quoted attribute such as ``content="{{ description }}"``, except Markup strings and
+iterators of html fragments, which are trusted html. Names missing from the context insert nothing.
+
+The urls of href and src attributes written in the template itself, such as its stylesheet, are
+resolved against the base path of the site by resolve_urls.
+"""
+
+from __future__ import annotations
+
+import re
+from collections import ChainMap
+from collections.abc import Iterable, Iterator, Mapping
+from pathlib import Path
+from typing import TYPE_CHECKING, NamedTuple
+
+from ssg.escape import escape_attr
+from ssg.urls import resolve_html_urls
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+    from typing import TextIO
+
+_TAG_PATTERN = re.compile(r"\{\{\s*(>)?\s*([^\s{}]+)\s*\}\}|\{%\s*(.*?)\s*%\}")
+_NAME_PATTERN = re.compile(r"[A-Za-z_]\w*(?:\.\w+)*")
+_FOR_PATTERN = re.compile(r"for\s+([A-Za-z_]\w*)\s+in\s+(\S+)")
+
+
+class Markup(str):
+    """A string of trusted html, inserted into templates without escaping."""
+
+    __slots__ = ()
+
+
+class _Slot(NamedTuple):
+    path: tuple[str, ...]
+
+
+class _If(NamedTuple):
+    path: tuple[str, ...]
+    body: tuple[_Node, ...]
+    orelse: tuple[_Node, ...]
+
+
+class _For(NamedTuple):
+    name: str
+    path: tuple[str, ...]
+    body: tuple[_Node, ...]
+
+
+_Node = str | _Slot | _If | _For
+
+
+class _Open(NamedTuple):
+    """A block tag whose end tag has not been reached yet."""
+
+    kind: str
+    where: str
+    header: tuple[str, ...]
+    outer: list[_Node]
+    # body of the if branch, once the else tag is reached
+    branch: list[_Node] | None = None
+
+
+class Template:
+    """A compiled template: literal html segments and the slots, conditionals and loops between them.
+
+    Partials are compiled into the including template, so rendering never touches the file system.
+    Templates are plain data and can be pickled to worker processes.
+    """
+
+    def __init__(self, path: Path, nodes: tuple[_Node, ...], dependencies: dict[Path, int]) -> None:
+        """Template constructor, use compile_template or load_template rather than calling it directly.
+
+        Args:
+            path: file the template was compiled from
+            nodes: compiled body of the template
+            dependencies: modification time in ns of the template file and of every partial it includes
+        """
+        self.path: Path = path
+        self.nodes: tuple[_Node, ...] = nodes
+        self.dependencies: dict[Path, int] = dependencies
+        self._resolved: dict[Callable[[str], str], Template] = {}
+
+    def is_stale(self) -> bool:
+        """Checks whether the template or one of its partials was modified since it was compiled.
+
+        Returns:
+            True when the template should be compiled again
+        """
+        for path, mtime in self.dependencies.items():
+            try:
+                if path.stat().st_mtime_ns != mtime:
+                    return True
+            except FileNotFoundError:
+                return True
+        return False
+
+    def resolve_urls(self, resolver: Callable[[str], str]) -> Template:
+        """Returns the template with the urls of the href and src attributes of its literal html resolved.
+
+        The resolved templates are cached by resolver, so the literal html is only rewritten once per
+        template and base path rather than once per page.
+
+        Args:
+            resolver: url resolver, see ssg.urls
+
+        Returns:
+            the resolved template
+        """
+        resolved = self._resolved.get(resolver)
+        if resolved is None:
+            resolved = Template(self.path, _resolve_nodes(self.nodes, resolver), self.dependencies)
+            self._resolved[resolver] = resolved
+        return resolved
+
+    def iter_render(self, context: Mapping[str, object]) -> Iterator[str]:
+        """Yields the html of the template filled in from a context.
+
+        Args:
+            context: values of the names used by the template
+
+        Yields:
+            html fragments in document order
+        """
+        return _iter_nodes(self.nodes, ChainMap(dict(context)))
+
+    def render(self, context: Mapping[str, object]) -> str:
+        """Renders the template filled in from a context.
+
+        Args:
+            context: values of the names used by the template
+
+        Returns:
+            html text of the page
+        """
+        return "".join(_iter_nodes(self.nodes, ChainMap(dict(context))))
+
+    def write(self, fp: TextIO, context: Mapping[str, object]) -> None:
+        """Streams the rendered template to a file.
+
+        Args:
+            fp: text file to write to
+            context: values of the names used by the template
+        """
+        fp.writelines(_iter_nodes(self.nodes, ChainMap(dict(context))))
+
+
+def _lookup(scope: Mapping[str, object], path: tuple[str, ...]) -> object:
+    value = scope.get(path[0])
+    for part in path[1:]:
+        value = value.get(part) if isinstance(value, Mapping) else getattr(value, part, None)
+    return value
+
+
+def _iter_value(value: object) -> Iterator[str]:
+    if value is None:
+        return
+    if isinstance(value, Markup):
+        yield value
+    elif isinstance(value, str):
+        yield escape_attr(value)
+    elif isinstance(value, Iterator):
+        yield from value
+    else:
+        yield escape_attr(str(value))
+
+
+def _iter_nodes(nodes: tuple[_Node, ...], scope: ChainMap[str, object]) -> Iterator[str]:
+    for node in nodes:
+        if type(node) is str:
+            yield node
+        elif isinstance(node, _Slot):
+            yield from _iter_value(_lookup(scope, node.path))
+        elif isinstance(node, _If):
+            yield from _iter_nodes(node.body if _lookup(scope, node.path) else node.orelse, scope)
+        elif isinstance(node, _For):
+            items = _lookup(scope, node.path)
+            if isinstance(items, Iterable):
+                for item in items:
+                    yield from _iter_nodes(node.body, scope.new_child({node.name: item}))
+
+
+def _resolve_nodes(nodes: tuple[_Node, ...], resolver: Callable[[str], str]) -> tuple[_Node, ...]:
+    resolved: list[_Node] = []
+    for node in nodes:
+        if type(node) is str:
+            resolved.append(resolve_html_urls(node, resolver))
+        elif isinstance(node, _If):
+            resolved.append(
+                node._replace(body=_resolve_nodes(node.body, resolver), orelse=_resolve_nodes(node.orelse, resolver))
+            )
+        elif isinstance(node, _For):
+            resolved.append(node._replace(body=_resolve_nodes(node.body, resolver)))
+        else:
+            resolved.append(node)
+    return tuple(resolved)
+
+
+def _parse_path(name: str, where: str) -> tuple[str, ...]:
+    if not _NAME_PATTERN.fullmatch(name):
+        msg = f"{where}: invalid name {name!r}"
+        raise ValueError(msg)
+    return tuple(name.split("."))
+
+
+def _merge_literals(nodes: Iterable[_Node]) -> tuple[_Node, ...]:
+    merged: list[_Node] = []
+    for node in nodes:
+        if type(node) is str and merged and type(merged[-1]) is str:
+            merged[-1] += node
+        elif node != "":
+            merged.append(node)
+    return tuple(merged)
+
+
+def _close_block(block: _Open, nodes: list[_Node]) -> _Node:
+    if block.kind == "for":
+        return _For(block.header[0], block.header[1:], _merge_literals(nodes))
+    if block.branch is None:
+        return _If(block.header, _merge_literals(nodes), ())
+    return _If(block.header, _merge_literals(block.branch), _merge_literals(nodes))
+
+
+def compile_template(path: str | Path, _including: tuple[Path, ...] = ()) -> Template:
+    """Compiles a template file and the partials it includes.
+
+    Args:
+        path: template file
+
+    Returns:
+        the compiled template
+
+    Raises:
+        ValueError: the template has an invalid or unbalanced tag, or includes itself
+    """
+    path = Path(path).resolve()
+    if path in _including:
+        msg = f"{path}: template includes itself"
+        raise ValueError(msg)
+    text = path.read_text(encoding="utf-8")
+    dependencies = {path: path.stat().st_mtime_ns}
+
+    stack: list[_Open] = []
+    nodes: list[_Node] = []
+    pos = 0
+    for match in _TAG_PATTERN.finditer(text):
+        nodes.append(text[pos : match.start()])
+        pos = match.end()
+        line = text.count("\n", 0, match.start()) + 1
+        where = f"{path.name}:{line}"
+        partial, name, statement = match.groups()
+        if name is not None and partial:
+            included = compile_template(path.parent / name, (*_including, path))
+            nodes.extend(included.nodes)
+            dependencies.update(included.dependencies)
+        elif name is not None:
+            nodes.append(_Slot(_parse_path(name, where)))
+        elif statement.startswith("if "):
+            stack.append(_Open("if", where, _parse_path(statement[3:].strip(), where), nodes))
+            nodes = []
+        elif (for_match := _FOR_PATTERN.fullmatch(statement)) is not None:
+            header = (for_match[1], *_parse_path(for_match[2], where))
+            stack.append(_Open("for", where, header, nodes))
+            nodes = []
+        elif statement == "else" and stack and stack[-1].kind == "if" and stack[-1].branch is None:
+            stack[-1] = stack[-1]._replace(branch=nodes)
+            nodes = []
+        elif statement in {"endif", "endfor"} and stack and stack[-1].kind == statement[3:]:
+            block = stack.pop()
+            block.outer.append(_close_block(block, nodes))
+            nodes = block.outer
+        else:
+            msg = f"{where}: unexpected {{% {statement} %}}"
+            raise ValueError(msg)
+    if stack:
+        msg = f"{stack[-1].where}: {{% {stack[-1].kind} %}} is never closed"
+        raise ValueError(msg)
+    nodes.append(text[pos:])
+    return Template(path, _merge_literals(nodes), dependencies)
+
+
+_templates: dict[Path, Template] = {}
+
+
+def load_template(path: str | Path) -> Template:
+    """Returns the compiled template of a file, compiling it only when it is not cached or was modified.
+
+    Args:
+        path: template file
+
+    Returns:
+        the compiled template
+    """
+    key = Path(path).resolve()
+    template = _templates.get(key)
+    if template is None or template.is_stale():
+        template = _templates[key] = compile_template(key)
+    return template
+
+
+def preload_templates(templates: Iterable[Template]) -> None:
+    """Adds already compiled templates to the cache, so that load_template does not compile them again.
+
+    Args:
+        templates: templates compiled by load_template, such as the ones run_page_jobs of ssg.main
+            hands to its worker processes
+    """
+    for template in templates:
+        _templates[template.path] = template
+
+
+def _front_matter_value(value: str) -> object:
+    value = value.strip()
+    if value.startswith("[") and value.endswith("]"):
+        return [item.strip().strip("\"'") for item in value[1:-1].split(",") if item.strip()]
+    if value in {"true", "false"}:
+        return value == "true"
+    return value.strip("\"'")
+
+
+def read_front_matter(source: TextIO) -> tuple[dict[str, object], str]:
+    """Reads the front matter block at the start of a markdown file, if there is one.
+
+    The block is delimited by two ``---`` lines and holds one ``key: value`` pair per line. A value is
+    a string, true or false, or a list written as ``[a, b]``.
+
+    Args:
+        source: markdown file, positioned at its start
+
+    Returns:
+        the front matter fields and the first line of markdown after them
+
+    Raises:
+        ValueError: the front matter is not closed, or has a line that is not a key value pair
+    """
+    first_line = source.readline()
+    if first_line.rstrip() != "---":
+        return {}, first_line
+    fields: dict[str, object] = {}
+    for line in source:
+        if line.rstrip() == "---":
+            break
+        if not line.strip():
+            continue
+        key, colon, value = line.partition(":")
+        if not colon or not key.strip():
+            msg = f"invalid front matter line {line.rstrip()!r}"
+            raise ValueError(msg)
+        fields[key.strip()] = _front_matter_value(value)
+    else:
+        msg = "front matter is never closed"
+        raise ValueError(msg)
+    first_line = source.readline()
+    while first_line and not first_line.strip():
+        first_line = source.readline()
+    return fields, first_line
@@ -28,6 +28,8 @@ class TextType(Enum):
 class TextNode:
     """text node that contains text information, text type can only be one of TextType."""
 
+    __slots__ = ("text", "text_type", "url")
+
     def __init__(self, text: str, text_type: TextType, url: str | None = None) -> None:
         """Initialize a text node.
 
@@ -0,0 +1,122 @@
+"""Resolution of the site absolute urls of links, images and template assets against the base path of the site.
+
+Urls are resolved once, when the node or template segment holding them is built, rather than by
+searching the finished page for attributes. Text that merely looks like an attribute, such as a code
+sample showing ``href="/"``, is never touched.
+"""
+
+from __future__ import annotations
+
+import re
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+from typing import TYPE_CHECKING, NamedTuple
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterator
+
+# href and src attributes holding a site absolute url, in literal template html
+_URL_ATTRIBUTE = re.compile(r"""(\s(?:href|src)\s*=\s*(["']))(/(?!/)[^"']*)(\2)""")
+
+
+class UrlResolver(NamedTuple):
+    """Prefixes site absolute urls, such as ``/images/a.png``, with the base path of the site.
+
+    Relative urls, urls with a scheme and protocol relative urls such as ``//cdn.example.com`` are
+    left as they are.
+    """
+
+    base_path: str = "/"
+
+    def __call__(self, url: str) -> str:
+        """Resolves one url.
+
+        Args:
+            url: url of a link, image or asset
+
+        Returns:
+            the url as it is served
+        """
+        if not url.startswith("/") or url.startswith("//"):
+            return url
+        return self.base_path.rstrip("/") + url
+
+
+# a context variable rather than a plain global, so that pages rendered at the same time by
+# different threads, such as the preview server, each see their own resolver. The default is an
+# immutable NamedTuple, safe to share between contexts.
+_resolver: ContextVar[Callable[[str], str]] = ContextVar("url_resolver", default=UrlResolver())  # noqa: B039
+
+
+def set_url_resolver(resolver: Callable[[str], str]) -> Token[Callable[[str], str]]:
+    """Sets the hook resolving the urls of links and images as they are rendered, in the current context.
+
+    generate_page installs a UrlResolver for the base path of the page it renders.
+
+    Args:
+        resolver: takes the url as written in the markdown and returns the url to render
+
+    Returns:
+        token restoring the previous resolver, see reset_url_resolver
+    """
+    return _resolver.set(resolver)
+
+
+def reset_url_resolver(token: Token[Callable[[str], str]]) -> None:
+    """Restores the resolver that was current before a set_url_resolver call.
+
+    Args:
+        token: returned by set_url_resolver
+    """
+    _resolver.reset(token)
+
+
+@contextmanager
+def using_url_resolver(resolver: Callable[[str], str]) -> Iterator[None]:
+    """Sets the url resolver of the current context while the context manager runs.
+
+    Args:
+        resolver: see set_url_resolver
+
+    Yields:
+        nothing
+    """
+    token = set_url_resolver(resolver)
+    try:
+        yield
+    finally:
+        reset_url_resolver(token)
+
+
+def get_url_resolver() -> Callable[[str], str]:
+    """Returns the hook resolving the urls of links and images.
+
+    Returns:
+        the resolver of the current context
+    """
+    return _resolver.get()
+
+
+def resolve_url(url: str) -> str:
+    """Resolves a url through the current hook.
+
+    Args:
+        url: url as written in the markdown
+
+    Returns:
+        the url to render
+    """
+    return _resolver.get()(url)
+
+
+def resolve_html_urls(html: str, resolver: Callable[[str], str]) -> str:
+    """Resolves the urls of the href and src attributes in a fragment of literal html.
+
+    Args:
+        html: html text, such as the literal part of a template
+        resolver: url resolver
+
+    Returns:
+        the html with its site absolute urls resolved
+    """
+    return _URL_ATTRIBUTE.sub(lambda match: f"{match[1]}{resolver(match[3])}{match[4]}", html)
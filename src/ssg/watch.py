@@ -0,0 +1,143 @@
+"""Polling file watcher, with no dependency on a platform notification api."""
+
+from __future__ import annotations
+
+import logging
+import os
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, NamedTuple
+
+if TYPE_CHECKING:
+    import threading
+    from collections.abc import Callable, Iterable
+
+logger = logging.getLogger(__name__)
+
+# modification time and size of a file, a change to either counts as a modification
+_Signature = tuple[int, int]
+
+
+class Changes(NamedTuple):
+    """Files created, modified and deleted between two polls, as resolved paths."""
+
+    created: tuple[Path, ...] = ()
+    modified: tuple[Path, ...] = ()
+    deleted: tuple[Path, ...] = ()
+
+    def __bool__(self) -> bool:
+        """True when anything changed."""
+        return bool(self.created or self.modified or self.deleted)
+
+    @property
+    def paths(self) -> tuple[Path, ...]:
+        """Every changed path."""
+        return self.created + self.modified + self.deleted
+
+
+def _scan(roots: Iterable[Path]) -> dict[str, _Signature]:
+    # paths are kept as strings, building a Path for every file would cost more than the stat
+    snapshot: dict[str, _Signature] = {}
+    stack: list[str] = []
+    for root in roots:
+        try:
+            stat = root.stat()
+        except FileNotFoundError:
+            continue
+        if root.is_dir():
+            stack.append(str(root))
+        else:
+            snapshot[str(root)] = (stat.st_mtime_ns, stat.st_size)
+    while stack:
+        directory = stack.pop()
+        try:
+            scan = os.scandir(directory)
+        except FileNotFoundError:
+            continue
+        with scan:
+            for entry in scan:
+                try:
+                    if entry.is_dir():
+                        stack.append(entry.path)
+                    else:
+                        stat = entry.stat()
+                        snapshot[entry.path] = (stat.st_mtime_ns, stat.st_size)
+                except FileNotFoundError:
+                    # deleted while scanning, the next poll sees it gone
+                    continue
+    return snapshot
+
+
+def _paths(paths: Iterable[str]) -> tuple[Path, ...]:
+    return tuple(sorted(map(Path, paths)))
+
+
+class Watcher:
+    """Detects changes to files by comparing the modification time and size of every file between polls.
+
+    A poll is one os.scandir walk over the watched trees, so it costs one stat per file and never
+    reads file contents.
+    """
+
+    def __init__(self, roots: Iterable[str | Path]) -> None:
+        """Watcher constructor, takes the first snapshot.
+
+        Args:
+            roots: files and directories to watch, directories are watched recursively
+        """
+        self.roots: tuple[Path, ...] = tuple(Path(root).resolve() for root in roots)
+        self._snapshot: dict[str, _Signature] = _scan(self.roots)
+
+    def set_roots(self, roots: Iterable[str | Path]) -> None:
+        """Changes the watched files, files that are newly watched are not reported as created.
+
+        Args:
+            roots: files and directories to watch
+        """
+        self.roots = tuple(Path(root).resolve() for root in roots)
+        self._snapshot = _scan(self.roots)
+
+    def poll(self) -> Changes:
+        """Scans the watched files and reports what changed since the previous poll.
+
+        Returns:
+            the changes, sorted by path
+        """
+        snapshot = _scan(self.roots)
+        previous = self._snapshot
+        self._snapshot = snapshot
+        if snapshot == previous:
+            return Changes()
+        return Changes(
+            created=_paths(snapshot.keys() - previous.keys()),
+            modified=_paths(path for path, sig in snapshot.items() if previous.get(path, sig) != sig),
+            deleted=_paths(previous.keys() - snapshot.keys()),
+        )
+
+
+def watch(
+    watcher: Watcher,
+    on_change: Callable[[Changes], None],
+    stop: threading.Event,
+    interval: float = 0.05,
+) -> None:
+    """Polls a watcher until stop is set and calls on_change with every batch of changes.
+
+    An error raised by on_change is logged and watching goes on, so that a broken edit does not end
+    the session.
+
+    Args:
+        watcher: the files to watch
+        on_change: called with the changes of each poll that found any
+        stop: event ending the loop
+        interval: seconds between the start of two polls
+    """
+    while not stop.is_set():
+        started = time.monotonic()
+        changes = watcher.poll()
+        if changes:
+            try:
+                on_change(changes)
+            except Exception:
+                logger.exception("rebuild failed")
+        _ = stop.wait(max(0.0, interval - (time.monotonic() - started)))
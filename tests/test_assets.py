@@ -0,0 +1,128 @@
+import errno
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from ssg import assets
+from ssg.assets import LinkMode, copy_file, scan_tree, sync_tree
+
+
+class TestSyncTree(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        self.static = self.root / "static"
+        (self.static / "images").mkdir(parents=True)
+        (self.static / "index.css").write_text("body {}")
+        (self.static / "images" / "a.png").write_bytes(b"png" * 100)
+        self.docs = self.root / "docs"
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def touch(self, path, offset_ns):
+        stat = path.stat()
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + offset_ns))
+
+    def test_first_sync_copies_everything(self):
+        stats = sync_tree(self.static, self.docs)
+        self.assertEqual((2, 0, 307), (stats.copied, stats.skipped, stats.bytes_copied))
+        self.assertEqual(["index.css", "images/a.png"], stats.assets)
+        self.assertEqual(b"png" * 100, (self.docs / "images" / "a.png").read_bytes())
+
+    def test_unchanged_files_skipped(self):
+        sync_tree(self.static, self.docs)
+        stats = sync_tree(self.static, self.docs)
+        self.assertEqual((0, 2, 0, 307), (stats.copied, stats.skipped, stats.bytes_copied, stats.bytes_skipped))
+
+    def test_changed_files_copied(self):
+        sync_tree(self.static, self.docs)
+        (self.static / "index.css").write_text("body { color: red; }")
+        stats = sync_tree(self.static, self.docs)
+        self.assertEqual((1, 1), (stats.copied, stats.skipped))
+        self.assertEqual("body { color: red; }", (self.docs / "index.css").read_text())
+
+    def test_checksum(self):
+        sync_tree(self.static, self.docs)
+        self.touch(self.static / "index.css", 1_000_000_000)
+        self.assertEqual(0, sync_tree(self.static, self.docs, checksum=True).copied)
+        self.assertEqual(1, sync_tree(self.static, self.docs).copied)
+
+    def test_stale_assets_deleted(self):
+        previous = sync_tree(self.static, self.docs).assets
+        (self.docs / "index.html").write_text("generated page")
+        (self.static / "images" / "a.png").unlink()
+        stats = sync_tree(self.static, self.docs, previous)
+        self.assertEqual(1, stats.deleted)
+        self.assertFalse((self.docs / "images").exists())
+        self.assertTrue((self.docs / "index.html").exists())
+        self.assertTrue((self.docs / "index.css").exists())
+
+    def test_hardlink(self):
+        stats = sync_tree(self.static, self.docs, link=LinkMode.HARDLINK)
+        self.assertEqual(2, stats.linked)
+        self.assertTrue((self.docs / "index.css").samefile(self.static / "index.css"))
+        self.assertEqual(2, sync_tree(self.static, self.docs, link=LinkMode.HARDLINK).skipped)
+
+    def test_reflink_or_copy(self):
+        stats = sync_tree(self.static, self.docs, link=LinkMode.REFLINK)
+        self.assertEqual(2, stats.linked + stats.copied)
+        self.assertEqual("body {}", (self.docs / "index.css").read_text())
+        self.assertEqual([], list(self.docs.rglob("*.tmp")))
+
+    def test_not_a_directory(self):
+        with self.assertRaises(FileNotFoundError):
+            sync_tree(self.static / "index.css", self.docs)
+
+    def test_many_files_in_threads(self):
+        for i in range(50):
+            (self.static / "images" / f"{i:02}.bin").write_bytes(os.urandom(i * 97))
+        stats = sync_tree(self.static, self.docs, workers=8)
+        self.assertEqual(52, stats.copied)
+        for relative in stats.assets:
+            self.assertEqual((self.static / relative).read_bytes(), (self.docs / relative).read_bytes())
+        self.assertEqual(stats.assets, sync_tree(self.static, self.docs, workers=1).assets)
+
+
+class TestCopyEngine(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        self.source = self.root / "source.bin"
+        self.source.write_bytes(os.urandom(300_000))
+        os.utime(self.source, ns=(1_000_000_000, 1_000_000_000))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_copy_file(self):
+        dest = self.root / "dest.bin"
+        dest.write_text("old and longer content " * 100_000)
+        copy_file(self.source, dest)
+        self.assertEqual(self.source.read_bytes(), dest.read_bytes())
+        self.assertEqual(1_000_000_000, dest.stat().st_mtime_ns)
+
+    def test_user_space_fallback(self):
+        def unsupported(infd, outfd, offset):
+            raise OSError(errno.EXDEV, "cross device")
+
+        dest = self.root / "dest.bin"
+        with mock.patch.object(assets, "_KERNEL_COPIES", [unsupported, unsupported]):
+            copy_file(self.source, dest)
+        self.assertEqual(self.source.read_bytes(), dest.read_bytes())
+
+    def test_scan_tree(self):
+        (self.root / "b" / "c").mkdir(parents=True)
+        (self.root / "a").mkdir()
+        (self.root / "a" / "x").write_text("x")
+        (self.root / "b" / "c" / "y").write_text("yy")
+        directories, files = scan_tree(self.root)
+        self.assertEqual(["a", "b", "b/c"], directories)
+        self.assertEqual(["source.bin", "a/x", "b/c/y"], [path for path, _ in files])
+        self.assertEqual(2, files[-1][1].st_size)
+
+
+if __name__ == "__main__":
+    unittest.main()
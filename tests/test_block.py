@@ -1,6 +1,19 @@
+import io
 import unittest
 
-from ssg.block import BlockType, block_to_block_type, markdown_to_blocks, markdown_to_html_node
+from ssg.block import (
+    BlockRule,
+    BlockType,
+    block_to_block_type,
+    iter_block_nodes,
+    iter_blocks,
+    iter_classified_blocks,
+    markdown_to_blocks,
+    markdown_to_html_node,
+    register_block_rule,
+    unregister_block_rule,
+)
+from ssg.htmlnode import LeafNode
 
 
 class TestBlock(unittest.TestCase):
@@ -39,6 +52,104 @@ class TestBlock(unittest.TestCase):
         self.assertEqual(expected, block_to_block_type(markdown))
 
 
+class TestBlockRules(unittest.TestCase):
+    def setUp(self):
+        register_block_rule(BlockRule("rule", lambda _: LeafNode("", "hr"), start=r"-{3,}$"))
+
+    def tearDown(self):
+        unregister_block_rule("rule")
+
+    def test_custom_type(self):
+        self.assertEqual("rule", block_to_block_type("---"))
+        self.assertEqual(BlockType.UL, block_to_block_type("- item"))
+
+    def test_custom_handler(self):
+        html_node = markdown_to_html_node("para\n\n-----\n\n- item")
+        self.assertEqual(LeafNode("", "hr"), html_node.children[1])  # type: ignore
+        self.assertEqual("ul", html_node.children[2].tag)  # type: ignore
+
+    def test_unregister(self):
+        unregister_block_rule("rule")
+        self.assertEqual(BlockType.UL, block_to_block_type("---"))
+
+    def test_paragraph_rule_kept(self):
+        with self.assertRaises(ValueError):
+            unregister_block_rule(BlockType.PARAGRAPH)
+
+    def test_mixed_list_markers(self):
+        self.assertEqual(BlockType.PARAGRAPH, block_to_block_type("* one\n- two"))
+
+    def test_line_rule_needs_every_line(self):
+        self.assertEqual(BlockType.PARAGRAPH, block_to_block_type("> quote\nnot quote"))
+
+
+class TestStreamingBlocks(unittest.TestCase):
+    def test_file_object(self):
+        source = io.StringIO("# Title\n\nfirst line\nsecond line\n\n* item\n")
+        expected = ["# Title", "first line\nsecond line", "* item"]
+        self.assertEqual(expected, list(iter_blocks(source)))
+
+    def test_blank_runs(self):
+        markdown = "block one\n\n\n\n\nblock two\n\n"
+        self.assertEqual(["block one", "block two"], markdown_to_blocks(markdown))
+
+    def test_lines_without_endings(self):
+        self.assertEqual(["a\nb", "c"], list(iter_blocks(["a", "b", "", "c"])))
+
+    def test_yields_before_end_of_input(self):
+        def lines():
+            yield "first block\n"
+            yield "\n"
+            raise AssertionError("read past the first block")
+
+        self.assertEqual("first block", next(iter_blocks(lines())))
+
+    def test_classified(self):
+        source = io.StringIO("## Head\n\n> quote\n\n1. one\n2. two\n")
+        expected = [
+            (BlockType.HEADER, "## Head"),
+            (BlockType.QUOTE, "> quote"),
+            (BlockType.OL, "1. one\n2. two"),
+        ]
+        self.assertEqual(expected, list(iter_classified_blocks(source)))
+
+    def test_block_nodes_match_tree(self):
+        markdown = "# Header\n\nThis is a **paragraph**.\n\n> A quote.\n\n- List item\n- another"
+        nodes = list(iter_block_nodes(io.StringIO(markdown)))
+        self.assertEqual(markdown_to_html_node(markdown).children, nodes)
+
+
+class TestCodeBlocks(unittest.TestCase):
+    def test_blank_line_inside_fence(self):
+        markdown = "para\n\n```python\nx = 1\n\ny = 2\n```\n\nafter"
+        expected = ["para", "```python\nx = 1\n\ny = 2\n```", "after"]
+        self.assertEqual(expected, markdown_to_blocks(markdown))
+
+    def test_block_type(self):
+        self.assertEqual(BlockType.CODE, block_to_block_type("```\nprint('hi')\n```"))
+        self.assertEqual(BlockType.PARAGRAPH, block_to_block_type("```inline``` code"))
+
+    def test_inline_triple_backticks_do_not_open_fence(self):
+        markdown = "a ```code``` b\n\nnext"
+        self.assertEqual(["a ```code``` b", "next"], markdown_to_blocks(markdown))
+
+    def test_html(self):
+        html = markdown_to_html_node("```py\nif a < b:\n    pass\n```").to_html()
+        expected = (
+            '<div><pre><code class="language-python"><span class="tok-keyword">if</span> a &lt; b:\n'
+            '    <span class="tok-keyword">pass</span></code></pre></div>'
+        )
+        self.assertEqual(expected, html)
+
+    def test_no_language(self):
+        html = markdown_to_html_node("```\n**not bold** <b>\n```").to_html()
+        self.assertEqual("<div><pre><code>**not bold** &lt;b&gt;</code></pre></div>", html)
+
+    def test_unclosed_fence(self):
+        html = markdown_to_html_node("```\ncode\n\nmore").to_html()
+        self.assertEqual("<div><pre><code>code\n\nmore</code></pre></div>", html)
+
+
 class TestMarkdownToHTMLNode(unittest.TestCase):
     def test_header_conversion(self):
         # Test for headers with different levels
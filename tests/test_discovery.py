@@ -0,0 +1,63 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+from ssg.discovery import PageSource, discover_pages
+
+
+class TestDiscoverPages(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.content = Path(self.tmp.name) / "content"
+        self.docs = Path(self.tmp.name) / "docs"
+        for name, text in {
+            "index.md": "# Home\n",
+            "about.md": "# About me\n",
+            "notes.txt": "not a page",
+            "blog/index.md": "# Blog\n",
+            "blog/post.md": "# Post\n\ntext\n",
+            "blog/drafts/idea.md": "# Idea\n",
+            "b.md": "# B\n",
+        }.items():
+            path = self.content / name
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(text)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def relative(self, pages):
+        return [page.source.relative_to(self.content).as_posix() for page in pages]
+
+    def test_depth_first_name_order(self):
+        pages = discover_pages(self.content, self.docs)
+        self.assertEqual(
+            ["about.md", "b.md", "blog/drafts/idea.md", "blog/index.md", "blog/post.md", "index.md"],
+            self.relative(pages),
+        )
+
+    def test_dest_and_size(self):
+        page = discover_pages(self.content, self.docs, [self.content / "blog" / "post.md"])
+        self.assertEqual(
+            [PageSource(self.content / "blog" / "post.md", self.docs / "blog" / "post.html", 13)], page
+        )
+
+    def test_sizes_of_walked_pages(self):
+        pages = discover_pages(self.content, self.docs)
+        self.assertEqual([page.source.stat().st_size for page in pages], [page.size for page in pages])
+
+    def test_include_and_exclude(self):
+        pages = discover_pages(self.content, self.docs, include=["blog/*"], exclude=["*/drafts/*"])
+        self.assertEqual(["blog/index.md", "blog/post.md"], self.relative(pages))
+
+    def test_subtree(self):
+        pages = discover_pages(self.content, self.docs, [self.content / "blog" / "drafts", self.content / "index.md"])
+        self.assertEqual(["blog/drafts/idea.md", "index.md"], self.relative(pages))
+
+    def test_root_outside_content(self):
+        with self.assertRaisesRegex(ValueError, "is not inside"):
+            discover_pages(self.content, self.docs, [self.docs])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,19 @@
+import unittest
+
+from ssg.escape import escape_attr, escape_text
+
+
+class TestEscape(unittest.TestCase):
+    def test_escape_text(self):
+        self.assertEqual('a &lt;b&gt; &amp; "c"', escape_text('a <b> & "c"'))
+
+    def test_escape_attr(self):
+        self.assertEqual("/a?x=1&amp;y=&quot;2&quot;&lt;&gt;", escape_attr('/a?x=1&y="2"<>'))
+
+    def test_no_copy_when_clean(self):
+        text = "".join(["plain", " text"])
+        self.assertIs(text, escape_text(text))
+        self.assertIs(text, escape_attr(text))
+
+    def test_already_escaped_is_escaped_again(self):
+        self.assertEqual("&amp;lt;", escape_text("&lt;"))
@@ -0,0 +1,128 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+from ssg.block import markdown_to_html_node
+from ssg.frozennode import FragmentCache, FrozenLeafNode, FrozenParentNode, FrozenRawNode, freeze
+from ssg.htmlnode import HTMLNode, LeafNode, ParentNode, RawNode
+from ssg.links import LinkRecorder
+from ssg.main import generate_page
+from ssg.urls import UrlResolver, using_url_resolver
+
+
+def notice():
+    return ParentNode([LeafNode("Note: ", "b"), LeafNode("read this", "a", {"href": "/x"})], "p")
+
+
+class TestFrozenNodes(unittest.TestCase):
+    def test_equal_trees_hash_equal(self):
+        self.assertEqual(freeze(notice()), freeze(notice()))
+        self.assertEqual(hash(freeze(notice())), hash(freeze(notice())))
+
+    def test_different_trees(self):
+        other = ParentNode([LeafNode("Note: ", "b"), LeafNode("read this", "a", {"href": "/y"})], "p")
+        self.assertNotEqual(freeze(notice()), freeze(other))
+
+    def test_equal_to_mutable(self):
+        self.assertEqual(freeze(notice()), notice())
+        self.assertEqual(FrozenLeafNode("a", "b"), LeafNode("a", "b"))
+
+    def test_immutable(self):
+        node = freeze(notice())
+        with self.assertRaises(AttributeError):
+            node.tag = "div"
+        with self.assertRaises(TypeError):
+            node.props["href"] = "/z"  # type: ignore
+        with self.assertRaises(TypeError):
+            node.children[0].props["href"] = "/z"  # type: ignore
+        self.assertIsInstance(node.children, tuple)
+
+    def test_same_html(self):
+        tree = markdown_to_html_node("# Title\n\n* a [b](/c)\n* d\n\n> quote")
+        self.assertEqual(tree.to_html(), freeze(tree).to_html())
+
+    def test_raw_node(self):
+        raw = freeze(RawNode("<i>x</i>", "code"))
+        self.assertIsInstance(raw, FrozenRawNode)
+        self.assertEqual("<code><i>x</i></code>", raw.to_html())
+        self.assertEqual(raw, RawNode("<i>x</i>", "code"))
+        self.assertNotEqual(raw, freeze(LeafNode("<i>x</i>", "code")))
+
+    def test_constructor_freezes_children(self):
+        node = FrozenParentNode([LeafNode("a")], "p")
+        self.assertIsInstance(node.children[0], FrozenLeafNode)  # type: ignore
+
+    def test_deep_tree(self):
+        node = LeafNode("deep", "b")
+        for _ in range(5000):
+            node = ParentNode([node], "span")
+        self.assertEqual(node.to_html(), freeze(node).to_html())
+
+    def test_unsupported_node(self):
+        with self.assertRaises(TypeError):
+            freeze(HTMLNode("a", "b"))
+
+
+class TestFragmentCache(unittest.TestCase):
+    def test_repeated_subtree_rendered_once(self):
+        cache = FragmentCache()
+        page = freeze(ParentNode([notice(), LeafNode("x"), notice()], "div"))
+        self.assertEqual(page.to_html(), cache.render(page))
+        self.assertEqual(1, cache.hits)
+        self.assertEqual(2, cache.misses)
+        self.assertAlmostEqual(1 / 3, cache.hit_rate)
+
+    def test_lru_bound(self):
+        cache = FragmentCache(max_entries=2)
+        for i in range(3):
+            cache.render(freeze(ParentNode([LeafNode(str(i))], "p")))
+        self.assertEqual(2, len(cache))
+        self.assertEqual(1, cache.evictions)
+        cache.render(freeze(ParentNode([LeafNode("0")], "p")))
+        self.assertEqual(0, cache.hits)
+
+    def test_stats(self):
+        cache = FragmentCache()
+        cache.render(freeze(notice()))
+        cache.render(freeze(notice()))
+        self.assertEqual({"hits": 1, "misses": 1, "evictions": 0, "entries": 1, "hit_rate": 0.5}, cache.stats())
+
+    def test_errors(self):
+        with self.assertRaises(ValueError):
+            FragmentCache().render(FrozenParentNode([], "p"))
+
+    def test_render_block(self):
+        cache = FragmentCache()
+        block = "see [home](/) and **this**"
+        pages = []
+        for base in ("/", "/", "/base"):
+            recorder = LinkRecorder(UrlResolver(base))
+            with using_url_resolver(recorder):
+                pages.append((cache.render_block(block, UrlResolver(base)), recorder.urls))
+        self.assertEqual(('<p>see <a href="/">home</a> and <b>this</b></p>', {"/"}), pages[0])
+        self.assertEqual(pages[0], pages[1])
+        self.assertEqual(('<p>see <a href="/base/">home</a> and <b>this</b></p>', {"/"}), pages[2])
+        self.assertEqual((1, 2), (cache.hits, cache.misses))
+
+    def test_count(self):
+        cache = FragmentCache()
+        cache.count(3, 1, 0)
+        cache.count(1, 1, 2)
+        self.assertEqual((4, 2, 2), (cache.hits, cache.misses, cache.evictions))
+
+    def test_generate_page(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            (root / "template.html").write_text("{{ Title }}|{{ Content }}")
+            (root / "index.md").write_text("# Title\n\n> shared **notice**\n\nbody")
+            cache = FragmentCache()
+            generate_page(root / "index.md", root / "template.html", root / "cached.html", "/", cache)
+            generate_page(root / "index.md", root / "template.html", root / "plain.html", "/")
+            generate_page(root / "index.md", root / "template.html", root / "again.html", "/", cache)
+            self.assertEqual((root / "plain.html").read_text(), (root / "cached.html").read_text())
+            self.assertEqual((root / "plain.html").read_text(), (root / "again.html").read_text())
+            self.assertEqual(3, cache.hits)
+
+
+if __name__ == "__main__":
+    unittest.main()
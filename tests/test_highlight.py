@@ -0,0 +1,133 @@
+import os
+import tempfile
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from unittest import mock
+
+from ssg.highlight import (
+    HighlightCache,
+    get_highlight_cache,
+    highlight,
+    normalize_language,
+    set_highlight_cache,
+    tokenize_to_html,
+)
+
+
+class TestTokenize(unittest.TestCase):
+    def test_python(self):
+        result = tokenize_to_html('def f(x):  # add\n    return x + 1 < "2"', "python")
+        expected = (
+            '<span class="tok-keyword">def</span> f(x):  <span class="tok-comment"># add</span>\n'
+            '    <span class="tok-keyword">return</span> x + <span class="tok-number">1</span> &lt; '
+            '<span class="tok-string">"2"</span>'
+        )
+        self.assertEqual(expected, result)
+
+    def test_escapes_tokens(self):
+        self.assertEqual('<span class="tok-string">"&lt;b&gt;"</span>', tokenize_to_html('"<b>"', "js"))
+
+    def test_unknown_language(self):
+        self.assertEqual("a &amp;&amp; b", tokenize_to_html("a && b", "cobol"))
+
+    def test_aliases(self):
+        self.assertEqual("python", normalize_language(" Py "))
+        self.assertEqual("bash", normalize_language("sh"))
+        self.assertEqual("text", normalize_language(""))
+
+    def test_bash_variable(self):
+        self.assertEqual('echo <span class="tok-variable">$HOME</span>', tokenize_to_html("echo $HOME", "bash"))
+
+
+class TestHighlightCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.directory = Path(self.tmp.name)
+
+    def tearDown(self):
+        set_highlight_cache(None)
+        self.tmp.cleanup()
+
+    def test_hit_and_miss(self):
+        cache = HighlightCache(self.directory)
+        set_highlight_cache(cache)
+        first = highlight("x = 1", "python")
+        second = highlight("x = 1", "python")
+        self.assertEqual(first, second)
+        self.assertEqual((1, 1), (cache.hits, cache.misses))
+        self.assertIs(cache, get_highlight_cache())
+
+    def test_persists_between_builds(self):
+        HighlightCache(self.directory).put("x = 1", "python", "cached html")
+        cache = HighlightCache(self.directory)
+        self.assertEqual("cached html", cache.get("x = 1", "python"))
+        self.assertEqual(1, cache.hits)
+
+    def test_rules_change_invalidates(self):
+        HighlightCache(self.directory).put("x = 1", "python", "old rules")
+        with mock.patch.dict("ssg.highlight._RULES_DIGESTS", {"python": "edited"}):
+            self.assertIsNone(HighlightCache(self.directory).get("x = 1", "python"))
+        self.assertEqual("old rules", HighlightCache(self.directory).get("x = 1", "python"))
+
+    def test_text_not_cached(self):
+        cache = HighlightCache(self.directory)
+        set_highlight_cache(cache)
+        self.assertEqual("&lt;p&gt;", highlight("<p>", "text"))
+        self.assertEqual((0, 0), (cache.hits, cache.misses))
+
+    def test_lru_eviction(self):
+        cache = HighlightCache(self.directory, max_bytes=10)
+        cache.put("a", "python", "aaaa")
+        cache.put("b", "python", "bbbb")
+        self.assertIsNotNone(cache.get("a", "python"))
+        cache.put("c", "python", "cccc")
+        self.assertEqual(1, cache.evictions)
+        self.assertIsNone(cache.get("b", "python"))
+        self.assertIsNotNone(cache.get("a", "python"))
+        self.assertEqual(2, len(os.listdir(self.directory)))
+
+    def test_cap_shared_between_processes(self):
+        first = HighlightCache(self.directory, max_bytes=10)
+        second = HighlightCache(self.directory, max_bytes=10)
+        first.put("a", "python", "aaaa")
+        os.utime(self.directory / HighlightCache.key("a", "python"), (1, 1))
+        second.put("b", "python", "bbbb")
+        second.put("c", "python", "cccc")
+        self.assertEqual(1, second.evictions)
+        self.assertFalse((self.directory / HighlightCache.key("a", "python")).exists())
+        self.assertEqual(2, len(os.listdir(self.directory)))
+
+    def test_threads_share_cache(self):
+        cache = HighlightCache(self.directory, max_bytes=40)
+
+        def work(thread):
+            for i in range(300):
+                code = f"x = {(thread + i) % 12}"
+                if cache.get(code, "python") is None:
+                    cache.put(code, "python", "html" * 3)
+
+        with ThreadPoolExecutor(8) as pool:
+            list(pool.map(work, range(8)))
+        self.assertEqual(8 * 300, cache.hits + cache.misses)
+        self.assertLessEqual(len(os.listdir(self.directory)), 4)
+
+    def test_count(self):
+        cache = HighlightCache(self.directory)
+        cache.count(2, 1, 0)
+        cache.count(1, 0, 3)
+        self.assertEqual((3, 1, 3), (cache.hits, cache.misses, cache.evictions))
+
+    def test_recency_survives_reload(self):
+        cache = HighlightCache(self.directory, max_bytes=10)
+        cache.put("a", "python", "aaaa")
+        cache.put("b", "python", "bbbb")
+        old = self.directory / HighlightCache.key("a", "python")
+        os.utime(old, (1, 1))
+        cache = HighlightCache(self.directory, max_bytes=10)
+        cache.put("c", "python", "cccc")
+        self.assertFalse(old.exists())
+
+
+if __name__ == "__main__":
+    unittest.main()
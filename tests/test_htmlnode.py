@@ -1,6 +1,7 @@
+import io
 import unittest
 
-from ssg.htmlnode import HTMLNode, LeafNode, ParentNode
+from ssg.htmlnode import HTMLNode, LeafNode, ParentNode, RawNode
 
 
 class TestHTMLNode(unittest.TestCase):
@@ -104,6 +105,18 @@ class TestLeafNode(unittest.TestCase):
         expected = "<a>this is a string</a>"
         self.assertEqual(node.to_html(), expected)
 
+    def test_to_html_escapes(self):
+        node = LeafNode("x < y & z", tag="a", props={"href": '/q?a=1&b="2"'})
+        expected = '<a href="/q?a=1&amp;b=&quot;2&quot;">x &lt; y &amp; z</a>'
+        self.assertEqual(node.to_html(), expected)
+        self.assertEqual("&lt;b&gt;", LeafNode("<b>").to_html())
+
+    def test_raw_node(self):
+        node = RawNode('<span class="k">x</span> &lt;', tag="code", props={"class": "a&b"})
+        self.assertEqual('<code class="a&amp;b"><span class="k">x</span> &lt;</code>', node.to_html())
+        self.assertNotEqual(node, LeafNode(node.value, "code", {"class": "a&b"}))
+        self.assertNotEqual(LeafNode(node.value, "code", {"class": "a&b"}), node)
+
     def test_to_html_no_value(self):
         props = {
             "href": "https://www.google.com",
@@ -159,6 +172,34 @@ class TestParentNode(unittest.TestCase):
         expected = '<div><a href="https://www.google.com" target="_blank">this is a string</a><a href="https://www.google.com" target="_blank">this is a string too</a></div>'
         self.assertEqual(node.to_html(), expected)
 
+    def test_iter_html_fragments(self):
+        node = ParentNode([ParentNode([LeafNode("a", "b")], "p"), LeafNode("c")], "div")
+        self.assertEqual(["<div>", "<p>", "<b>a</b>", "</p>", "c", "</div>"], list(node.iter_html()))
+
+    def test_deep_tree(self):
+        node = LeafNode("deep", "b")
+        for _ in range(10000):
+            node = ParentNode([node], "span")
+        html = node.to_html()
+        self.assertTrue(html.startswith("<span>" * 10000 + "<b>deep</b></span>"))
+
+    def test_write_html(self):
+        node = ParentNode([LeafNode("x", "i"), LeafNode("y")], "p", {"class": "c"})
+        fp = io.StringIO()
+        node.write_html(fp)
+        self.assertEqual('<p class="c"><i>x</i>y</p>', fp.getvalue())
+
+    def test_slots(self):
+        for node in (HTMLNode(), LeafNode("a"), ParentNode([LeafNode("a")], "p")):
+            self.assertFalse(hasattr(node, "__dict__"))
+            with self.assertRaises(AttributeError):
+                node.extra = 1  # type: ignore
+
+    def test_nested_error(self):
+        node = ParentNode([ParentNode([], "p")], "div")
+        with self.assertRaises(ValueError):
+            node.to_html()
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -2,12 +2,24 @@ import unittest
 
 from ssg.htmlnode import LeafNode
 from ssg.inline import (  # split_nodes_link,
+    SPAN_BOLD,
+    SPAN_IMAGE,
+    SPAN_LINK,
+    SPAN_TEXT,
     extract_markdown_images,
     extract_markdown_links,
+    iter_spans,
+    iter_split_nodes_delimiter,
+    iter_split_nodes_image,
+    iter_split_nodes_link,
+    iter_text_nodes,
+    span_to_html_node,
     split_nodes_delimiter,
     split_nodes_image,
     split_nodes_link,
     text_node_to_html_node,
+    text_to_html,
+    text_to_html_nodes,
     text_to_textnodes,
 )
 from ssg.textnode import TextNode, TextType
@@ -382,6 +394,44 @@ class TestNonDelimSplit(unittest.TestCase):
         self.assertEqual(result, expected)
 
 
+class TestIterSplit(unittest.TestCase):
+    def test_accepts_generator(self):
+        nodes = (TextNode(text, TextType.TEXT) for text in ["a **b**", "c"])
+        result = list(iter_split_nodes_delimiter(nodes, "**", TextType.BOLD))
+        expected = [
+            TextNode("a ", TextType.TEXT),
+            TextNode("b", TextType.BOLD),
+            TextNode("c", TextType.TEXT),
+        ]
+        self.assertEqual(result, expected)
+
+    def test_wrong_delimiter_raises_eagerly(self):
+        with self.assertRaises(ValueError):
+            iter_split_nodes_delimiter([], "_", TextType.BOLD)
+
+    def test_empty_node_skipped(self):
+        nodes = [TextNode("", TextType.TEXT), TextNode("[a](b)", TextType.TEXT)]
+        self.assertEqual([TextNode("a", TextType.LINK, "b")], list(iter_split_nodes_link(nodes)))
+
+    def test_adjacent_images(self):
+        nodes = [TextNode("![a](b) ![c](d)", TextType.TEXT)]
+        expected = [
+            TextNode("a", TextType.IMAGE, "b"),
+            TextNode(" ", TextType.TEXT),
+            TextNode("c", TextType.IMAGE, "d"),
+        ]
+        self.assertEqual(expected, list(iter_split_nodes_image(nodes)))
+
+    def test_many_nodes(self):
+        count = 5000
+        nodes = [TextNode(f"see [link{i}](/page{i}) and ![img](/{i}.png)", TextType.TEXT) for i in range(count)]
+        nodes = split_nodes_delimiter(nodes, "**", TextType.BOLD)
+        nodes = split_nodes_image(nodes)
+        nodes = split_nodes_link(nodes)
+        self.assertEqual(4 * count, len(nodes))
+        self.assertEqual(TextNode(f"link{count - 1}", TextType.LINK, f"/page{count - 1}"), nodes[-3])
+
+
 class TestTextToTextNodes(unittest.TestCase):
     def test(self):
         text = "This is **text** with an _italic_ word and a ```code block``` and an ![obi wan image](https://i.imgur.com/fJRm4Vk.jpeg) and a [link](https://boot.dev)"
@@ -400,6 +450,83 @@ class TestTextToTextNodes(unittest.TestCase):
         ]
         self.assertEqual(result, expected)
 
+    def test_plain_text(self):
+        self.assertEqual([TextNode("just text", TextType.TEXT)], text_to_textnodes("just text"))
+
+    def test_empty_text(self):
+        self.assertEqual([], text_to_textnodes(""))
+
+    def test_link_url_with_underscores(self):
+        result = text_to_textnodes("see [the docs](http://example.com/a_b_c) now")
+        expected = [
+            TextNode("see ", TextType.TEXT),
+            TextNode("the docs", TextType.LINK, "http://example.com/a_b_c"),
+            TextNode(" now", TextType.TEXT),
+        ]
+        self.assertEqual(result, expected)
+
+    def test_code_keeps_delimiters(self):
+        result = text_to_textnodes("run `a_b **c**` here")
+        expected = [
+            TextNode("run ", TextType.TEXT),
+            TextNode("a_b **c**", TextType.CODE),
+            TextNode(" here", TextType.TEXT),
+        ]
+        self.assertEqual(result, expected)
+
+    def test_whitespace_between_spans(self):
+        result = text_to_textnodes("**a** _b_")
+        expected = [
+            TextNode("a", TextType.BOLD),
+            TextNode(" ", TextType.TEXT),
+            TextNode("b", TextType.ITALIC),
+        ]
+        self.assertEqual(result, expected)
+
+    def test_unmatched_delimiter(self):
+        self.assertEqual([TextNode("2 ** 3", TextType.TEXT)], text_to_textnodes("2 ** 3"))
+
+    def test_bold_across_lines(self):
+        result = text_to_textnodes("**bold\nlines** end")
+        expected = [TextNode("bold\nlines", TextType.BOLD), TextNode(" end", TextType.TEXT)]
+        self.assertEqual(result, expected)
+
+    def test_iter_is_lazy(self):
+        nodes = iter_text_nodes("a [b](c) d")
+        self.assertEqual(TextNode("a ", TextType.TEXT), next(nodes))
+        self.assertEqual(TextNode("b", TextType.LINK, "c"), next(nodes))
+
+
+class TestSpans(unittest.TestCase):
+    text = "a **b** [c](/d) ![e](/f.png)"
+
+    def test_offsets(self):
+        expected = [
+            (SPAN_TEXT, 0, 2, 0, 0),
+            (SPAN_BOLD, 4, 5, 0, 0),
+            (SPAN_TEXT, 7, 8, 0, 0),
+            (SPAN_LINK, 9, 10, 12, 14),
+            (SPAN_TEXT, 15, 16, 0, 0),
+            (SPAN_IMAGE, 18, 19, 21, 27),
+        ]
+        self.assertEqual(expected, list(iter_spans(self.text)))
+
+    def test_html_nodes_match_text_nodes(self):
+        expected = list(map(text_node_to_html_node, text_to_textnodes(self.text)))
+        self.assertEqual(expected, text_to_html_nodes(self.text))
+
+    def test_render_matches_nodes(self):
+        text = "This is **text** with an _italic_ word, `code`, ![img](/i.png) and [link](https://boot.dev)"
+        expected = "".join(node.to_html() for node in text_to_html_nodes(text))
+        self.assertEqual(expected, text_to_html(text))
+
+    def test_empty_url(self):
+        span = next(iter_spans("[a]()"))
+        with self.assertRaises(ValueError):
+            span_to_html_node("[a]()", span)
+        with self.assertRaises(ValueError):
+            text_to_html("[a]()")
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,66 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+from ssg.links import BrokenLink, LinkIndex, LinkRecorder, PageLinks, link_target
+from ssg.urls import UrlResolver
+
+
+class TestLinkTarget(unittest.TestCase):
+    def test_targets(self):
+        for url, target in [
+            ("/blog/", "/blog/"),
+            ("/images/a%20b.png?v=2#top", "/images/a b.png"),
+            ("post/", "/blog/post/"),
+            ("../index.html", "/index.html"),
+            ("..", "/"),
+        ]:
+            with self.subTest(url=url):
+                self.assertEqual(target, link_target("blog/index.html", url))
+
+    def test_external_and_anchors(self):
+        for url in ("https://example.com/", "//cdn.example.com/a.js", "mailto:a@b.c", "#top", "?q=1"):
+            with self.subTest(url=url):
+                self.assertIsNone(link_target("index.html", url))
+
+
+class TestLinkIndex(unittest.TestCase):
+    def test_check(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            source = Path(tmp) / "index.md"
+            source.write_text("# Home\n\n[blog](/blog)\n\n[gone](/gone/) and ![a](a.png)\n\n[gone](/gone/)\n")
+            index = LinkIndex()
+            index.add_page("index.html", PageLinks(str(source), ("/blog", "/gone/", "a.png")))
+            index.add_page("blog/index.html")
+            index.add_asset("images/a.png")
+            self.assertEqual(
+                [
+                    BrokenLink(str(source), 5, "/gone/"),
+                    BrokenLink(str(source), 7, "/gone/"),
+                    BrokenLink(str(source), 5, "a.png"),
+                ],
+                index.check(),
+            )
+            self.assertEqual(f"{source}:5: broken link a.png", str(index.check()[-1]))
+
+    def test_routes(self):
+        index = LinkIndex()
+        index.add_page("index.html")
+        index.add_page("blog/tom/index.html")
+        index.add_page("notes.html")
+        self.assertEqual(
+            {"/", "/index.html", "/blog/tom/", "/blog/tom", "/blog/tom/index.html", "/notes.html"}, index.routes
+        )
+
+
+class TestLinkRecorder(unittest.TestCase):
+    def test_records_and_resolves(self):
+        urls = set()
+        recorder = LinkRecorder(UrlResolver("/base/"), urls)
+        self.assertEqual("/base/a.png", recorder("/a.png"))
+        self.assertEqual("https://example.com", recorder("https://example.com"))
+        self.assertEqual({"/a.png", "https://example.com"}, urls)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,64 @@
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import unittest
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from ssg.logs import get_log_queue, log_to_queue, logging_to, worker_context
+
+logger = logging.getLogger("ssg.test")
+
+
+def log_in_worker(text):
+    logger.info("worker %s", text)
+
+
+class TestLoggingTo(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.log = Path(self.tmp.name) / "build.log"
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_file_and_level(self):
+        root = logging.getLogger()
+        handlers, level = list(root.handlers), root.level
+        with logging_to("info", self.log):
+            logger.debug("hidden %s", 1)
+            logger.info("page %s", "a.md")
+            thread = threading.Thread(target=logger.warning, args=("from %s", "thread"))
+            thread.start()
+            thread.join()
+        self.assertEqual((handlers, level), (root.handlers, root.level))
+        self.assertIsNone(get_log_queue())
+        text = self.log.read_text()
+        self.assertIn("INFO ssg.test: page a.md", text)
+        self.assertIn("WARNING ssg.test: from thread", text)
+        self.assertNotIn("hidden", text)
+
+    def test_worker_processes(self):
+        with logging_to(logging.INFO, self.log):
+            initargs = (get_log_queue(), logging.INFO)
+            with ProcessPoolExecutor(2, worker_context(), initializer=log_to_queue, initargs=initargs) as pool:
+                list(pool.map(log_in_worker, ["a", "b"]))
+        text = self.log.read_text()
+        self.assertIn("worker a", text)
+        self.assertIn("worker b", text)
+
+    def test_import_configures_nothing(self):
+        code = "import logging, ssg.main; print(len(logging.getLogger().handlers))"
+        env = {**os.environ, "PYTHONPATH": str(Path(__file__).parents[1] / "src")}
+        result = subprocess.run(
+            [sys.executable, "-c", code], cwd=self.tmp.name, env=env, capture_output=True, text=True, check=True
+        )
+        self.assertEqual("0", result.stdout.strip())
+        self.assertEqual([], list(Path(self.tmp.name).iterdir()))
+
+
+if __name__ == "__main__":
+    unittest.main()
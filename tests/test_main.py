@@ -0,0 +1,481 @@
+import json
+import os
+import tempfile
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from unittest import mock
+
+from ssg.frozennode import FragmentCache
+from ssg.highlight import HighlightCache, set_highlight_cache
+from ssg.logs import logging_to
+from ssg.main import (
+    Site,
+    build_site,
+    collect_page_jobs,
+    dircopy,
+    extract_title,
+    generate_page,
+    generate_pages_recursive,
+    main,
+    rebuild_changes,
+    render_page,
+    run_page_jobs,
+)
+from ssg.manifest import BuildManifest
+from ssg.watch import Watcher
+
+TEMPLATE = '<html><title>{{ Title }}</title><link href="/index.css"><body>{{ Content }}</body></html>'
+
+
+class TestExtractTitle(unittest.TestCase):
+    def test_title(self):
+        self.assertEqual("Hello", extract_title("# Hello\n\nbody"))
+
+    def test_no_title(self):
+        with self.assertRaises(Exception):  # noqa: B017
+            extract_title("## Hello")
+
+
+class TestGeneratePage(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        (self.root / "template.html").write_text(TEMPLATE)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_page(self):
+        (self.root / "index.md").write_text("# Title\n\nsee [home](/)\n\n![img](/a.png)\n")
+        dest = self.root / "out" / "index.html"
+        generate_page(self.root / "index.md", self.root / "template.html", dest, "/base")
+        expected = (
+            '<html><title>Title</title><link href="/base/index.css"><body><div><h1>Title</h1>'
+            '<p>see <a href="/base/">home</a></p><p><img src="/base/a.png" alt="img"></img></p></div></body></html>'
+        )
+        self.assertEqual(expected, dest.read_text())
+        self.assertEqual(expected, render_page(self.root / "index.md", self.root / "template.html", "/base"))
+
+    def test_root_base_path_and_code_samples(self):
+        (self.root / "index.md").write_text('# Title\n\n```\n<a href="/">home</a>\n```\n\nuse `src="/a.png"`\n')
+        html = render_page(self.root / "index.md", self.root / "template.html", "/")
+        self.assertIn('<link href="/index.css">', html)
+        self.assertIn("&lt;a href=\"/\"&gt;home&lt;/a&gt;", html)
+        self.assertIn('<code>src="/a.png"</code>', html)
+        html = render_page(self.root / "index.md", self.root / "template.html", "/base/")
+        self.assertIn('<link href="/base/index.css">', html)
+        self.assertIn('<code>src="/a.png"</code>', html)
+
+    def test_escapes_title_and_content(self):
+        (self.root / "index.md").write_text("# Q&A <draft>\n\n[< Back Home](/)\n")
+        dest = self.root / "index.html"
+        generate_page(self.root / "index.md", self.root / "template.html", dest, "/base")
+        html = dest.read_text()
+        self.assertIn("<title>Q&amp;A &lt;draft&gt;</title>", html)
+        self.assertIn('<a href="/base/">&lt; Back Home</a>', html)
+
+    def test_front_matter(self):
+        (self.root / "nav.html").write_text('<nav><a href="/">home</a></nav>')
+        (self.root / "page.html").write_text(
+            "<title>{{ Title }}</title>{{> nav.html }}{% for tag in tags %}<i>{{ tag }}</i>{% endfor %}{{ Content }}"
+        )
+        (self.root / "index.md").write_text("---\ntitle: From front matter\ntags: [a, b]\n---\n\nbody\n")
+        dest = self.root / "index.html"
+        generate_page(self.root / "index.md", self.root / "page.html", dest, "/base")
+        expected = (
+            '<title>From front matter</title><nav><a href="/base/">home</a></nav><i>a</i><i>b</i>'
+            "<div><p>body</p></div>"
+        )
+        self.assertEqual(expected, dest.read_text())
+
+    def test_no_partial_file_on_error(self):
+        (self.root / "index.md").write_text("# Title\n\n[broken]()\n")
+        dest = self.root / "index.html"
+        with self.assertRaises(ValueError):
+            generate_page(self.root / "index.md", self.root / "template.html", dest, "/")
+        self.assertEqual([], list(self.root.glob("index.html*")))
+
+
+class TestConcurrentRender(unittest.TestCase):
+    def test_threads_keep_their_base_path(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            (root / "template.html").write_text(TEMPLATE)
+            page = root / "page.md"
+            page.write_text("# Page\n\n" + "\n\n".join(f"[link {i}](/x{i})" for i in range(50)) + "\n")
+
+            def render(base_path):
+                return [render_page(page, root / "template.html", base_path) for _ in range(20)]
+
+            with ThreadPoolExecutor(8) as pool:
+                pages = list(pool.map(render, ["/base/", "/"] * 4))
+        for base_path, rendered in zip(["/base/", "/"] * 4, pages, strict=True):
+            prefix = 'href="/base/x' if base_path == "/base/" else 'href="/x'
+            for html in rendered:
+                self.assertEqual(50, html.count(prefix))
+
+
+class TestIncrementalBuild(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        self.template = self.root / "template.html"
+        self.template.write_text(TEMPLATE)
+        self.content = self.root / "content"
+        (self.content / "blog").mkdir(parents=True)
+        (self.content / "index.md").write_text("# Home\n\nhello\n")
+        (self.content / "blog" / "index.md").write_text("# Blog\n\npost\n")
+        self.docs = self.root / "docs"
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def build(self, base_path="/base"):
+        manifest = BuildManifest(self.root / "manifest.json")
+        generate_pages_recursive(self.content, self.template, self.docs, base_path, manifest=manifest)
+        manifest.remove_orphans(root=self.docs)
+        manifest.save()
+        return manifest
+
+    def test_unchanged_pages_skipped(self):
+        self.assertEqual(2, self.build().built)
+        (self.docs / "index.html").write_text("untouched")
+        (self.content / "blog" / "index.md").write_text("# Blog\n\nedited\n")
+        manifest = self.build()
+        self.assertEqual((1, 1), (manifest.built, manifest.skipped))
+        self.assertEqual("untouched", (self.docs / "index.html").read_text())
+        self.assertIn("edited", (self.docs / "blog" / "index.html").read_text())
+
+    def test_template_and_base_path_invalidate(self):
+        self.build()
+        self.assertEqual(2, self.build("/other").built)
+        self.template.write_text(TEMPLATE.replace("<body>", "<body class='x'>"))
+        self.assertEqual(2, self.build("/other").built)
+
+    def test_partial_change_invalidates(self):
+        (self.root / "nav.html").write_text("<nav></nav>")
+        self.template.write_text(TEMPLATE.replace("<body>", "<body>{{> nav.html }}"))
+        self.build()
+        (self.root / "nav.html").write_text("<nav>new</nav>")
+        mtime = (self.root / "nav.html").stat().st_mtime_ns + 1_000_000
+        os.utime(self.root / "nav.html", ns=(mtime, mtime))
+        self.assertEqual(2, self.build().built)
+        self.assertIn("<nav>new</nav>", (self.docs / "index.html").read_text())
+
+    def test_deleted_source_removes_output(self):
+        self.build()
+        (self.content / "blog" / "index.md").unlink()
+        self.build()
+        self.assertFalse((self.docs / "blog").exists())
+        self.assertTrue((self.docs / "index.html").exists())
+
+
+class TestParallelBuild(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        (self.root / "template.html").write_text(TEMPLATE)
+        self.content = self.root / "content"
+        for i in range(12):
+            page = self.content / f"section{i % 3}" / f"page{i}"
+            page.mkdir(parents=True)
+            (page / "index.md").write_text(f"# Page {i}\n\n* [home](/)\n* **{i}**\n\n```python\nx = {i}\n```\n")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def build(self, name, jobs):
+        dest = self.root / name
+        manifest = BuildManifest(self.root / f"{name}.json")
+        generate_pages_recursive(self.content, self.root / "template.html", dest, "/base", manifest=manifest, jobs=jobs)
+        return {path.relative_to(dest): path.read_bytes() for path in dest.rglob("*.html")}, manifest
+
+    def test_same_output_as_serial(self):
+        serial, serial_manifest = self.build("serial", 1)
+        parallel, parallel_manifest = self.build("parallel", 3)
+        self.assertEqual(12, len(serial))
+        self.assertEqual(serial, parallel)
+        self.assertEqual(12, parallel_manifest.built)
+        self.assertEqual(
+            sorted(Path(key).relative_to(self.root / "serial") for key in serial_manifest.entries),
+            sorted(Path(key).relative_to(self.root / "parallel") for key in parallel_manifest.entries),
+        )
+
+    def test_fragment_cache(self):
+        for page in self.content.rglob("index.md"):
+            page.write_text(page.read_text() + "\nshared [footer](/about/)\n")
+        expected, serial_manifest = self.build("serial", 1)
+        dest = self.root / "cached"
+        manifest = BuildManifest(self.root / "cached.json")
+        cache = FragmentCache(64)
+        generate_pages_recursive(
+            self.content, self.root / "template.html", dest, "/base", cache, manifest=manifest, jobs=3
+        )
+        self.assertEqual(expected, {path.relative_to(dest): path.read_bytes() for path in dest.rglob("*.html")})
+        self.assertEqual(
+            {Path(key).relative_to(self.root / "serial"): links for key, links in serial_manifest.links.items()},
+            {Path(key).relative_to(dest): links for key, links in manifest.links.items()},
+        )
+        # four blocks a page, the footer is only rendered once by each of the three workers
+        self.assertEqual(48, cache.hits + cache.misses)
+        self.assertGreaterEqual(cache.hits, 9)
+
+    def test_worker_highlight_counts(self):
+        cache = HighlightCache(self.root / "highlight")
+        set_highlight_cache(cache)
+        self.addCleanup(set_highlight_cache, None)
+        self.build("first", 3)
+        self.assertEqual((0, 12), (cache.hits, cache.misses))
+        self.assertEqual(12, len(list(cache.directory.iterdir())))
+        self.build("second", 3)
+        self.assertEqual((12, 12), (cache.hits, cache.misses))
+
+    def test_jobs_in_name_order(self):
+        jobs = collect_page_jobs(self.content, self.root / "template.html", self.root / "docs", "/")
+        self.assertEqual(sorted(job.source for job in jobs), [job.source for job in jobs])
+
+    def test_progress_and_largest_first(self):
+        (self.content / "section1" / "page4" / "index.md").write_text("# Long\n\n" + "text\n" * 1000)
+        jobs = collect_page_jobs(self.content, self.root / "template.html", self.root / "docs", "/")
+        progress = mock.Mock()
+        with mock.patch("ssg.main.ProcessPoolExecutor") as pool:
+            result = (None, set(), (0, 0, 0), (0, 0, 0))
+            pool.return_value.__enter__.return_value.map.return_value = [result] * len(jobs)
+            run_page_jobs(jobs, 2, progress=progress)
+        submitted = list(pool.return_value.__enter__.return_value.map.call_args.args[1])
+        self.assertEqual(self.content / "section1" / "page4" / "index.md", submitted[0].source)
+        self.assertEqual([mock.call(i, 12) for i in range(1, 13)], progress.call_args_list)
+
+    def test_worker_logs(self):
+        log = self.root / "build.log"
+        with logging_to("info", log):
+            self.build("parallel", 3)
+        self.assertEqual(12, log.read_text().count("Generating page"))
+
+    def test_worker_error(self):
+        (self.content / "section0" / "page0" / "index.md").write_text("no title\n")
+        with self.assertRaisesRegex(Exception, "Title not found in markdown"):
+            self.build("parallel", 3)
+
+
+class TestPartialBuild(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.site = Site.at(Path(self.tmp.name))
+        self.site.template.write_text(TEMPLATE)
+        (self.site.content / "blog" / "drafts").mkdir(parents=True)
+        (self.site.content / "index.md").write_text("# Home\n")
+        (self.site.content / "blog" / "index.md").write_text("# Blog\n")
+        (self.site.content / "blog" / "drafts" / "idea.md").write_text("# Idea\n")
+        self.site.static.mkdir()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def build(self, paths=(), exclude=(), *, include=(), force=False, profile=None, fragment_cache=0):
+        args = mock.Mock(
+            force=force,
+            checksum=False,
+            link="copy",
+            copy_workers=1,
+            jobs=1,
+            strict_links=False,
+            paths=list(paths),
+            include=list(include),
+            exclude=list(exclude),
+            profile=profile,
+            fragment_cache=fragment_cache,
+        )
+        with mock.patch("ssg.main.set_highlight_cache"):
+            return build_site(self.site, "/", args)
+
+    def test_exclude(self):
+        self.build(exclude=["*/drafts/*"])
+        self.assertEqual(
+            ["blog/index.html", "index.html"],
+            sorted(path.relative_to(self.site.docs).as_posix() for path in self.site.docs.rglob("*.html")),
+        )
+
+    def test_profile_same_output(self):
+        self.build()
+        expected = {path: path.read_bytes() for path in self.site.docs.rglob("*.html")}
+        profile = Path(self.tmp.name) / "profile.json"
+        with mock.patch("sys.stderr") as stderr:
+            self.build(force=True, profile=profile)
+        self.assertEqual(expected, {path: path.read_bytes() for path in self.site.docs.rglob("*.html")})
+        report = json.loads(profile.read_text())
+        self.assertEqual(3, len(report["pages"]))
+        self.assertIn("assets", report["site"])
+        self.assertIn("hottest phases", "".join(call.args[0] for call in stderr.write.call_args_list))
+
+    def test_fragment_cache_same_output(self):
+        for page in self.site.content.rglob("*.md"):
+            page.write_text(page.read_text() + "\nshared [home](/)\n")
+        self.build()
+        expected = {path: path.read_bytes() for path in self.site.docs.rglob("*.html")}
+        with self.assertLogs("ssg.frozennode", "INFO") as logs:
+            manifest = self.build(force=True, fragment_cache=16)
+        self.assertEqual(expected, {path: path.read_bytes() for path in self.site.docs.rglob("*.html")})
+        self.assertEqual(
+            ["fragment cache: 2 hits, 4 misses (33.3% hit rate), 0 evictions"],
+            [record.getMessage() for record in logs.records],
+        )
+        self.assertEqual(3, len(manifest.links))
+
+    def test_subtree_keeps_other_pages(self):
+        self.build()
+        (self.site.content / "blog" / "drafts" / "idea.md").unlink()
+        (self.site.content / "index.md").unlink()
+        manifest = self.build([self.site.content / "blog"])
+        self.assertEqual(1, manifest.skipped)
+        self.assertFalse((self.site.docs / "blog" / "drafts").exists())
+        self.assertTrue((self.site.docs / "index.html").exists())
+
+    def test_filtered_build_keeps_other_pages(self):
+        self.build()
+        (self.site.content / "blog" / "drafts" / "idea.md").unlink()
+        with self.assertNoLogs("ssg.main", "WARNING"):
+            self.build(include=["blog/*"])
+        self.assertTrue((self.site.docs / "index.html").exists())
+        self.assertTrue((self.site.docs / "blog" / "index.html").exists())
+        self.assertFalse((self.site.docs / "blog" / "drafts").exists())
+
+
+class TestDircopy(unittest.TestCase):
+    def test_keeps_destination_files(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            (root / "static" / "images").mkdir(parents=True)
+            (root / "static" / "images" / "a.png").write_text("a")
+            (root / "docs").mkdir()
+            (root / "docs" / "index.html").write_text("page")
+            dircopy(root / "static", root / "docs", clean=False)
+            self.assertTrue((root / "docs" / "index.html").exists())
+            self.assertEqual("a", (root / "docs" / "images" / "a.png").read_text())
+            dircopy(root / "static", root / "docs")
+            self.assertFalse((root / "docs" / "index.html").exists())
+
+
+class TestWatchRebuild(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.site = Site.at(Path(self.tmp.name).resolve())
+        self.site.template.write_text(TEMPLATE)
+        (self.site.content / "blog").mkdir(parents=True)
+        (self.site.content / "index.md").write_text("# Home\n\nhello\n")
+        (self.site.content / "blog" / "index.md").write_text("# Blog\n\npost\n")
+        self.site.static.mkdir()
+        (self.site.static / "index.css").write_text("body {}")
+        args = mock.Mock(
+            force=False,
+            checksum=False,
+            link="copy",
+            copy_workers=1,
+            jobs=1,
+            strict_links=False,
+            paths=[],
+            include=[],
+            exclude=[],
+            profile=None,
+            fragment_cache=0,
+        )
+        with mock.patch("ssg.main.set_highlight_cache"):
+            self.manifest = build_site(self.site, "/base", args)
+        self.watcher = Watcher([self.site.content, self.site.static, self.site.template])
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def rebuild(self):
+        return rebuild_changes(self.site, "/base", self.manifest, self.watcher.poll())
+
+    def touch(self, path, text):
+        path.write_text(text)
+        mtime = path.stat().st_mtime_ns + 1_000_000
+        os.utime(path, ns=(mtime, mtime))
+
+    def test_rebuilt_page_current_for_full_build(self):
+        self.touch(self.site.content / "blog" / "index.md", "# Blog\n\nedited\n")
+        rebuild_changes(self.site, "/base/", self.manifest, self.watcher.poll())
+        jobs = collect_page_jobs(self.site.content, self.site.template, self.site.docs, "/base", self.manifest)
+        self.assertEqual([], jobs)
+
+    def test_only_edited_page_rebuilt(self):
+        (self.site.docs / "index.html").write_text("untouched")
+        self.touch(self.site.content / "blog" / "index.md", "# Blog\n\nedited\n")
+        self.assertEqual([self.site.docs / "blog" / "index.html"], self.rebuild())
+        self.assertIn("edited", (self.site.docs / "blog" / "index.html").read_text())
+        self.assertEqual("untouched", (self.site.docs / "index.html").read_text())
+
+    def test_broken_links_reported(self):
+        args = mock.Mock(
+            force=False,
+            checksum=False,
+            link="copy",
+            copy_workers=1,
+            jobs=1,
+            strict_links=True,
+            paths=[],
+            include=[],
+            exclude=[],
+            profile=None,
+            fragment_cache=0,
+        )
+        (self.site.content / "index.md").write_text("# Home\n\n[blog](/blog/) [old](/old/)\n")
+        with mock.patch("ssg.main.set_highlight_cache"), self.assertLogs("ssg.main", "WARNING") as logs:
+            with self.assertRaisesRegex(SystemExit, "1 broken links"):
+                build_site(self.site, "/base", args)
+            # the page is up to date now, its links come from the manifest
+            with self.assertRaisesRegex(SystemExit, "1 broken links"):
+                build_site(self.site, "/base", args)
+        broken = f"{self.site.content / 'index.md'}:3: broken link /old/"
+        self.assertEqual([broken] * 2, [record.getMessage() for record in logs.records])
+
+    def test_template_rebuilds_everything(self):
+        self.touch(self.site.template, TEMPLATE.replace("<body>", "<body class='x'>"))
+        self.assertEqual(2, len(self.rebuild()))
+        self.assertIn("class='x'", (self.site.docs / "blog" / "index.html").read_text())
+
+    def test_assets_and_deletions(self):
+        (self.site.static / "app.js").write_text("go()")
+        (self.site.content / "blog" / "index.md").unlink()
+        self.assertEqual(
+            {self.site.docs / "app.js", self.site.docs / "blog" / "index.html"},
+            set(self.rebuild()),
+        )
+        self.assertEqual("go()", (self.site.docs / "app.js").read_text())
+        self.assertFalse((self.site.docs / "blog" / "index.html").exists())
+        self.assertIn("app.js", self.manifest.assets)
+        self.assertNotIn((self.site.docs / "blog" / "index.html").as_posix(), self.manifest.entries)
+
+
+class TestCommandLine(unittest.TestCase):
+    @mock.patch("ssg.main.build_site")
+    def test_build_commands(self, build_site):
+        main(["build", "--base-path", "blog"])
+        main(["blog/"])
+        main([])
+        self.assertEqual(["/blog/", "/blog/", "/"], [call.args[1] for call in build_site.call_args_list])
+
+    @mock.patch("ssg.main.build_site")
+    def test_build_paths(self, build_site):
+        main(["build", "content", "--exclude", "*/drafts/*"])
+        args = build_site.call_args.args[2]
+        self.assertEqual(([Path("content")], ["*/drafts/*"]), (args.paths, args.exclude))
+        with mock.patch("sys.stderr"), self.assertRaises(SystemExit):
+            main(["build", "static"])
+
+    @mock.patch("ssg.main.serve_site")
+    def test_serve_command(self, serve_site):
+        main(["serve", "--cache-size", "8"])
+        self.assertEqual(8, serve_site.call_args.args[2].cache_size)
+
+    @mock.patch("ssg.main.watch_site")
+    def test_watch_command(self, watch_site):
+        main(["watch", "--port", "0"])
+        self.assertEqual(0, watch_site.call_args.args[2].port)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,113 @@
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+from ssg.links import PageLinks
+from ssg.manifest import MANIFEST_VERSION, BuildManifest, hash_file
+
+
+class TestBuildManifest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        self.source = self.root / "index.md"
+        self.source.write_text("# Title\n")
+        self.template = self.root / "template.html"
+        self.template.write_text("{{ Content }}")
+        self.output = self.root / "out" / "index.html"
+        self.path = self.root / "manifest.json"
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def build(self, manifest, base_path="/"):
+        inputs = manifest.inputs(self.source, self.template, base_path)
+        if manifest.is_current(self.output, inputs):
+            return False
+        self.output.parent.mkdir(exist_ok=True)
+        self.output.write_text("page")
+        manifest.record(self.output, inputs)
+        return True
+
+    def test_hash_file(self):
+        self.assertEqual(hash_file(self.source), hash_file(self.source))
+        self.assertNotEqual(hash_file(self.source), hash_file(self.template))
+
+    def test_round_trip(self):
+        manifest = BuildManifest(self.path)
+        self.assertTrue(self.build(manifest))
+        manifest.assets = ["index.css"]
+        manifest.save()
+        self.assertFalse(self.build(BuildManifest(self.path)))
+        self.assertEqual(["index.css"], BuildManifest(self.path).assets)
+
+    def test_links_round_trip(self):
+        manifest = BuildManifest(self.path)
+        links = PageLinks(str(self.source), ("/", "/a.png"))
+        manifest.record(self.output, manifest.inputs(self.source, self.template, "/"), links)
+        manifest.save()
+        self.assertEqual({self.output.as_posix(): links}, BuildManifest(self.path).links)
+        manifest.forget(self.output)
+        self.assertEqual({}, manifest.links)
+
+    def test_changed_inputs(self):
+        manifest = BuildManifest(self.path)
+        self.build(manifest)
+        self.assertFalse(self.build(manifest))
+        self.assertTrue(self.build(manifest, "/base"))
+        self.source.write_text("# Other\n")
+        self.assertTrue(self.build(manifest, "/base"))
+        self.template.write_text("<p>{{ Content }}</p>")
+        self.assertTrue(self.build(BuildManifest(self.path), "/base"))
+
+    def test_missing_output(self):
+        manifest = BuildManifest(self.path)
+        self.build(manifest)
+        self.output.unlink()
+        self.assertTrue(self.build(manifest))
+
+    def test_remove_orphans(self):
+        manifest = BuildManifest(self.path)
+        self.build(manifest)
+        manifest.save()
+
+        manifest = BuildManifest(self.path)
+        self.assertEqual([self.output], manifest.remove_orphans(root=self.root))
+        self.assertFalse(self.output.exists())
+        self.assertFalse(self.output.parent.exists())
+        self.assertTrue(self.root.exists())
+        self.assertEqual({}, manifest.entries)
+
+    def test_remove_orphans_keeps_root(self):
+        manifest = BuildManifest(self.path)
+        self.build(manifest)
+        nested = self.root / "out" / "blog" / "index.html"
+        nested.parent.mkdir()
+        nested.write_text("page")
+        manifest.record(nested, manifest.inputs(self.source, self.template, "/"))
+        manifest.save()
+
+        manifest = BuildManifest(self.path)
+        self.assertEqual([nested, self.output], sorted(manifest.remove_orphans(root=self.root / "out")))
+        self.assertEqual([], list((self.root / "out").iterdir()))
+
+    def test_unreadable_or_outdated(self):
+        self.path.write_text("{not json")
+        with self.assertLogs("ssg.manifest", "WARNING") as logs:
+            self.assertEqual({}, BuildManifest(self.path).entries)
+        self.assertEqual(
+            [f"ignoring unreadable build manifest {self.path}"], [record.getMessage() for record in logs.records]
+        )
+        self.path.write_text(json.dumps({"version": MANIFEST_VERSION + 1, "outputs": {"a": {}}}))
+        self.assertEqual({}, BuildManifest(self.path).entries)
+
+    def test_clear(self):
+        manifest = BuildManifest(self.path)
+        self.build(manifest)
+        manifest.clear()
+        self.assertTrue(self.build(manifest))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,95 @@
+import json
+import os
+import tempfile
+import unittest
+import urllib.error
+import urllib.request
+from functools import partial
+from pathlib import Path
+
+from ssg.main import render_page
+from ssg.preview import STATS_PATH, PageCache, PreviewPages, start_preview_server
+
+TEMPLATE = '<html><title>{{ Title }}</title><link href="/index.css"><body>{{ Content }}</body></html>'
+
+
+class TestPageCache(unittest.TestCase):
+    def test_evicts_least_recently_used_by_size(self):
+        cache = PageCache(max_bytes=10)
+        cache.put(Path("a"), (1,), b"aaaa")
+        cache.put(Path("b"), (1,), b"bbbb")
+        self.assertEqual(b"aaaa", cache.get(Path("a"), (1,)))
+        cache.put(Path("c"), (1,), b"cccc")
+        self.assertIsNone(cache.get(Path("b"), (1,)))
+        self.assertEqual(b"aaaa", cache.get(Path("a"), (1,)))
+        self.assertEqual((8, 1), (cache.size, cache.evictions))
+
+    def test_signature_mismatch_is_stale(self):
+        cache = PageCache()
+        cache.put(Path("a"), (1,), b"old")
+        self.assertIsNone(cache.get(Path("a"), (2,)))
+        self.assertEqual((0, 1, 1), (cache.hits, cache.misses, cache.stale))
+
+    def test_oversized_page_not_cached(self):
+        cache = PageCache(max_bytes=2)
+        cache.put(Path("a"), (1,), b"abc")
+        self.assertEqual((0, 0), (len(cache), cache.size))
+
+
+class TestPreviewServer(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        (self.root / "template.html").write_text(TEMPLATE)
+        (self.root / "content" / "blog").mkdir(parents=True)
+        (self.root / "content" / "index.md").write_text("# Home\n\nhello\n")
+        (self.root / "content" / "blog" / "index.md").write_text("# Blog\n\npost\n")
+        (self.root / "content" / "blog" / "notes.md").write_text("# Notes\n\nnotes\n")
+        (self.root / "static").mkdir()
+        (self.root / "static" / "index.css").write_text("body {}")
+        render = partial(render_page, template_path=self.root / "template.html", base_path="/base")
+        self.pages = PreviewPages(self.root / "content", self.root / "template.html", render, PageCache())
+        self.server, _ = start_preview_server(self.root / "static", "127.0.0.1", 0, self.pages, "/base/")
+        self.url = "http://127.0.0.1:%d" % self.server.server_address[1]
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.tmp.cleanup()
+
+    def get(self, path):
+        with urllib.request.urlopen(self.url + path, timeout=5) as response:
+            return response.read().decode()
+
+    def test_renders_pages_on_request(self):
+        self.assertEqual(
+            '<html><title>Home</title><link href="/base/index.css"><body><div><h1>Home</h1><p>hello</p></div></body></html>',
+            self.get("/"),
+        )
+        self.assertIn("<p>post</p>", self.get("/base/blog/"))
+        self.assertIn("<p>notes</p>", self.get("/blog/notes.html"))
+        self.assertIn("<p>post</p>", self.get("/blog"))
+        self.assertEqual("body {}", self.get("/base/index.css"))
+
+    def test_missing_page(self):
+        with self.assertRaises(urllib.error.HTTPError) as error:
+            self.get("/nothing/")
+        self.assertEqual(404, error.exception.code)
+        with self.assertRaises(urllib.error.HTTPError):
+            self.get("/../template.html")
+
+    def test_cache_invalidated_by_mtime(self):
+        self.get("/blog/")
+        self.get("/blog/")
+        source = self.root / "content" / "blog" / "index.md"
+        source.write_text("# Blog\n\nedited\n")
+        mtime = source.stat().st_mtime_ns + 1_000_000
+        os.utime(source, ns=(mtime, mtime))
+        self.assertIn("edited", self.get("/blog/"))
+        stats = json.loads(self.get(STATS_PATH))
+        self.assertEqual((1, 2, 1, 2), (stats["hits"], stats["misses"], stats["stale"], stats["rendered"]))
+        self.assertEqual(1, stats["entries"])
+
+
+if __name__ == "__main__":
+    unittest.main()
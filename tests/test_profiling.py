@@ -0,0 +1,62 @@
+import json
+import tempfile
+import time
+import types
+import unittest
+from pathlib import Path
+
+from ssg.profiling import PAGE_PHASES, BuildProfile, site_phase
+
+
+class TestBuildProfile(unittest.TestCase):
+    def test_nested_phases_not_counted_twice(self):
+        profile = BuildProfile()
+        with profile.page("a.md", "a.html"):
+            with profile.phase("tree"):
+                time.sleep(0.005)
+                with profile.phase("inline"):
+                    time.sleep(0.05)
+        phases = profile.pages[0].phases
+        self.assertGreaterEqual(phases["inline"], 0.05)
+        self.assertLess(phases["tree"], 0.05)
+        self.assertAlmostEqual(phases["tree"] + phases["inline"], profile.pages[0].total)
+
+    def test_site_phases_outside_pages(self):
+        profile = BuildProfile()
+        with site_phase(profile, "assets"):
+            pass
+        with site_phase(None, "assets"):
+            pass
+        self.assertEqual(["assets"], list(profile.site))
+        self.assertEqual([], profile.pages)
+
+    def test_instrument_restores(self):
+        def spans(text):
+            yield from text
+
+        module = types.SimpleNamespace(spans=spans, upper=str.upper)
+        profile = BuildProfile()
+        with profile.page("a.md", "a.html"), profile.instrument(module, "spans", "inline"):
+            self.assertEqual(["a", "b"], list(module.spans("ab")))
+        self.assertIs(spans, module.spans)
+        self.assertIn("inline", profile.pages[0].phases)
+
+    def test_report_and_summary(self):
+        profile = BuildProfile()
+        for name, seconds in (("fast.md", 0.001), ("slow.md", 0.01)):
+            with profile.page(name, name.replace(".md", ".html")), profile.phase("to_html"):
+                time.sleep(seconds)
+        with tempfile.TemporaryDirectory() as tmp:
+            profile.write(Path(tmp) / "profile.json")
+            report = json.loads((Path(tmp) / "profile.json").read_text())
+        self.assertEqual(["slow.md", "fast.md"], [page["source"] for page in report["pages"]])
+        self.assertEqual(set(PAGE_PHASES), set(report["phases"]))
+        self.assertEqual("to_html", next(iter(report["phases"])))
+        summary = profile.summary(top=1)
+        self.assertIn("profiled 2 pages", summary)
+        self.assertIn("slow.md", summary)
+        self.assertNotIn("fast.md", summary)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,108 @@
+import random
+import unittest
+from pathlib import Path
+
+from ssg.block import BlockRule, markdown_to_html, markdown_to_html_node, register_block_rule, unregister_block_rule
+from ssg.htmlnode import LeafNode
+
+CONTENT = Path(__file__).resolve().parent.parent / "content"
+
+CASES = [
+    "# Header 1\n\n## Header 2\n\n###### Header 6",
+    "This is a paragraph.\nwith two lines",
+    "> This is a quote.\n>\n> more quote",
+    "* Item 1\n* Item 2\n* Item 3",
+    "- Item 1\n- Item 2",
+    "1. First item\n2. Second item\n3. Third item",
+    "This is **text** with an _italic_ word and a ```code block``` and an ![image](/i.png) and a [link](/l)",
+    "```\nprint('hi')\n\nprint('there')\n```",
+    '```python\ndef f(x):\n    return x < 2  # "small"\n```',
+    "```js\nconst a = `b`;\n```\n\nafter the code",
+    "- **bold item** and [link](/x)\n- `code item`",
+    "1. _one_\n2. ![two](/2.png)",
+    "> quote with **bold**\n> and a [link](https://example.com/a_b)",
+    "paragraph with ** ** empty bold and **real** bold",
+    "a\n\n\n\n\nb",
+    "unclosed **bold and _italic",
+    'escaped <b>tags</b> & [a "quoted" link](/q?a=1&b="2") and ![alt "x" <y>](/i.png?a&b)',
+    "```no-such-lang\nx < y && z\n```",
+]
+
+WORDS = [
+    "elf",
+    "ring",
+    "**bold**",
+    "_it_",
+    "`code`",
+    "[a](/a)",
+    "![i](/i.png)",
+    "x < y",
+    "&",
+    "'q'",
+    '"dq"',
+    '[a&b](/s?x=1&y="2")',
+]
+
+
+def random_document(rng: random.Random) -> str:
+    blocks = []
+    for _ in range(rng.randint(1, 12)):
+        words = " ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 15)))
+        kind = rng.randrange(7)
+        if kind == 0:
+            blocks.append("#" * rng.randint(1, 6) + " " + words)
+        elif kind == 1:
+            blocks.append("\n".join(f"> {words}" for _ in range(rng.randint(1, 3))))
+        elif kind == 2:  # noqa: PLR2004
+            blocks.append("\n".join(f"* {words}" for _ in range(rng.randint(1, 4))))
+        elif kind == 3:  # noqa: PLR2004
+            blocks.append("\n".join(f"{i}. {words}" for i in range(1, rng.randint(2, 5))))
+        elif kind == 4:  # noqa: PLR2004
+            blocks.append(f"```{rng.choice(['', 'python', 'bash', 'json'])}\n{words}\n\n{words}\n```")
+        else:
+            blocks.append(words)
+    return "\n\n".join(blocks)
+
+
+class TestDifferential(unittest.TestCase):
+    def assert_same(self, markdown):
+        self.assertEqual(markdown_to_html_node(markdown).to_html(), markdown_to_html(markdown))
+
+    def test_cases(self):
+        for markdown in CASES:
+            with self.subTest(markdown=markdown):
+                self.assert_same(markdown)
+
+    def test_content(self):
+        pages = sorted(CONTENT.rglob("*.md"))
+        self.assertTrue(pages)
+        for page in pages:
+            with self.subTest(page=page.name):
+                self.assert_same(page.read_text())
+
+    def test_random_documents(self):
+        rng = random.Random(1234)
+        for i in range(300):
+            markdown = random_document(rng)
+            with self.subTest(i=i):
+                self.assert_same(markdown)
+
+    def test_same_errors(self):
+        for markdown in ["", "\n\n", "[broken]()", "** **", "* ** **"]:
+            with self.subTest(markdown=markdown):
+                with self.assertRaises(ValueError):
+                    markdown_to_html_node(markdown).to_html()
+                with self.assertRaises(ValueError):
+                    markdown_to_html(markdown)
+
+    def test_rule_without_renderer(self):
+        register_block_rule(BlockRule("rule", lambda _: LeafNode("", "hr"), start=r"-{3,}$"))
+        try:
+            self.assert_same("a\n\n---\n\nb")
+            self.assertEqual("<div><p>a</p><hr></hr><p>b</p></div>", markdown_to_html("a\n\n---\n\nb"))
+        finally:
+            unregister_block_rule("rule")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,47 @@
+import tempfile
+import threading
+import unittest
+import urllib.request
+from pathlib import Path
+
+from ssg.serve import EVENTS_PATH, RELOAD_SCRIPT, ReloadBroadcaster, start_server
+
+
+class TestServer(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        (self.root / "blog").mkdir()
+        (self.root / "blog" / "index.html").write_text("<html><body><p>post</p></body></html>")
+        (self.root / "index.css").write_text("body {}")
+        self.broadcaster = ReloadBroadcaster()
+        self.server, self.thread = start_server(self.root, "127.0.0.1", 0, self.broadcaster)
+        self.url = "http://127.0.0.1:%d" % self.server.server_address[1]
+
+    def tearDown(self):
+        self.broadcaster.close()
+        self.server.shutdown()
+        self.server.server_close()
+        self.tmp.cleanup()
+
+    def get(self, path):
+        with urllib.request.urlopen(self.url + path, timeout=5) as response:
+            return response.read().decode()
+
+    def test_html_gets_reload_script(self):
+        html = self.get("/blog/")
+        self.assertEqual(f"<html><body><p>post</p>{RELOAD_SCRIPT}</body></html>", html)
+        self.assertNotIn(RELOAD_SCRIPT, (self.root / "blog" / "index.html").read_text())
+
+    def test_other_files_unchanged(self):
+        self.assertEqual("body {}", self.get("/index.css"))
+
+    def test_reload_event(self):
+        with urllib.request.urlopen(self.url + EVENTS_PATH, timeout=5) as response:
+            self.assertEqual("text/event-stream", response.headers["Content-Type"])
+            threading.Timer(0.05, self.broadcaster.notify).start()
+            self.assertEqual(b"event: reload\n", response.readline())
+
+
+if __name__ == "__main__":
+    unittest.main()
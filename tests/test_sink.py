@@ -0,0 +1,107 @@
+import io
+import tarfile
+import tempfile
+import unittest
+import zipfile
+from pathlib import Path
+from unittest import mock
+
+from ssg.main import Site, dircopy, export_site, generate_page, generate_pages_recursive
+from ssg.sink import DirectorySink, MemorySink, TarStreamSink, ZipSink, open_sink
+
+TEMPLATE = "<html><title>{{ Title }}</title><body>{{ Content }}</body></html>"
+
+
+class TestSinks(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        self.site = Site.at(self.root)
+        self.site.template.write_text(TEMPLATE)
+        (self.site.content / "blog").mkdir(parents=True)
+        (self.site.content / "index.md").write_text("# Home\n\nhello\n")
+        (self.site.content / "blog" / "index.md").write_text("# Blog\n\npost\n")
+        (self.site.static / "images").mkdir(parents=True)
+        (self.site.static / "index.css").write_text("body {}")
+        (self.site.static / "images" / "a.png").write_bytes(b"\x89PNG")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def build(self, sink, jobs=1):
+        dircopy(self.site.static, Path(), clean=False, sink=sink)
+        generate_pages_recursive(self.site.content, self.site.template, Path(), "/base", jobs=jobs, sink=sink)
+
+    def expected(self):
+        sink = DirectorySink(self.root / "docs")
+        self.build(sink)
+        docs = self.root / "docs"
+        return {path.relative_to(docs).as_posix(): path.read_bytes() for path in docs.rglob("*") if path.is_file()}
+
+    def test_memory_sink_matches_directory(self):
+        sink = MemorySink()
+        self.build(sink)
+        self.assertEqual(self.expected(), sink.files)
+        self.assertIn(b"<p>post</p>", sink.files["blog/index.html"])
+
+    def test_parallel_workers_send_pages_to_sink(self):
+        sink = MemorySink()
+        self.build(sink, jobs=2)
+        self.assertEqual(self.expected(), sink.files)
+
+    def test_zip(self):
+        archive = self.root / "site.zip"
+        with ZipSink(archive) as sink:
+            self.build(sink)
+        with zipfile.ZipFile(archive) as file:
+            files = {name: file.read(name) for name in file.namelist()}
+        self.assertEqual(self.expected(), files)
+
+    def test_tar_stream(self):
+        stream = io.BytesIO()
+        with TarStreamSink(stream, "gz") as sink:
+            self.build(sink)
+        stream.seek(0)
+        with tarfile.open(fileobj=stream, mode="r|gz") as file:
+            files = {member.name: file.extractfile(member).read() for member in file}
+        self.assertEqual(self.expected(), files)
+
+    def test_tar_stream_unknown_compression(self):
+        with self.assertRaisesRegex(ValueError, "unknown tar compression 'zip'"):
+            TarStreamSink(io.BytesIO(), "zip")
+
+    def test_directory_sink_keeps_old_page_on_error(self):
+        (self.root / "docs").mkdir()
+        (self.root / "docs" / "index.html").write_text("old")
+
+        def broken(lines):
+            yield "<p>"
+            msg = "broken block"
+            raise ValueError(msg)
+
+        sink = DirectorySink(self.root / "docs")
+        with mock.patch("ssg.main.iter_markdown_html", broken), self.assertRaisesRegex(ValueError, "broken block"):
+            generate_page(self.site.content / "index.md", self.site.template, "index.html", "/", sink=sink)
+        self.assertEqual(["index.html"], [path.name for path in (self.root / "docs").iterdir()])
+        self.assertEqual("old", (self.root / "docs" / "index.html").read_text())
+
+    def test_open_sink(self):
+        self.assertIsInstance(open_sink(self.root / "out"), DirectorySink)
+        with open_sink(self.root / "site.tar.gz") as sink:
+            self.assertIsInstance(sink, TarStreamSink)
+        with open_sink(self.root / "site.zip") as sink:
+            self.assertIsInstance(sink, ZipSink)
+
+    def test_export_site(self):
+        args = mock.Mock(
+            output=str(self.root / "site.zip"), copy_workers=1, jobs=1, strict_links=False, fragment_cache=0
+        )
+        with mock.patch("ssg.main.set_highlight_cache"):
+            export_site(self.site, "/base", args)
+        with zipfile.ZipFile(self.root / "site.zip") as file:
+            self.assertEqual(["index.css", "images/a.png", "blog/index.html", "index.html"], file.namelist())
+        self.assertFalse(self.site.docs.exists())
+
+
+if __name__ == "__main__":
+    unittest.main()
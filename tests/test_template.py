@@ -0,0 +1,143 @@
+import io
+import os
+import pickle
+import tempfile
+import unittest
+from pathlib import Path
+
+from ssg.template import Markup, compile_template, load_template, read_front_matter
+from ssg.urls import UrlResolver
+
+
+class TemplateTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def template(self, text, name="page.html"):
+        path = self.root / name
+        path.write_text(text)
+        return compile_template(path)
+
+
+class TestTemplate(TemplateTestCase):
+    def test_slots(self):
+        template = self.template("<title> {{ Title }} </title>{{Content}}<p>{{ missing }}</p>")
+        context = {"Title": "Q&A", "Content": Markup("<b>x</b>")}
+        self.assertEqual("<title> Q&amp;A </title><b>x</b><p></p>", template.render(context))
+
+    def test_literals_and_slots(self):
+        template = self.template("<a>{{ x }}</a>")
+        self.assertEqual(("<a>", "</a>"), tuple(node for node in template.nodes if isinstance(node, str)))
+
+    def test_streamed_content(self):
+        template = self.template("<body>{{ Content }}</body>")
+        fragments = iter(["<div>", "<p>a < b</p>", "</div>"])
+        out = io.StringIO()
+        template.write(out, {"Content": fragments})
+        self.assertEqual("<body><div><p>a < b</p></div></body>", out.getvalue())
+
+    def test_fields(self):
+        template = self.template("{{ page.author }} {{ count }}")
+        self.assertEqual("&lt;me&gt; 3", template.render({"page": {"author": "<me>"}, "count": 3}))
+
+    def test_value_in_attribute(self):
+        template = self.template('<meta content="{{ description }}">')
+        self.assertEqual(
+            '<meta content="say &quot;hi&quot; &amp; go">', template.render({"description": 'say "hi" & go'})
+        )
+
+    def test_if(self):
+        template = self.template("{% if draft %}draft{% else %}final{% endif %}{% if tags %}!{% endif %}")
+        self.assertEqual("draft", template.render({"draft": True}))
+        self.assertEqual("final!", template.render({"draft": False, "tags": ["a"]}))
+
+    def test_for(self):
+        template = self.template("<ul>{% for tag in tags %}<li>{{ tag }}</li>{% endfor %}</ul>")
+        self.assertEqual("<ul><li>a</li><li>&lt;b&gt;</li></ul>", template.render({"tags": ["a", "<b>"]}))
+        self.assertEqual("<ul></ul>", template.render({}))
+
+    def test_nested(self):
+        template = self.template(
+            "{% for post in posts %}{% if post.draft %}-{% else %}{{ post.title }}{% endif %}{% endfor %}"
+        )
+        posts = [{"title": "a", "draft": False}, {"title": "b", "draft": True}, {"title": "c"}]
+        self.assertEqual("a-c", template.render({"posts": posts}))
+
+    def test_partial(self):
+        (self.root / "partials").mkdir()
+        (self.root / "partials" / "head.html").write_text("<title>{{ Title }}</title>")
+        template = self.template("<head>{{> partials/head.html }}</head>")
+        self.assertEqual("<head><title>T</title></head>", template.render({"Title": "T"}))
+        self.assertIn((self.root / "partials" / "head.html").resolve(), template.dependencies)
+
+    def test_recursive_partial(self):
+        with self.assertRaisesRegex(ValueError, "includes itself"):
+            self.template("{{> page.html }}")
+
+    def test_errors(self):
+        for text, error in [
+            ("a\n{% if x %}", "page.html:2: {% if %} is never closed"),
+            ("{% endfor %}", "unexpected {% endfor %}"),
+            ("{% for x in y %}{% endif %}", "unexpected {% endif %}"),
+            ("{% if x %}{% else %}{% else %}{% endif %}", "unexpected {% else %}"),
+            ("{{ a-b }}", "invalid name"),
+            ("{% while x %}", "unexpected {% while x %}"),
+        ]:
+            with self.subTest(text=text), self.assertRaisesRegex(ValueError, error):
+                self.template(text)
+
+    def test_resolve_urls(self):
+        template = self.template(
+            '<link href="/index.css">{% if logo %}<img src="/logo.png">{% endif %}<a href="{{ url }}">x</a>'
+        )
+        resolved = template.resolve_urls(UrlResolver("/base/"))
+        self.assertIs(resolved, template.resolve_urls(UrlResolver("/base/")))
+        self.assertEqual(
+            '<link href="/base/index.css"><img src="/base/logo.png"><a href="/x">x</a>',
+            resolved.render({"logo": True, "url": "/x"}),
+        )
+        self.assertEqual('<link href="/index.css"><a href="">x</a>', template.render({}))
+
+    def test_pickle(self):
+        template = self.template("{% for x in xs %}{{ x }}{% endfor %}")
+        self.assertEqual("12", pickle.loads(pickle.dumps(template)).render({"xs": [1, 2]}))
+
+
+class TestLoadTemplate(TemplateTestCase):
+    def test_cached_until_modified(self):
+        path = self.root / "page.html"
+        path.write_text("<p>{{ Title }}</p>")
+        template = load_template(path)
+        self.assertIs(template, load_template(path))
+
+        path.write_text("<h1>{{ Title }}</h1>")
+        stat = path.stat()
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+        self.assertIsNot(template, load_template(path))
+        self.assertEqual("<h1>x</h1>", load_template(path).render({"Title": "x"}))
+
+
+class TestFrontMatter(unittest.TestCase):
+    def test_front_matter(self):
+        source = io.StringIO('---\ntitle: Hello: World\ntags: [a, "b"]\ndraft: true\n---\n\n# Heading\n\nbody\n')
+        fields, first_line = read_front_matter(source)
+        self.assertEqual({"title": "Hello: World", "tags": ["a", "b"], "draft": True}, fields)
+        self.assertEqual("# Heading\n", first_line)
+        self.assertEqual("\nbody\n", source.read())
+
+    def test_no_front_matter(self):
+        source = io.StringIO("# Heading\n\nbody\n")
+        self.assertEqual(({}, "# Heading\n"), read_front_matter(source))
+
+    def test_invalid(self):
+        for text in ["---\ntitle: a\n", "---\nnot a pair\n---\n"]:
+            with self.subTest(text=text), self.assertRaises(ValueError):
+                read_front_matter(io.StringIO(text))
+
+
+if __name__ == "__main__":
+    unittest.main()
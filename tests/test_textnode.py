@@ -29,6 +29,10 @@ class TestTextNode(unittest.TestCase):
         node2 = TextNode("this is a text node", TextType.LINK, "fake2.com")
         self.assertNotEqual(node, node2)
 
+    def test_slots(self):
+        node = TextNode("this is a text node", TextType.BOLD)
+        self.assertFalse(hasattr(node, "__dict__"))
+
     def test_link_no_url(self):
         try:
             _ = TextNode("this is a text node", TextType.LINK)
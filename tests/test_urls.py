@@ -0,0 +1,55 @@
+import unittest
+
+from ssg.inline import iter_spans, render_spans, text_node_to_html_node
+from ssg.textnode import TextNode, TextType
+from ssg.urls import UrlResolver, get_url_resolver, resolve_html_urls, set_url_resolver
+
+
+class TestUrlResolver(unittest.TestCase):
+    def test_site_absolute_urls(self):
+        self.assertEqual("/base/images/a.png", UrlResolver("/base/")("/images/a.png"))
+        self.assertEqual("/base/", UrlResolver("/base")("/"))
+        self.assertEqual("/index.css", UrlResolver("/")("/index.css"))
+        self.assertEqual("/index.css", UrlResolver()("/index.css"))
+
+    def test_other_urls_untouched(self):
+        resolver = UrlResolver("/base/")
+        for url in ("https://example.com/", "//cdn.example.com/a.js", "images/a.png", "#top", "mailto:a@b.c"):
+            self.assertEqual(url, resolver(url))
+
+    def test_resolve_html_urls(self):
+        html = '<link href="/index.css" rel="stylesheet"><script src=\'/app.js\'></script><a href="//cdn/x">'
+        self.assertEqual(
+            '<link href="/base/index.css" rel="stylesheet"><script src=\'/base/app.js\'></script><a href="//cdn/x">',
+            resolve_html_urls(html, UrlResolver("/base/")),
+        )
+        self.assertEqual('<p>href="/"</p>', resolve_html_urls('<p>href="/"</p>', UrlResolver("/base/")))
+
+
+class TestResolverHook(unittest.TestCase):
+    def setUp(self):
+        self.previous = get_url_resolver()
+        set_url_resolver(UrlResolver("/base/"))
+
+    def tearDown(self):
+        set_url_resolver(self.previous)
+
+    def test_nodes(self):
+        link = text_node_to_html_node(TextNode("home", TextType.LINK, "/"))
+        image = text_node_to_html_node(TextNode("a", TextType.IMAGE, "/a.png"))
+        self.assertEqual('<a href="/base/">home</a>', link.to_html())
+        self.assertEqual({"src": "/base/a.png", "alt": "a"}, image.props)
+
+    def test_render_spans(self):
+        text = 'see [home](/) and ![a](/a.png) but not `href="/"`'
+        out = []
+        render_spans(text, iter_spans(text), out)
+        self.assertEqual(
+            'see <a href="/base/">home</a> and <img src="/base/a.png" alt="a"></img> but not '
+            '<code>href="/"</code>',
+            "".join(out),
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
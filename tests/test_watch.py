@@ -0,0 +1,77 @@
+import os
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+
+from ssg.watch import Changes, Watcher, watch
+
+
+def touch(path, text):
+    path.write_text(text)
+    mtime = path.stat().st_mtime_ns + 1_000_000
+    os.utime(path, ns=(mtime, mtime))
+
+
+class TestWatcher(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name).resolve()
+        (self.root / "content" / "blog").mkdir(parents=True)
+        (self.root / "content" / "index.md").write_text("# Home")
+        (self.root / "template.html").write_text("<html></html>")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_no_changes(self):
+        watcher = Watcher([self.root / "content", self.root / "template.html"])
+        self.assertFalse(watcher.poll())
+
+    def test_created_modified_deleted(self):
+        watcher = Watcher([self.root / "content", self.root / "template.html"])
+        (self.root / "content" / "blog" / "post.md").write_text("# Post")
+        touch(self.root / "template.html", "<html><body></body></html>")
+        (self.root / "content" / "index.md").unlink()
+        self.assertEqual(
+            Changes(
+                created=(self.root / "content" / "blog" / "post.md",),
+                modified=(self.root / "template.html",),
+                deleted=(self.root / "content" / "index.md",),
+            ),
+            watcher.poll(),
+        )
+        self.assertFalse(watcher.poll())
+
+    def test_missing_root(self):
+        watcher = Watcher([self.root / "static"])
+        (self.root / "static").mkdir()
+        (self.root / "static" / "index.css").write_text("body {}")
+        self.assertEqual((self.root / "static" / "index.css",), watcher.poll().created)
+
+    def test_watch_survives_errors(self):
+        watcher = Watcher([self.root / "content"])
+        stop = threading.Event()
+        seen = []
+
+        def on_change(changes):
+            seen.append(changes)
+            if len(seen) == 1:
+                msg = "broken page"
+                raise ValueError(msg)
+            stop.set()
+
+        thread = threading.Thread(target=watch, args=(watcher, on_change, stop, 0.01))
+        with self.assertLogs("ssg.watch", "ERROR"):
+            thread.start()
+            (self.root / "content" / "a.md").write_text("# A")
+            while not seen:
+                stop.wait(0.01)
+            (self.root / "content" / "b.md").write_text("# B")
+            thread.join(5)
+        self.assertFalse(thread.is_alive())
+        self.assertEqual(2, len(seen))
+
+
+if __name__ == "__main__":
+    unittest.main()